@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator
+
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from .models import Booking, LineUser, RewardCampaign, RewardLog
+from .services import create_reward_logs, start_of_day
+
+DEFAULT_CAMPAIGN_CHUNK_SIZE = 1000
+FILTER_KEYS = ("location", "bookedFrom", "bookedTo", "bookingStatuses")
+
+
+def validate_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown campaign filters: {', '.join(sorted(unknown))}")
+    for key in ("bookedFrom", "bookedTo"):
+        if filters.get(key):
+            date.fromisoformat(filters[key])
+    for status in filters.get("bookingStatuses") or []:
+        if status not in Booking.Status.values:
+            raise ValueError(f"Unknown booking status: {status}")
+    return filters
+
+
+def target_users(filters: Dict[str, Any]) -> QuerySet[LineUser]:
+    """Users matched by a campaign, as a single query with a booking semi-join when filtered."""
+    users = LineUser.objects.all()
+    if not filters:
+        return users
+    bookings = Booking.objects.filter(status__in=filters.get("bookingStatuses") or Booking.ACTIVE_STATUSES)
+    if filters.get("location"):
+        bookings = bookings.filter(sweet__location__slug=filters["location"])
+    if filters.get("bookedFrom"):
+        bookings = bookings.filter(date__gte=start_of_day(date.fromisoformat(filters["bookedFrom"])))
+    if filters.get("bookedTo"):
+        booked_to = date.fromisoformat(filters["bookedTo"]) + timedelta(days=1)
+        bookings = bookings.filter(date__lt=start_of_day(booked_to))
+    return users.filter(id__in=bookings.values("user_id"))
+
+
+def create_campaign(*, name: str, delta: int, reason: str, filters: Dict[str, Any]) -> RewardCampaign:
+    if delta == 0:
+        raise ValueError("Campaign delta must not be zero")
+    return RewardCampaign.objects.create(name=name, delta=delta, reason=reason, filters=validate_filters(filters))
+
+
+def run_campaign(
+    campaign: RewardCampaign,
+    *,
+    chunk_size: int = DEFAULT_CAMPAIGN_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Apply the campaign chunk by chunk and yield a progress row after each one.
+
+    Each chunk picks the next user ids above ``last_user_id`` and, in one transaction, adds the
+    delta with a single ``UPDATE ... WHERE id IN (...)``, bulk-inserts the ledger rows and
+    advances the cursor. A crash therefore loses at most an uncommitted chunk and a rerun
+    resumes exactly where the last commit stopped.
+    """
+    if campaign.status == RewardCampaign.Status.COMPLETED:
+        return
+    targets = target_users(campaign.filters)
+    if campaign.target_count is None:
+        campaign.target_count = targets.count()
+    campaign.status = RewardCampaign.Status.RUNNING
+    campaign.save(update_fields=["target_count", "status", "updated_at"])
+
+    while True:
+        with transaction.atomic():
+            # Locking the campaign row serializes concurrent runners on the same cursor.
+            locked = RewardCampaign.objects.select_for_update().filter(pk=campaign.pk)
+            last_user_id = locked.values_list("last_user_id", flat=True).get()
+            ids = list(
+                targets.filter(id__gt=last_user_id).order_by("id").values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            now = timezone.now()
+            LineUser.objects.filter(id__in=ids).update(
+                reward_points=F("reward_points") + campaign.delta,
+                updated_at=now,
+            )
+            create_reward_logs(
+                [RewardLog(user_id=user_id, delta=campaign.delta, reason=campaign.reason) for user_id in ids]
+            )
+            RewardCampaign.objects.filter(pk=campaign.pk).update(
+                last_user_id=ids[-1],
+                processed_count=F("processed_count") + len(ids),
+                updated_at=now,
+            )
+        campaign.last_user_id = ids[-1]
+        campaign.processed_count += len(ids)
+        yield progress(campaign)
+
+    campaign.refresh_from_db(fields=["last_user_id", "processed_count"])
+    campaign.status = RewardCampaign.Status.COMPLETED
+    campaign.completed_at = timezone.now()
+    campaign.save(update_fields=["status", "completed_at", "updated_at"])
+    yield progress(campaign)
+
+
+def progress(campaign: RewardCampaign) -> Dict[str, Any]:
+    return {
+        "campaignId": campaign.id,
+        "status": campaign.status,
+        "processed": campaign.processed_count,
+        "total": campaign.target_count,
+        "lastUserId": campaign.last_user_id,
+    }
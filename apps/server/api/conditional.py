@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Iterable, Tuple
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Validator callables return the values that identify the current representation plus its
+# last modification time, or ``None`` to skip conditional handling (e.g. a 403 path).
+Validators = Tuple[Iterable[Any], datetime | None]
+CACHE_CONTROL = "private, no-cache"
+
+
+def latest(*values: datetime | None) -> datetime | None:
+    return max((value for value in values if value is not None), default=None)
+
+
+def conditional(validators: Callable[..., Validators | None]) -> Callable:
+    """Answer a GET with ``304 Not Modified`` when the client's validators still match.
+
+    ``validators(request, *args, **kwargs)`` runs before the handler and must be cheap (at
+    most one small aggregate query), so an unchanged poll skips the view's queries and
+    serialization entirely. The ETag also covers the user and the full path, so different
+    pages or filters never share a validator.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            current = validators(request, *args, **kwargs)
+            if current is None:
+                return handler(self, request, *args, **kwargs)
+            parts, last_modified = current
+            payload = "\n".join(map(str, (request.user.id, request.get_full_path(), *parts)))
+            etag = quote_etag(hashlib.sha256(payload.encode()).hexdigest()[:32])
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+            response["Cache-Control"] = CACHE_CONTROL
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import socket
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Booking, LineUser, RewardLog
+from .signals import booking_statuses_changed, reward_logs_created
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+BROKER_SUBSCRIBE = b"SUBSCRIBE\n"
+BROKER_RECONNECT_SECONDS = 1.0
+
+# (user id, event) pairs; every event is a JSON-ready dict with a ``type`` key.
+UserEvent = Tuple[int, Dict[str, Any]]
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+
+    def push(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscriber's loop. A client too slow to drain its queue gets a single
+        # resync event instead of an unbounded backlog and reloads its state once.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync"}
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    """In-process fan-out from publishing threads to per-connection asyncio queues.
+
+    Publishers run in sync code (request threads, management commands) and hand events to
+    each subscriber's loop with ``call_soon_threadsafe``; nothing blocks on slow clients.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a queue for ``user_id``; must be called from the consuming event loop."""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_ids: Iterable[int]) -> bool:
+        with self.lock:
+            return any(user_id in self.subscribers for user_id in user_ids)
+
+    def deliver(self, events: Iterable[UserEvent]) -> None:
+        for user_id, event in events:
+            with self.lock:
+                subscriptions = list(self.subscribers.get(user_id, ()))
+            for subscription in subscriptions:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.push, event)
+                except RuntimeError:
+                    # The connection's loop already shut down; its finally block unsubscribes.
+                    pass
+
+
+hub = EventHub()
+
+
+class BrokerClient:
+    """Newline-delimited JSON link to ``run_event_broker`` for cross-process delivery.
+
+    Publishing uses one blocking socket shared by the process; each serving event loop
+    keeps a listener connection open and feeds whatever the broker relays into ``hub``.
+    """
+
+    def __init__(self, address: str) -> None:
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.lock = threading.Lock()
+        self.sock: socket.socket | None = None
+        self.listeners: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def send(self, events: List[UserEvent]) -> bool:
+        payload = "".join(json.dumps({"userId": user_id, "event": event}) + "\n" for user_id, event in events)
+        with self.lock:
+            for _ in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(self.address, timeout=2)
+                    self.sock.sendall(payload.encode())
+                    return True
+                except OSError:
+                    if self.sock is not None:
+                        self.sock.close()
+                    self.sock = None
+        return False
+
+    def ensure_listener(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self.listeners.get(loop)
+        if task is None or task.done():
+            self.listeners[loop] = loop.create_task(self.listen())
+
+    async def listen(self) -> None:
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(*self.address)
+                writer.write(BROKER_SUBSCRIBE)
+                await writer.drain()
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    hub.deliver([(message["userId"], message["event"])])
+            except (OSError, ValueError, KeyError):
+                logger.warning("Event broker connection lost, retrying", exc_info=True)
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(BROKER_RECONNECT_SECONDS)
+
+
+broker = BrokerClient(settings.EVENT_BROKER_ADDRESS) if settings.EVENT_BROKER_ADDRESS else None
+
+
+def subscribe(user_id: int) -> Subscription:
+    if broker is not None:
+        broker.ensure_listener()
+    return hub.subscribe(user_id)
+
+
+def publish(events: List[UserEvent]) -> None:
+    """Deliver to this process, or to every process through the broker when one is set."""
+    if broker is not None and broker.send(events):
+        return
+    if broker is not None:
+        logger.warning("Event broker unreachable, delivering %s events locally only", len(events))
+    hub.deliver(events)
+
+
+def listened(user_ids: Iterable[int]) -> bool:
+    # Without a broker only local connections can receive anything, so idle writes skip
+    # building events (and the balance query) entirely.
+    return broker is not None or hub.has_subscribers(user_ids)
+
+
+def sse_message(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream(user_id: int, *, keepalive: float) -> AsyncIterator[str]:
+    """Yield SSE frames for ``user_id`` until the client disconnects.
+
+    The opening ``ready`` event tells the client to load its state once; after that every
+    change arrives as an event and polling is unnecessary. Comment frames keep idle
+    connections open through proxies.
+    """
+    subscription = subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n" + sse_message({"type": "ready"})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_message(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def booking_event(row: Dict[str, Any]) -> UserEvent:
+    return row["user_id"], {
+        "type": "booking",
+        "booking": {"id": row["id"], "sweetId": row["sweet_id"], "status": row["status"]},
+    }
+
+
+def publish_reward_events(logs: List[Tuple[int, int, str, str]]) -> None:
+    # One query for the post-commit balances of every user in the batch.
+    balances = dict(LineUser.objects.filter(id__in={log[0] for log in logs}).values_list("id", "reward_points"))
+    publish(
+        [
+            (
+                user_id,
+                {
+                    "type": "reward",
+                    "delta": delta,
+                    "reason": reason,
+                    "rewardPoints": balances.get(user_id),
+                    "createdAt": created_at,
+                },
+            )
+            for user_id, delta, reason, created_at in logs
+        ]
+    )
+
+
+@receiver(post_save, sender=Booking, dispatch_uid="api.events.booking_saved")
+def booking_saved(sender, instance: Booking, **kwargs) -> None:
+    row = {"id": instance.id, "user_id": instance.user_id, "sweet_id": instance.sweet_id, "status": instance.status}
+    if listened([row["user_id"]]):
+        transaction.on_commit(partial(publish, [booking_event(row)]))
+
+
+@receiver(booking_statuses_changed, dispatch_uid="api.events.booking_statuses_changed")
+def bookings_changed(sender, bookings: List[Dict[str, Any]], **kwargs) -> None:
+    if listened(row["user_id"] for row in bookings):
+        transaction.on_commit(partial(publish, [booking_event(row) for row in bookings]))
+
+
+@receiver(reward_logs_created, dispatch_uid="api.events.reward_logs_created")
+def reward_logs_inserted(sender, logs: List[RewardLog], **kwargs) -> None:
+    if listened(log.user_id for log in logs):
+        rows = [(log.user_id, log.delta, log.reason, log.created_at.isoformat()) for log in logs]
+        transaction.on_commit(partial(publish_reward_events, rows))
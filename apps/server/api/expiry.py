@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import calendar
+from datetime import datetime
+from typing import Dict, Iterator
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import LineUser, RewardLog
+from .services import create_reward_logs
+
+DEFAULT_EXPIRY_CHUNK_SIZE = 500
+EXPIRY_REASON = "積分到期"
+
+
+def expiry_cutoff(months: int, now: datetime | None = None) -> datetime:
+    """Start of the local day ``months`` calendar months before ``now``."""
+    now = timezone.localtime(now or timezone.now())
+    month_index = now.year * 12 + now.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    # Clamp the day so e.g. 31 March minus one month lands on the last day of February.
+    day = min(now.day, calendar.monthrange(year, month)[1])
+    return now.replace(year=year, month=month, day=day, hour=0, minute=0, second=0, microsecond=0)
+
+
+def expiring_amounts(user_ids: list[int], cutoff: datetime) -> Dict[int, int]:
+    """Points earned before ``cutoff`` that no debit has consumed yet, per user.
+
+    Debits (spends, reversals and earlier expiries) are applied oldest-first, so the
+    unspent part of the old credits is ``old credits + all debits``. A single GROUP BY over
+    ``reward_log_user_created_idx`` computes it for the whole chunk; because earlier expiry
+    rows count as debits, running the job again for the same cutoff expires nothing new.
+    """
+    expiring = Coalesce(
+        Sum("delta", filter=Q(delta__gt=0, created_at__lt=cutoff)), Value(0)
+    ) + Coalesce(Sum("delta", filter=Q(delta__lt=0)), Value(0))
+    rows = (
+        RewardLog.objects.filter(user_id__in=user_ids)
+        .values("user_id")
+        .annotate(expiring=expiring)
+        .filter(expiring__gt=0)
+        .order_by()
+        .values_list("user_id", "expiring")
+    )
+    return dict(rows)
+
+
+def expire_reward_points(
+    *,
+    cutoff: datetime,
+    chunk_size: int = DEFAULT_EXPIRY_CHUNK_SIZE,
+    dry_run: bool = False,
+) -> Iterator[Dict[str, int]]:
+    """Expire unspent points earned before ``cutoff`` and yield per-chunk totals.
+
+    Users with a positive balance are walked in id order. Each chunk is its own short
+    transaction: the chunk's ``user_tab`` rows are locked, the expiring amounts computed in
+    SQL (capped at the current balance), balances lowered with one ``CASE`` update and the
+    negative ledger rows bulk-inserted. No lock outlives its chunk. A dry run only reads, so it
+    takes no row locks and never blocks live reward updates.
+    """
+    users = LineUser.objects.all() if dry_run else LineUser.objects.select_for_update()
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            balances = dict(
+                users.filter(id__gt=last_id, reward_points__gt=0)
+                .order_by("id")
+                .values_list("id", "reward_points")[:chunk_size]
+            )
+            if not balances:
+                return
+            last_id = max(balances)
+            amounts = {
+                user_id: min(amount, balances[user_id])
+                for user_id, amount in expiring_amounts(list(balances), cutoff).items()
+            }
+            if amounts and not dry_run:
+                LineUser.objects.filter(id__in=list(amounts)).update(
+                    reward_points=F("reward_points")
+                    - Case(
+                        *(When(id=user_id, then=Value(amount)) for user_id, amount in amounts.items()),
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+                create_reward_logs(
+                    [RewardLog(user_id=user_id, delta=-amount, reason=EXPIRY_REASON) for user_id, amount in amounts.items()]
+                )
+        yield {
+            "lastUserId": last_id,
+            "scanned": len(balances),
+            "users": len(amounts),
+            "points": sum(amounts.values()),
+        }
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import csv
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, Iterator, Tuple
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import Booking
+from .services import slot_bounds, start_of_day
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    "id",
+    "date",
+    "slot_day",
+    "time_slot",
+    "status",
+    "note",
+    "created_at",
+    "user_id",
+    "user__line_user_id",
+    "user__display_name",
+    "sweet_id",
+    "sweet__name",
+    "sweet__location__slug",
+    "sweet__location__name",
+)
+
+CSV_HEADER = (
+    "booking_id",
+    "date",
+    "slot_day",
+    "time_slot",
+    "status",
+    "sweet_id",
+    "sweet_name",
+    "location_slug",
+    "location_name",
+    "user_id",
+    "line_user_id",
+    "display_name",
+    "note",
+    "created_at",
+)
+
+ICAL_STATUS = {
+    Booking.Status.PENDING: "TENTATIVE",
+    Booking.Status.CONFIRMED: "CONFIRMED",
+    Booking.Status.CANCELLED: "CANCELLED",
+}
+
+
+def export_queryset(
+    *,
+    start: date | None = None,
+    end: date | None = None,
+    location_slug: str | None = None,
+    status: str | None = None,
+) -> QuerySet[Booking]:
+    queryset = Booking.objects.all()
+    if start:
+        queryset = queryset.filter(date__gte=start_of_day(start))
+    if end:
+        queryset = queryset.filter(date__lt=start_of_day(end + timedelta(days=1)))
+    if location_slug:
+        queryset = queryset.filter(sweet__location__slug=location_slug)
+    if status:
+        if status not in Booking.Status.values:
+            raise ValueError(f"Unknown booking status: {status}")
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def iter_export_rows(queryset: QuerySet[Booking], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield joined booking rows in id order, one keyset page at a time.
+
+    Paging on ``id`` keeps memory flat even on MySQL, whose driver buffers a whole result
+    set and so cannot stream a single large ``.iterator()`` query.
+    """
+    last_id = 0
+    while True:
+        page = queryset.filter(id__gt=last_id).order_by("id").values(*EXPORT_FIELDS)[:chunk_size]
+        count = 0
+        for row in page.iterator(chunk_size=chunk_size):
+            count += 1
+            last_id = row["id"]
+            yield row
+        if count < chunk_size:
+            return
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to the csv writer caller."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    # The BOM lets Excel detect UTF-8 so Chinese names are not garbled.
+    yield "\ufeff" + writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(
+            (
+                row["id"],
+                timezone.localtime(row["date"]).isoformat(),
+                row["slot_day"].isoformat() if row["slot_day"] else "",
+                row["time_slot"],
+                row["status"],
+                row["sweet_id"],
+                row["sweet__name"],
+                row["sweet__location__slug"] or "",
+                row["sweet__location__name"] or "",
+                row["user_id"],
+                row["user__line_user_id"],
+                row["user__display_name"],
+                row["note"] or "",
+                timezone.localtime(row["created_at"]).isoformat(),
+            )
+        )
+
+
+def ical_escape(value: str) -> str:
+    for raw, escaped in (("\\", "\\\\"), (";", "\\;"), (",", "\\,"), ("\r\n", "\\n"), ("\n", "\\n")):
+        value = value.replace(raw, escaped)
+    return value
+
+
+def ical_line(content: str) -> str:
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = content.encode("utf-8")
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def ical_timestamp(value: datetime) -> str:
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def slot_times(row: Dict[str, Any]) -> Tuple[datetime, datetime | None]:
+    """Start and end of the booked slot, falling back to the stored date when it has no time."""
+    booked_at = timezone.localtime(row["date"])
+    start, end = slot_bounds(row["slot_day"] or booked_at.date(), row["time_slot"])
+    return (start, end) if start else (booked_at, None)
+
+
+def iter_ical(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Night//Bookings//ZH-TW\r\nCALSCALE:GREGORIAN\r\n"
+    stamp = ical_timestamp(timezone.now())
+    for row in rows:
+        location = row["sweet__location__name"] or ""
+        description = f"{row['user__display_name']} ({row['user__line_user_id']})"
+        if row["note"]:
+            description += f"\n{row['note']}"
+        start, end = slot_times(row)
+        yield "".join(
+            (
+                "BEGIN:VEVENT\r\n",
+                ical_line(f"UID:booking-{row['id']}@night"),
+                f"DTSTAMP:{stamp}\r\n",
+                f"DTSTART:{ical_timestamp(start)}\r\n",
+                f"DTEND:{ical_timestamp(end)}\r\n" if end else "",
+                ical_line(f"SUMMARY:{ical_escape(row['sweet__name'])} {ical_escape(row['time_slot'])}"),
+                ical_line(f"LOCATION:{ical_escape(location)}"),
+                ical_line(f"DESCRIPTION:{ical_escape(description)}"),
+                f"STATUS:{ICAL_STATUS.get(row['status'], 'TENTATIVE')}\r\n",
+                "END:VEVENT\r\n",
+            )
+        )
+    yield "END:VCALENDAR\r\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8", "csv"),
+    "ics": (iter_ical, "text/calendar; charset=utf-8", "ics"),
+}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(scope: str, payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{scope}\n{canonical}".encode()).hexdigest()
+
+
+def claim_key(*, user, key: str, request_hash: str) -> tuple[IdempotencyKey, bool]:
+    """Insert the key row, or return the existing unexpired one (``created`` is False)."""
+    expires_at = timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=request_hash, expires_at=expires_at
+            ), True
+    except IntegrityError:
+        record = IdempotencyKey.objects.select_for_update().get(user=user, key=key)
+    if record.expires_at <= timezone.now():
+        record.request_hash = request_hash
+        record.response_status = None
+        record.response_body = None
+        record.expires_at = expires_at
+        record.save(update_fields=["request_hash", "response_status", "response_body", "expires_at"])
+        return record, True
+    return record, False
+
+
+def idempotent(scope: str) -> Callable:
+    """Replay the stored response when a request repeats its ``Idempotency-Key`` header.
+
+    The key row is written in the same transaction as the handler, so a concurrent retry
+    waits on the unique index and then replays the committed result. If the handler fails,
+    the key rolls back with it and the client may retry.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return handler(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            request_hash = request_fingerprint(f"{scope}:{sorted(kwargs.items())}", request.data)
+            with transaction.atomic():
+                record, created = claim_key(user=request.user, key=key, request_hash=request_hash)
+                if not created:
+                    if record.request_hash != request_hash:
+                        return Response(
+                            {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        )
+                    return Response(
+                        record.response_body,
+                        status=record.response_status,
+                        headers={REPLAY_HEADER: "true"},
+                    )
+
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+                record.response_status = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=["response_status", "response_body"])
+                return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api import services
+from api.models import Booking, LineUser, Location, RewardLog, Sweet
+
+SLOTS_PER_DAY = 24
+
+
+def slot_for(index: int, start_day) -> tuple[str, str]:
+    day = start_day + timedelta(days=index // SLOTS_PER_DAY)
+    return day.isoformat(), f"{index % SLOTS_PER_DAY:02d}:00"
+
+
+def book_range(
+    user_id: int,
+    sweet_id: int,
+    indexes: range,
+    distinct: int,
+    start_day,
+) -> tuple[int, int, list[float]]:
+    user = LineUser.objects.get(id=user_id)
+    created = conflicts = 0
+    latencies: list[float] = []
+    try:
+        for index in indexes:
+            date_str, time_slot = slot_for(index % distinct, start_day)
+            started = time.perf_counter()
+            try:
+                services.create_booking(
+                    user=user,
+                    sweet_id=sweet_id,
+                    date_str=date_str,
+                    time_slot=time_slot,
+                    note="benchmark",
+                )
+                created += 1
+            except services.BookingConflictError:
+                conflicts += 1
+            latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+    return created, conflicts, latencies
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent create_booking calls against a single hot sweet."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--threads", type=int, default=8, help="Number of concurrent booking threads.")
+        parser.add_argument("--bookings", type=int, default=400, help="Total bookings to attempt.")
+        parser.add_argument(
+            "--overlap",
+            type=float,
+            default=0.0,
+            help="Fraction of bookings that deliberately target an already used slot (0-1).",
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep benchmark rows instead of deleting them.")
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        total = options["bookings"]
+        overlap = options["overlap"]
+        if threads < 1 or total < 1:
+            raise CommandError("--threads and --bookings must be positive")
+        if not 0 <= overlap < 1:
+            raise CommandError("--overlap must be between 0 and 1")
+
+        tag = uuid4().hex[:8]
+        location = Location.objects.create(slug=f"bench-{tag}", name=f"Benchmark {tag}")
+        sweet = Sweet.objects.create(name=f"Benchmark {tag}", location=location)
+        users = [
+            LineUser.objects.create(line_user_id=f"bench-{tag}-{index}", display_name="Benchmark")
+            for index in range(threads)
+        ]
+        # Attempts beyond the distinct slot count wrap around and collide with earlier ones.
+        distinct = max(1, round(total * (1 - overlap)))
+        start_day = timezone.localdate() + timedelta(days=365)
+        jobs = [(user.id, range(index, total, threads)) for index, user in enumerate(users)]
+
+        try:
+            connection.close()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = list(
+                    executor.map(lambda job: book_range(job[0], sweet.id, job[1], distinct, start_day), jobs)
+                )
+            elapsed = time.perf_counter() - started
+        finally:
+            if not options["keep"]:
+                Booking.objects.filter(sweet=sweet).delete()
+                RewardLog.objects.filter(user__in=users).delete()
+                LineUser.objects.filter(id__in=[user.id for user in users]).delete()
+                sweet.delete()
+                location.delete()
+
+        created = sum(result[0] for result in results)
+        conflicts = sum(result[1] for result in results)
+        latencies = sorted(latency for result in results for latency in result[2])
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[benchmark] {connection.vendor}: {threads} threads, {created} bookings, "
+                f"{conflicts} conflicts in {elapsed:.2f}s -> {created / elapsed:.1f} bookings/s "
+                f"(p50 {p50:.1f}ms, p95 {p95:.1f}ms)"
+            )
+        )
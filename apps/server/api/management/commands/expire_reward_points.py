@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import expiry
+
+
+class Command(BaseCommand):
+    help = "Expire reward points earned more than N months ago that were never spent."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=None,
+            help="Expire points older than this many months (defaults to REWARD_POINTS_EXPIRY_MONTHS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=expiry.DEFAULT_EXPIRY_CHUNK_SIZE,
+            help="Users handled per transaction.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report expiring points without changing anything.")
+
+    def handle(self, *args, **options):
+        months = options["months"] if options["months"] is not None else settings.REWARD_POINTS_EXPIRY_MONTHS
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        if months < 1:
+            self.stderr.write("[expiry] 未設定積分效期，略過")
+            return
+
+        cutoff = expiry.expiry_cutoff(months)
+        users = points = 0
+        for row in expiry.expire_reward_points(
+            cutoff=cutoff,
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+        ):
+            users += row["users"]
+            points += row["points"]
+            self.stdout.write(json.dumps(row))
+        action = "將到期" if options["dry_run"] else "已到期"
+        self.stderr.write(f"[expiry] {cutoff:%Y-%m-%d} 前取得的積分{action}：{users} 位、共 {points} 點")
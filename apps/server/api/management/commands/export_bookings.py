@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import exports
+from api.models import Booking
+
+
+def parse_day(raw: str) -> date:
+    try:
+        return date.fromisoformat(raw)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Invalid date (expected YYYY-MM-DD): {raw}") from exc
+
+
+class Command(BaseCommand):
+    help = "Stream bookings joined with sweet and user to CSV or iCalendar."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--format", choices=list(exports.EXPORT_FORMATS), default="csv", help="Output format.")
+        parser.add_argument("--from", dest="start", type=parse_day, default=None, help="First booking day (inclusive).")
+        parser.add_argument("--to", dest="end", type=parse_day, default=None, help="Last booking day (inclusive).")
+        parser.add_argument("--location", type=str, default=None, help="Only export sweets in this location slug.")
+        parser.add_argument(
+            "--status",
+            choices=[choice for choice, _ in Booking.Status.choices],
+            default=None,
+            help="Only export bookings in this status.",
+        )
+        parser.add_argument("--output", type=str, default="-", help="Output file path ('-' writes to stdout).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=exports.EXPORT_CHUNK_SIZE,
+            help="Rows fetched per database round trip.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        queryset = exports.export_queryset(
+            start=options["start"],
+            end=options["end"],
+            location_slug=options["location"],
+            status=options["status"],
+        )
+        render = exports.EXPORT_FORMATS[options["format"]][0]
+        chunks = render(exports.iter_export_rows(queryset, chunk_size=options["chunk_size"]))
+
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stderr.write(f"[export] 已輸出至 {options['output']}")
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import hashlib
+import json
+import os
 import re
 import shutil
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter
+from contextlib import contextmanager
 from difflib import SequenceMatcher
+from itertools import islice
+from math import sqrt
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, TypeVar
 
+import numpy as np
+
+import django
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 
@@ -20,12 +34,21 @@ except ImportError:  # pragma: no cover - fallback when pypinyin not installed
     lazy_pinyin = None
 
 
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+
 try:
     import pytesseract  # type: ignore
-    from PIL import Image  # type: ignore
 except Exception:  # pragma: no cover - optional dependency
     pytesseract = None  # type: ignore
-    Image = None  # type: ignore
+
+try:
+    from openpyxl import load_workbook  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    load_workbook = None  # type: ignore
 
 
 LOCATION_INFO: dict[str, tuple[str, str]] = {
@@ -38,6 +61,39 @@ LOCATION_INFO: dict[str, tuple[str, str]] = {
 }
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+STRUCTURED_EXTENSIONS = {".csv", ".jsonl", ".xlsx"}
+SOURCE_EXTENSIONS = {".txt", *STRUCTURED_EXTENSIONS}
+DEFAULT_CHUNK_SIZE = 500
+
+STAT_KEYS = ("created", "updated", "unchanged", "copied", "duplicates", "invalid", "skipped_locations")
+
+# Hamming radii (out of 64 bits) under which two photos count as the same shot.
+DHASH_RADIUS = 6
+AHASH_RADIUS = 10
+
+VARIANT_WIDTHS = (240, 480, 960)
+# WebP for the LIFF web app; JPEG because LINE Flex images only accept JPEG/PNG.
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+PHASE_LABELS = {
+    "parse": "解析",
+    "match": "圖片配對",
+    "ocr": "OCR",
+    "dedupe": "重複圖片",
+    "copy": "複製圖片",
+    "variants": "縮圖",
+    "write": "寫入 DB",
+}
+
+OCR_LANG = "chi_tra+eng"
+NAME_MATCH_THRESHOLD = 0.6
+# Images kept per name for the assignment, and the largest assignment solved exactly.
+NAME_MATCH_CANDIDATES = 5
+ASSIGNMENT_LIMIT = 200
+OCR_MATCH_THRESHOLD = 0.45
 
 FIELD_MAP = {
     "國別": "nationality",
@@ -61,27 +117,191 @@ FIELD_MAP = {
 }
 
 
+UPSERT_UNIQUE_FIELDS = ["name", "location"]
+UPSERT_UPDATE_FIELDS = [
+    "description",
+    "image_url",
+    "tag",
+    "nationality",
+    "age_text",
+    "height_cm",
+    "weight_kg",
+    "cup",
+    "environment",
+    "long_duration_minutes",
+    "short_duration_minutes",
+    "service_type",
+    "long_price",
+    "short_price",
+    "image_variants",
+    "update_time",
+    "updated_at",
+]
+
+
+NAME_COLUMNS = {"name", "名字", "姓名", "名稱"}
+IMAGE_COLUMNS = {"image", "圖片", "照片"}
+DESCRIPTION_COLUMNS = {"description", "raw_description", "描述", "介紹"}
+INTEGER_FIELDS = (
+    "height_cm",
+    "weight_kg",
+    "long_duration_minutes",
+    "short_duration_minutes",
+    "long_price",
+    "short_price",
+)
+
+T = TypeVar("T")
+
+
 def parse_entries(text: str) -> Iterable[dict[str, str]]:
-    normalized = text.replace("：", ":")
-    blocks = [block.strip() for block in normalized.split("\n\n") if block.strip()]
-    for block in blocks:
-        lines = [line.strip() for line in block.splitlines() if line.strip()]
-        if not lines:
+    return iter_text_entries(text.splitlines())
+
+
+def iter_text_entries(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """Yield one entry per blank-line separated block without holding the whole file."""
+    block: List[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped:
+            block.append(stripped.replace("：", ":"))
             continue
-        entry: dict[str, str] = {"name": lines[0]}
-        for raw in lines[1:]:
-            if ":" not in raw:
-                continue
-            key, value = raw.split(":", 1)
-            key = key.strip()
-            value = value.strip()
-            mapped = FIELD_MAP.get(key)
-            if mapped:
-                entry[mapped] = value
-            else:
-                entry[key] = value
-        entry["raw_description"] = "\n".join(lines[1:])
-        yield entry
+        if block:
+            yield parse_block(block)
+            block = []
+    if block:
+        yield parse_block(block)
+
+
+def parse_block(lines: List[str]) -> dict[str, str]:
+    entry: dict[str, str] = {"name": lines[0]}
+    for raw in lines[1:]:
+        if ":" not in raw:
+            continue
+        key, value = raw.split(":", 1)
+        key = key.strip()
+        value = value.strip()
+        mapped = FIELD_MAP.get(key)
+        if mapped:
+            entry[mapped] = value
+        else:
+            entry[key] = value
+    entry["raw_description"] = "\n".join(lines[1:])
+    return entry
+
+
+def iter_structured_rows(path: Path) -> Iterator[dict[str, Any] | None]:
+    """
+    Stream raw rows from a CSV, JSON Lines or XLSX feed. Rows that cannot be
+    decoded are yielded as None so callers can report them by position.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open(encoding="utf-8-sig", newline="") as handle:
+            yield from csv.DictReader(handle)
+    elif suffix == ".jsonl":
+        with path.open(encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield None
+                    continue
+                yield record if isinstance(record, dict) else None
+    elif suffix == ".xlsx":
+        if load_workbook is None:
+            raise CommandError(f"openpyxl is required to import {path.name}.")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            keys = ["" if cell is None else str(cell).strip() for cell in header]
+            for values in rows:
+                if not values or all(value is None for value in values):
+                    continue
+                yield dict(zip(keys, values))
+        finally:
+            workbook.close()
+    else:
+        raise CommandError(f"Unsupported source file {path.name}.")
+
+
+def map_structured_row(row: dict[str, Any]) -> dict[str, str]:
+    """Map feed columns onto entry keys the same way text labels go through FIELD_MAP."""
+    entry: dict[str, str] = {}
+    description_lines: List[str] = []
+    for raw_key, raw_value in row.items():
+        if raw_key is None or raw_value is None:
+            continue
+        if isinstance(raw_value, float) and raw_value.is_integer():
+            raw_value = int(raw_value)
+        key = str(raw_key).strip()
+        value = str(raw_value).strip()
+        if not key or not value:
+            continue
+        if key in NAME_COLUMNS:
+            entry["name"] = value
+        elif key in IMAGE_COLUMNS:
+            entry["image"] = value
+        elif key in DESCRIPTION_COLUMNS:
+            entry["raw_description"] = value
+        else:
+            entry[FIELD_MAP.get(key, key)] = value
+            description_lines.append(f"{key}:{value}")
+    entry.setdefault("raw_description", "\n".join(description_lines))
+    return entry
+
+
+def validate_entry(entry: dict[str, str]) -> List[str]:
+    errors: List[str] = []
+    name = entry.get("name", "")
+    if not name:
+        errors.append("缺少名稱")
+    elif len(name) > 255:
+        errors.append("名稱超過 255 字")
+    for field_name in INTEGER_FIELDS:
+        value = entry.get(field_name)
+        if value and parse_int(value) is None:
+            errors.append(f"{field_name} 不是數字：{value}")
+    return errors
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def build_sweet_fields(
+    entry: dict[str, str],
+    location_name: str,
+    image_url: str | None,
+    image_variants: List[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    nationality = entry.get("nationality", "")
+    service_type = entry.get("service_type", "")
+    tag_parts = [location_name, service_type, nationality]
+    return {
+        "description": entry.get("raw_description", ""),
+        "image_url": image_url or "",
+        "image_variants": image_variants or [],
+        "tag": " ".join(part for part in tag_parts if part),
+        "nationality": nationality,
+        "age_text": entry.get("age_text", ""),
+        "height_cm": parse_int(entry.get("height_cm")),
+        "weight_kg": parse_int(entry.get("weight_kg")),
+        "cup": entry.get("cup", ""),
+        "environment": entry.get("environment", ""),
+        "long_duration_minutes": parse_int(entry.get("long_duration_minutes")),
+        "short_duration_minutes": parse_int(entry.get("short_duration_minutes")),
+        "service_type": service_type,
+        "long_price": parse_int(entry.get("long_price")),
+        "short_price": parse_int(entry.get("short_price")),
+    }
 
 
 def safe_slug(name: str) -> str:
@@ -118,35 +338,186 @@ def parse_int(value: str | None) -> int | None:
         return None
 
 
-def select_image(name: str, images: List[Path]) -> Path | None:
-    if not images:
-        return None
+class ImageMatch(NamedTuple):
+    image: Path | None
+    score: float
+    method: str  # "name", "ocr", "fallback" or "none"
 
-    target = normalize_text(name)
-    if target:
-        best_idx = None
-        best_score = 0.0
-        for idx, candidate in enumerate(images):
-            normalized_stem = normalize_text(candidate.stem)
-            if not normalized_stem:
+
+def match_images(
+    names: List[str],
+    images: List[Path],
+    ocr_cache: "OcrCache | None" = None,
+    aliases: dict[Path, List[Path]] | None = None,
+    fallback: List[bool] | None = None,
+) -> List[ImageMatch]:
+    """
+    Pair every entry with at most one image. Filename similarity is solved as one
+    global assignment so an early entry cannot steal a later entry's best image;
+    entries left without a confident match fall back to OCR, then to queue order.
+    ``aliases`` lists near-duplicate files whose names also count for an image.
+    ``fallback`` marks, per name, whether the queue-order guess is allowed.
+
+    Only each name's best ``NAME_MATCH_CANDIDATES`` images above the threshold are kept,
+    so memory grows with the number of names rather than names x images.
+    """
+    stems: List[str] = []
+    owners: List[int] = []
+    for col, image in enumerate(images):
+        for path in (image, *(aliases or {}).get(image, [])):
+            stems.append(normalize_text(path.stem))
+            owners.append(col)
+    edges: List[tuple[float, int, int]] = []
+    for row, candidates in enumerate(similar_candidates([normalize_text(name) for name in names], stems)):
+        best: dict[int, float] = {}
+        for stem_idx, score in candidates:
+            col = owners[stem_idx]
+            best[col] = max(best.get(col, 0.0), score)
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:NAME_MATCH_CANDIDATES]
+        edges.extend((score, row, col) for col, score in ranked if score >= NAME_MATCH_THRESHOLD)
+
+    matches: List[ImageMatch | None] = [None] * len(names)
+    for row, col, score in assign_edges(edges):
+        matches[row] = ImageMatch(images[col], score, "name")
+
+    taken = {match.image for match in matches if match is not None}
+    remaining = [image for image in images if image not in taken]
+    for idx, name in enumerate(names):
+        if matches[idx] is not None:
+            continue
+        if not remaining:
+            matches[idx] = ImageMatch(None, 0.0, "none")
+            continue
+        if ocr_cache is not None:
+            hit = match_image_by_ocr(name, remaining, ocr_cache)
+            if hit is not None:
+                ocr_idx, score = hit
+                matches[idx] = ImageMatch(remaining.pop(ocr_idx), score, "ocr")
                 continue
-            if normalized_stem == target:
-                return images.pop(idx)
-            score = SequenceMatcher(None, target, normalized_stem).ratio()
-            if score > best_score:
-                best_score = score
-                best_idx = idx
-        if best_idx is not None and best_score >= 0.6:
-            return images.pop(best_idx)
+        if fallback is not None and not fallback[idx]:
+            matches[idx] = ImageMatch(None, 0.0, "none")
+            continue
+        matches[idx] = ImageMatch(remaining.pop(0), 0.0, "fallback")
+    return matches  # type: ignore[return-value]
+
+
+def character_ngrams(text: str, sizes: tuple[int, ...] = (1, 2)) -> List[str]:
+    return [text[i : i + size] for size in sizes for i in range(len(text) - size + 1)]
+
+
+def similar_candidates(targets: List[str], candidates: List[str]) -> Iterator[List[tuple[int, float]]]:
+    """
+    Per target, the candidates sharing at least one character n-gram with it and their
+    cosine similarity over uni/bigram counts (exact matches score 1.0). An inverted
+    n-gram index keeps this sparse: no targets x candidates matrix is ever built.
+    """
+    index: dict[str, List[tuple[int, int]]] = {}
+    norms: List[float] = []
+    for col, text in enumerate(candidates):
+        counts = Counter(character_ngrams(text))
+        norms.append(sqrt(sum(count * count for count in counts.values())) or 1.0)
+        for gram, count in counts.items():
+            index.setdefault(gram, []).append((col, count))
+    exact: dict[str, List[int]] = {}
+    for col, text in enumerate(candidates):
+        if text:
+            exact.setdefault(text, []).append(col)
+
+    for target in targets:
+        counts = Counter(character_ngrams(target))
+        norm = sqrt(sum(count * count for count in counts.values())) or 1.0
+        dots: dict[int, float] = {}
+        for gram, count in counts.items():
+            for col, other in index.get(gram, ()):
+                dots[col] = dots.get(col, 0.0) + count * other
+        scores = {col: min(dot / (norm * norms[col]), 1.0) for col, dot in dots.items()}
+        for col in exact.get(target, ()) if target else ():
+            scores[col] = 1.0
+        yield list(scores.items())
+
+
+def assign_edges(edges: List[tuple[float, int, int]]) -> List[tuple[int, int, float]]:
+    """
+    Pick ``(row, col, score)`` pairs from candidate ``(score, row, col)`` edges so no row or
+    column is used twice. Up to ``ASSIGNMENT_LIMIT`` rows the total score is maximised with
+    the Hungarian algorithm on the small rows x columns block the edges touch; larger
+    inputs take the best remaining edge first, which is near-optimal when names are distinct.
+    """
+    rows = sorted({row for _, row, _ in edges})
+    cols = sorted({col for _, _, col in edges})
+    if len(rows) <= ASSIGNMENT_LIMIT:
+        row_pos = {row: idx for idx, row in enumerate(rows)}
+        col_pos = {col: idx for idx, col in enumerate(cols)}
+        similarity = np.zeros((len(rows), len(cols)))
+        for score, row, col in edges:
+            similarity[row_pos[row], col_pos[col]] = score
+        return [
+            (rows[row], cols[col], float(similarity[row, col]))
+            for row, col in linear_assignment(-similarity)
+            if similarity[row, col] > 0
+        ]
+
+    used_rows: set[int] = set()
+    used_cols: set[int] = set()
+    pairs: List[tuple[int, int, float]] = []
+    for score, row, col in sorted(edges, key=lambda edge: (-edge[0], edge[1], edge[2])):
+        if row not in used_rows and col not in used_cols:
+            used_rows.add(row)
+            used_cols.add(col)
+            pairs.append((row, col, score))
+    return sorted(pairs)
 
-    ocr_idx = match_image_by_ocr(name, images)
-    if ocr_idx is not None:
-        return images.pop(ocr_idx)
 
-    return images.pop(0)
+def linear_assignment(cost: np.ndarray) -> List[tuple[int, int]]:
+    """
+    Minimum-cost row/column assignment (Hungarian algorithm with potentials).
+    Works on rectangular matrices; every row or every column gets exactly one partner.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
 
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.intp)  # owner[j]: 1-based row assigned to column j
+    way = np.zeros(m + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = owner[col]
+            free = np.flatnonzero(~used[1:]) + 1
+            slack = cost[current - 1, free - 1] - u[current] - v[free]
+            better = slack < min_slack[free]
+            min_slack[free[better]] = slack[better]
+            way[free[better]] = col
+            next_col = free[np.argmin(min_slack[free])]
+            delta = min_slack[next_col]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_slack[~used] -= delta
+            col = next_col
+            if owner[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            owner[col] = owner[previous]
+            col = previous
 
-def match_image_by_ocr(name: str, images: List[Path]) -> int | None:
+    pairs = [(int(owner[col]) - 1, col - 1) for col in range(1, m + 1) if owner[col]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+def match_image_by_ocr(name: str, images: List[Path], ocr_cache: "OcrCache") -> tuple[int, float] | None:
     if not pytesseract or not Image:
         return None
 
@@ -154,33 +525,366 @@ def match_image_by_ocr(name: str, images: List[Path]) -> int | None:
     if not target:
         return None
 
+    texts = ocr_cache.texts_for(images)
+
     best_idx: int | None = None
     best_score = 0.0
 
     for idx, candidate in enumerate(images):
-        try:
-            with Image.open(candidate) as img:
-                text = pytesseract.image_to_string(img, lang="chi_tra+eng")
-        except Exception:
-            continue
-
-        normalized = normalize_text(text)
+        normalized = normalize_text(texts.get(candidate))
         if not normalized:
             continue
 
         if target in normalized:
-            return idx
+            return idx, 1.0
 
         score = SequenceMatcher(None, target, normalized).ratio()
         if score > best_score:
             best_score = score
             best_idx = idx
 
-    if best_idx is not None and best_score >= 0.45:
-        return best_idx
+    if best_idx is not None and best_score >= OCR_MATCH_THRESHOLD:
+        return best_idx, best_score
     return None
 
 
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ocr_image(path: str) -> str | None:
+    """Run tesseract on one image; returns None when OCR itself failed."""
+    try:
+        with Image.open(path) as img:
+            return pytesseract.image_to_string(img, lang=OCR_LANG)
+    except Exception:
+        return None
+
+
+def perceptual_hashes(path: str) -> tuple[int, int] | None:
+    """64-bit average hash and difference hash of one image, or None when unreadable."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as original:
+            gray = ImageOps.exif_transpose(original).convert("L")
+        average = np.asarray(gray.resize((8, 8), Image.Resampling.BILINEAR), dtype=np.float64)
+        gradient = np.asarray(gray.resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    except Exception:
+        return None
+    ahash_bits = (average > average.mean()).flatten()
+    dhash_bits = (gradient[:, 1:] > gradient[:, :-1]).flatten()
+    return bits_to_int(ahash_bits), bits_to_int(dhash_bits)
+
+
+def bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes for radius queries in Hamming space."""
+
+    def __init__(self) -> None:
+        self.root: tuple[int, List[Any], dict[int, Any]] | None = None
+
+    def add(self, key: int, item: Any) -> None:
+        if self.root is None:
+            self.root = (key, [item], {})
+            return
+        node = self.root
+        while True:
+            node_key, items, children = node
+            distance = hamming(key, node_key)
+            if distance == 0:
+                items.append(item)
+                return
+            if distance not in children:
+                children[distance] = (key, [item], {})
+                return
+            node = children[distance]
+
+    def search(self, key: int, radius: int) -> List[tuple[int, Any]]:
+        found: List[tuple[int, Any]] = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_key, items, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= radius:
+                found.extend((distance, item) for item in items)
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+def find_duplicate_images(hashes: dict[Path, tuple[int, int]], sizes: dict[Path, int]) -> dict[Path, List[Path]]:
+    """
+    Cluster near-identical photos (dHash and aHash both within their radius).
+    Returns canonical image -> duplicates; the largest file in a cluster is kept.
+    """
+    tree = BKTree()
+    for path, (_, dhash) in hashes.items():
+        tree.add(dhash, path)
+
+    parent = {path: path for path in hashes}
+
+    def root(path: Path) -> Path:
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    for path, (ahash, dhash) in hashes.items():
+        for _, other in tree.search(dhash, DHASH_RADIUS):
+            if other != path and hamming(ahash, hashes[other][0]) <= AHASH_RADIUS:
+                parent[root(other)] = root(path)
+
+    clusters: dict[Path, List[Path]] = {}
+    for path in hashes:
+        clusters.setdefault(root(path), []).append(path)
+
+    duplicates: dict[Path, List[Path]] = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda path: (-sizes.get(path, 0), path))
+        duplicates[members[0]] = members[1:]
+    return duplicates
+
+
+def run_in_pool(func: Callable[..., T], jobs: List[tuple[Any, ...]], workers: int | None) -> List[T]:
+    """Map ``func`` over argument tuples, in a process pool unless there is nothing to parallelize."""
+    if len(jobs) <= 1 or workers == 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+
+def render_variants(source: str, dest_dir: str, stem: str, url_prefix: str) -> List[dict[str, Any]]:
+    """
+    Write fixed-width derivatives of one photo (never upscaled) and return
+    their URLs and dimensions. Returns an empty list when the image is unreadable.
+    """
+    if Image is None:
+        return []
+    variants: List[dict[str, Any]] = []
+    try:
+        with Image.open(source) as original:
+            img = ImageOps.exif_transpose(original).convert("RGB")
+        width, height = img.size
+        for target in sorted({min(size, width) for size in VARIANT_WIDTHS}):
+            resized = img
+            if target != width:
+                resized = img.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+            for fmt, (pil_format, suffix, save_options) in VARIANT_FORMATS.items():
+                filename = f"{stem}-{target}{suffix}"
+                resized.save(Path(dest_dir) / filename, pil_format, **save_options)
+                variants.append(
+                    {"url": f"{url_prefix}/{filename}", "width": target, "height": resized.height, "format": fmt}
+                )
+    except Exception:
+        return []
+    return variants
+
+
+class OcrCache:
+    """
+    OCR text per image, computed at most once per run and persisted on disk
+    as one file per image content hash so unchanged images are never re-read.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        workers: int | None = None,
+        hasher: Callable[[Path], str] = file_digest,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.hasher = hasher
+        self.seconds = 0.0
+        self._texts: dict[Path, str] = {}
+
+    def texts_for(self, images: Iterable[Path]) -> dict[Path, str]:
+        started = time.perf_counter()
+        try:
+            return self._texts_for(list(images))
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def _texts_for(self, images: List[Path]) -> dict[Path, str]:
+        misses: List[tuple[Path, str | None]] = []
+        for path in images:
+            if path in self._texts:
+                continue
+            digest = self._digest(path)
+            cached = self._load(digest)
+            if cached is None:
+                misses.append((path, digest))
+            else:
+                self._texts[path] = cached
+
+        if misses:
+            results = run_in_pool(ocr_image, [(str(path),) for path, _ in misses], self.workers)
+            for (path, digest), text in zip(misses, results):
+                if text is not None:
+                    self._store(digest, text)
+                self._texts[path] = text or ""
+
+        return {path: self._texts.get(path, "") for path in images}
+
+    def _digest(self, path: Path) -> str | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            return self.hasher(path)
+        except OSError:
+            return None
+
+    def _load(self, digest: str | None) -> str | None:
+        if digest is None or self.cache_dir is None:
+            return None
+        try:
+            return (self.cache_dir / f"{digest}.txt").read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _store(self, digest: str | None, text: str) -> None:
+        if digest is None or self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self.cache_dir / f"{digest}.txt"
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, target)
+
+
+class ImportManifest:
+    """
+    Content hashes recorded by the previous import run. File hashes reuse the
+    stored digest while size and mtime are unchanged, so an untouched tree is
+    fingerprinted from ``stat`` calls alone.
+    """
+
+    VERSION = 1
+    SECTIONS = ("files", "locations", "entries", "copies", "variants", "phashes")
+
+    def __init__(self, path: Path | None, root: Path, data: dict[str, Any] | None = None) -> None:
+        self.path = path
+        self.root = root
+        data = data if data and data.get("version") == self.VERSION else {}
+        self.files: dict[str, dict[str, Any]] = data.get("files", {})
+        self.locations: dict[str, str] = data.get("locations", {})
+        self.entries: dict[str, str] = data.get("entries", {})
+        self.copies: dict[str, str] = data.get("copies", {})
+        self.variants: dict[str, dict[str, Any]] = data.get("variants", {})
+        self.phashes: dict[str, List[str]] = data.get("phashes", {})
+        # Keys written during this run, per section, so a worker can hand back only those.
+        self.dirty: dict[str, set[str]] = {section: set() for section in self.SECTIONS}
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> "ImportManifest":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        return cls(path, root, data)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "files": self.files,
+            "locations": self.locations,
+            "entries": self.entries,
+            "copies": self.copies,
+            "variants": self.variants,
+            "phashes": self.phashes,
+        }
+
+    def record(self, section: str, key: str, value: Any) -> None:
+        getattr(self, section)[key] = value
+        self.dirty[section].add(key)
+
+    def changes(self) -> dict[str, Any]:
+        """Only the records written since this manifest was loaded."""
+        return {
+            section: {key: getattr(self, section)[key] for key in keys} for section, keys in self.dirty.items()
+        }
+
+    def merge(self, changes: dict[str, Any]) -> None:
+        """Fold in the records a worker process wrote; untouched keys keep the parent's values."""
+        for section in self.SECTIONS:
+            for key, value in changes.get(section, {}).items():
+                self.record(section, key, value)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.as_dict(), ensure_ascii=False, sort_keys=True, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def file_hash(self, path: Path) -> str:
+        key = self._key(path)
+        stat = path.stat()
+        record = self.files.get(key)
+        if record and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+            return record["sha256"]
+        digest = file_digest(path)
+        self.record("files", key, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest})
+        return digest
+
+    def fingerprint(self, paths: Iterable[Path]) -> str:
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            digest.update(f"{self._key(path)}:{self.file_hash(path)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _key(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(self.root).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+
+def upsert_sweets(rows: List[Sweet], batch_size: int = 500) -> int:
+    """
+    Insert or update sweets keyed on (name, location) with one multi-row
+    upsert per batch inside a single transaction. Later rows win on duplicates,
+    matching the previous update_or_create behaviour.
+    """
+    unique_rows = list({(row.name, row.location_id): row for row in rows}.values())
+    if not unique_rows:
+        return 0
+    # MySQL's ON DUPLICATE KEY UPDATE cannot name a conflict target.
+    unique_fields = UPSERT_UNIQUE_FIELDS if connection.features.supports_update_conflicts_with_target else None
+    with transaction.atomic():
+        Sweet.objects.bulk_create(
+            unique_rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=UPSERT_UPDATE_FIELDS,
+        )
+    return len(unique_rows)
+
+
+def entry_hash(fields: dict[str, Any]) -> str:
+    encoded = json.dumps(fields, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
 def normalize_text(value: str | None) -> str:
     if not value:
         return ""
@@ -189,133 +893,572 @@ def normalize_text(value: str | None) -> str:
     return normalized.lower()
 
 
+class PhaseTimer:
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = dict.fromkeys(PHASE_LABELS, 0.0)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+
+class LocationImport:
+    """
+    Imports one location folder: streams its source files in fixed-size chunks,
+    matches images, copies changed files and upserts changed rows.
+    """
+
+    def __init__(
+        self,
+        location_dir: Path,
+        *,
+        public_root: Path,
+        manifest: ImportManifest,
+        ocr_cache: OcrCache,
+        log: Callable[[str, str], None],
+        dry_run: bool = False,
+        force: bool = False,
+        changed_only: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        image_workers: int | None = None,
+    ) -> None:
+        self.location_dir = location_dir
+        self.public_root = public_root
+        self.manifest = manifest
+        self.ocr_cache = ocr_cache
+        self.log = log
+        self.dry_run = dry_run
+        self.force = force
+        self.changed_only = changed_only
+        self.chunk_size = chunk_size
+        self.image_workers = image_workers
+
+        location_key = location_dir.name.strip()
+        self.slug, self.display_name = LOCATION_INFO.get(location_key, (safe_slug(location_key), location_key))
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self.processed = 0
+        self.unmatched: List[str] = []
+        self.changed: List[str] = []
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        self.timer = PhaseTimer()
+        self.aliases: dict[Path, List[Path]] = {}
+        self.canonical: dict[Path, Path] = {}
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "stats": self.stats,
+            "processed": self.processed,
+            "unmatched": self.unmatched,
+            "changed": self.changed,
+            "rows_written": self.rows_written,
+            "write_seconds": self.write_seconds,
+            "timings": self.timer.seconds,
+        }
+
+    def run(self) -> "LocationImport":
+        location_dir = self.location_dir
+        slug = self.slug
+        with self.timer.phase("write"):
+            location, _ = Location.objects.get_or_create(slug=slug, defaults={"name": self.display_name})
+
+        source_files = sorted(p for p in location_dir.iterdir() if p.suffix.lower() in SOURCE_EXTENSIONS)
+        if not source_files:
+            self.log("warning", f"[匯入] {location_dir} 無文字檔或資料檔，跳過")
+            return self
+
+        image_queue: List[Path] = sorted(
+            [p for p in location_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+        )
+
+        with self.timer.phase("parse"):
+            fingerprint = self.manifest.fingerprint([*source_files, *image_queue])
+        known = sum(1 for key in self.manifest.entries if key.startswith(f"{slug}/"))
+        if (
+            not self.force
+            and self.manifest.locations.get(slug) == fingerprint
+            and known
+            and Sweet.objects.filter(location=location).count() >= known
+        ):
+            self.log("info", f"[匯入] {self.display_name} 來源檔案未變更，略過")
+            self.stats["skipped_locations"] += 1
+            self.stats["unchanged"] += known
+            self.processed += known
+            return self
+
+        with self.timer.phase("dedupe"):
+            image_queue = self.drop_duplicate_images(image_queue)
+
+        location_public_dir = self.public_root / slug
+        location_public_dir.mkdir(parents=True, exist_ok=True)
+
+        # Explicit image references are resolved while streaming. Only entries that must be
+        # matched by name (text files and feeds without an image column) are remembered, and
+        # they are matched in one pass so an early chunk cannot take a later entry's image.
+        pending: List[tuple[int, str, bool]] = []
+        taken: set[Path] = set()
+        total = 0
+        with self.timer.phase("parse"):
+            for position, (entry, structured, image_column) in enumerate(
+                self.iter_entries(source_files, report=False)
+            ):
+                total += 1
+                explicit = self.explicit_image(entry)
+                if explicit is not None:
+                    taken.add(explicit)
+                elif not image_column:
+                    pending.append((position, entry["name"], not structured))
+        if not total:
+            self.log("warning", f"[匯入] {location_dir} 文字格式無法解析，跳過")
+            return self
+        matches = self.match_location(pending, [image for image in image_queue if image not in taken])
+
+        offset = 0
+        chunks = chunked(self.iter_entries(source_files), self.chunk_size)
+        while True:
+            with self.timer.phase("parse"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            entries = [entry for entry, _, _ in chunk]
+            chunk_matches = []
+            for position, entry in enumerate(entries, start=offset):
+                explicit = self.explicit_image(entry)
+                if explicit is not None:
+                    chunk_matches.append(ImageMatch(explicit, 1.0, "explicit"))
+                else:
+                    chunk_matches.append(matches.get(position, ImageMatch(None, 0.0, "none")))
+            self.import_chunk(entries, chunk_matches, location, location_public_dir)
+            offset += len(entries)
+
+        if not self.dry_run:
+            self.manifest.record("locations", slug, fingerprint)
+        return self
+
+    def drop_duplicate_images(self, images: List[Path]) -> List[Path]:
+        """Collapse re-encoded/resized copies so each photo is matched, OCR'd and copied once."""
+        hashes: dict[Path, tuple[int, int]] = {}
+        missing: List[tuple[Path, str]] = []
+        for path in images:
+            digest = self.manifest.file_hash(path)
+            recorded = self.manifest.phashes.get(digest)
+            if recorded:
+                hashes[path] = (int(recorded[0], 16), int(recorded[1], 16))
+            else:
+                missing.append((path, digest))
+
+        computed = run_in_pool(perceptual_hashes, [(str(path),) for path, _ in missing], self.image_workers)
+        for (path, digest), result in zip(missing, computed):
+            if result is None:
+                continue
+            hashes[path] = result
+            self.manifest.record("phashes", digest, [f"{result[0]:016x}", f"{result[1]:016x}"])
+
+        sizes = {path: path.stat().st_size for path in hashes}
+        duplicates = find_duplicate_images(hashes, sizes)
+        dropped: set[Path] = set()
+        for keep, copies in duplicates.items():
+            self.aliases[keep] = copies
+            for copy in copies:
+                self.canonical[copy] = keep
+            dropped.update(copies)
+            self.stats["duplicates"] += len(copies)
+            listing = ", ".join(copy.name for copy in copies)
+            self.log("warning", f"[匯入] 重複圖片：{listing} 與 {keep.name} 相同，僅處理 {keep.name}")
+        return [path for path in images if path not in dropped]
+
+    def iter_entries(
+        self, source_files: List[Path], report: bool = True
+    ) -> Iterator[tuple[dict[str, str], bool, bool]]:
+        """Yield ``(entry, structured, image_column)``; ``report`` counts and logs invalid rows.
+
+        ``image_column`` is set for feed rows that carry an image column, even an empty one.
+        """
+        for path in source_files:
+            if path.suffix.lower() == ".txt":
+                with path.open(encoding="utf-8") as handle:
+                    for entry in iter_text_entries(handle):
+                        yield entry, False, False
+                continue
+
+            for position, row in enumerate(iter_structured_rows(path), start=1):
+                entry = map_structured_row(row) if row is not None else None
+                errors = validate_entry(entry) if entry is not None else ["無法解析"]
+                if errors:
+                    if report:
+                        self.stats["invalid"] += 1
+                        self.log("warning", f"[匯入] {path.name} 第 {position} 筆資料略過：{'；'.join(errors)}")
+                    continue
+                yield entry, True, any(str(key).strip() in IMAGE_COLUMNS for key in row if key is not None)
+
+    def explicit_image(self, entry: dict[str, str]) -> Path | None:
+        image = entry.get("image")
+        if image:
+            candidate = (self.location_dir / image).resolve()
+            if candidate.is_file():
+                return self.canonical.get(candidate, candidate)
+        return None
+
+    def match_location(
+        self,
+        pending: List[tuple[int, str, bool]],
+        image_queue: List[Path],
+    ) -> dict[int, ImageMatch]:
+        """Match the ``(position, name, fallback)`` entries to the unclaimed images in one pass.
+
+        Feed rows are never given a queue-order guess; their images are named in the feed.
+        """
+        if not pending:
+            return {}
+        ocr_before = self.ocr_cache.seconds
+        with self.timer.phase("match"):
+            found = match_images(
+                [name for _, name, _ in pending],
+                image_queue,
+                self.ocr_cache,
+                self.aliases,
+                fallback=[allowed for _, _, allowed in pending],
+            )
+        ocr_spent = self.ocr_cache.seconds - ocr_before
+        self.timer.seconds["match"] -= ocr_spent
+        self.timer.seconds["ocr"] += ocr_spent
+        return {position: match for (position, _, _), match in zip(pending, found)}
+
+    def import_chunk(
+        self,
+        entries: List[dict[str, str]],
+        matches: List[ImageMatch],
+        location: Location,
+        location_public_dir: Path,
+    ) -> None:
+        slug = self.slug
+        display_name = self.display_name
+        manifest = self.manifest
+
+        names = [entry["name"] for entry in entries]
+        with self.timer.phase("write"):
+            existing_names = set(
+                Sweet.objects.filter(location=location, name__in=names).values_list("name", flat=True)
+            )
+
+        images: dict[int, tuple[str, str]] = {}
+        variant_jobs: List[tuple[int, tuple[str, str, str, str]]] = []
+        for idx, entry in enumerate(entries):
+            name = entry["name"]
+            image_path = matches[idx].image
+            if image_path is None:
+                self.log("warning", f"[匯入] {name} 在 {self.location_dir} 無對應圖片")
+                self.unmatched.append(name)
+                continue
+
+            stem = safe_slug(name)
+            dest_filename = f"{stem}{image_path.suffix.lower() or '.jpg'}"
+            dest_path = location_public_dir / dest_filename
+            dest_relative = f"/sweets/{slug}/{dest_filename}"
+            with self.timer.phase("copy"):
+                source_hash = manifest.file_hash(image_path)
+                needs_copy = (
+                    self.force or not dest_path.exists() or manifest.copies.get(dest_relative) != source_hash
+                )
+                if needs_copy and not self.dry_run:
+                    shutil.copy2(image_path, dest_path)
+                    manifest.record("copies", dest_relative, source_hash)
+            if needs_copy:
+                self.stats["copied"] += 1
+            if needs_copy or not self.changed_only:
+                self.log("info", f"[匯入] {display_name}-{name} 圖片已儲存為 {dest_filename}")
+            images[idx] = (dest_relative, source_hash)
+
+            recorded = manifest.variants.get(dest_relative, {})
+            fresh = recorded.get("source") == source_hash and all(
+                (self.public_root / variant["url"].removeprefix("/sweets/")).exists()
+                for variant in recorded.get("variants", [])
+            )
+            if not self.dry_run and (self.force or not fresh):
+                variant_jobs.append((idx, (str(image_path), str(location_public_dir), stem, f"/sweets/{slug}")))
+
+        with self.timer.phase("variants"):
+            rendered = run_in_pool(render_variants, [job for _, job in variant_jobs], self.image_workers)
+        for (idx, _), variants in zip(variant_jobs, rendered):
+            dest_relative, source_hash = images[idx]
+            manifest.record("variants", dest_relative, {"source": source_hash, "variants": variants})
+
+        pending_rows: List[Sweet] = []
+        pending_hashes: dict[str, str] = {}
+        for idx, entry in enumerate(entries):
+            match = matches[idx]
+            name = entry["name"]
+            self.processed += 1
+            dest_relative = images[idx][0] if idx in images else None
+            variants = manifest.variants.get(dest_relative, {}).get("variants", []) if dest_relative else []
+
+            fields = build_sweet_fields(entry, display_name, dest_relative, variants)
+            entry_key = f"{slug}/{name}"
+            fields_hash = entry_hash(fields)
+            exists = name in existing_names
+            if not self.force and exists and manifest.entries.get(entry_key) == fields_hash:
+                self.stats["unchanged"] += 1
+                if not self.changed_only:
+                    self.log("info", f"[匯入] {display_name}-{name} 資料未變更")
+                continue
+
+            self.stats["updated" if exists else "created"] += 1
+            self.changed.append(f"{display_name}-{name}")
+            if self.dry_run:
+                self.log(
+                    "info",
+                    f"[DRY RUN] {display_name} / {name}: image={dest_relative or 'N/A'} "
+                    f"match={match.method}({match.score:.2f}) "
+                    f"height={fields['height_cm']} weight={fields['weight_kg']} "
+                    f"prices=({fields['long_price']}/{fields['short_price']})",
+                )
+            else:
+                pending_rows.append(Sweet(name=name, location=location, update_time=timezone.now(), **fields))
+                pending_hashes[entry_key] = fields_hash
+
+        if not self.dry_run and pending_rows:
+            started = time.perf_counter()
+            with self.timer.phase("write"):
+                self.rows_written += upsert_sweets(pending_rows)
+            self.write_seconds += time.perf_counter() - started
+            for entry_key, fields_hash in pending_hashes.items():
+                manifest.record("entries", entry_key, fields_hash)
+
+
+def init_import_worker() -> None:
+    # Forked workers inherit a configured registry; spawned ones need setup.
+    django.setup()
+
+
+def import_location_in_worker(location_dir: Path, manifest_data: dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
+    """Process-pool entry point: import one location and return its output, summary and new manifest records."""
+    manifest = ImportManifest(None, config["source_dir"], manifest_data)
+    messages: List[tuple[str, str]] = []
+    ocr_cache = OcrCache(config["ocr_cache_dir"], workers=config["ocr_workers"], hasher=manifest.file_hash)
+    importer = LocationImport(
+        location_dir,
+        public_root=config["public_root"],
+        manifest=manifest,
+        ocr_cache=ocr_cache,
+        log=lambda level, message: messages.append((level, message)),
+        dry_run=config["dry_run"],
+        force=config["force"],
+        changed_only=config["changed_only"],
+        chunk_size=config["chunk_size"],
+        image_workers=config["image_workers"],
+    )
+    summary = importer.run().summary()
+    return {"messages": messages, "summary": summary, "manifest": manifest.changes()}
+
+
+def render_progress(done: int, total: int, label: str, width: int = 24) -> str:
+    filled = width * done // total if total else width
+    return f"[{'#' * filled}{'.' * (width - filled)}] {done}/{total} {label}"
+
+
 class Command(BaseCommand):
-    help = "Import sweet profiles from resource text files and images."
+    help = "Import sweet profiles from resource text files, CSV/JSONL/XLSX feeds and images."
 
     def add_arguments(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument(
             "--source-dir",
             type=str,
             default=str(Path("res").resolve()),
-            help="Directory containing location folders with text and images.",
+            help="Directory containing location folders with text/CSV/JSONL/XLSX sources and images.",
         )
         parser.add_argument(
             "--dry-run",
             action="store_true",
             help="Parse and report results without modifying the database or copying images.",
         )
+        parser.add_argument(
+            "--ocr-cache-dir",
+            type=str,
+            default=None,
+            help="Directory for cached OCR results keyed by image hash (defaults to <source-dir>/.ocr_cache).",
+        )
+        parser.add_argument(
+            "--ocr-workers",
+            type=int,
+            default=None,
+            help="Number of OCR worker processes (defaults to the CPU count).",
+        )
+        parser.add_argument(
+            "--manifest",
+            type=str,
+            default=None,
+            help="Path of the import manifest with source hashes (defaults to <source-dir>/.import_manifest.json).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Ignore the manifest and re-copy images and rewrite every row.",
+        )
+        parser.add_argument(
+            "--changed-only",
+            action="store_true",
+            help="Only report entries and images that changed since the previous import.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of entries matched and written per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of locations imported in parallel worker processes.",
+        )
+        parser.add_argument(
+            "--image-workers",
+            type=int,
+            default=None,
+            help="Number of processes rendering resized image variants (defaults to the CPU count).",
+        )
 
     def handle(self, *args, **options):
         source_dir = Path(options["source_dir"]).resolve()
         dry_run: bool = options["dry_run"]
+        changed_only: bool = options["changed_only"]
 
         if not source_dir.exists():
             raise CommandError(f"Source directory {source_dir} does not exist.")
 
-        repo_root = Path(__file__).resolve().parents[5]
-        public_root = repo_root / "apps" / "web" / "public" / "sweets"
-        public_root.mkdir(parents=True, exist_ok=True)
+        if options["ocr_workers"] is not None and options["ocr_workers"] < 1:
+            raise CommandError("--ocr-workers must be at least 1.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if options["image_workers"] is not None and options["image_workers"] < 1:
+            raise CommandError("--image-workers must be at least 1.")
 
-        imported: List[str] = []
-        unmatched: List[str] = []
+        manifest_path = Path(options["manifest"] or source_dir / ".import_manifest.json").resolve()
+        manifest = ImportManifest.load(manifest_path, source_dir)
 
-        location_dirs = sorted(p for p in source_dir.iterdir() if p.is_dir())
-        total_locations = len(location_dirs)
-        for location_index, location_dir in enumerate(location_dirs, start=1):
-            self.stdout.write(f"[匯入] 地區 {location_dir.name} ({location_index}/{total_locations})")
-            location_key = location_dir.name.strip()
-            slug, display_name = LOCATION_INFO.get(location_key, (safe_slug(location_key), location_key))
+        ocr_cache_dir = Path(options["ocr_cache_dir"] or source_dir / ".ocr_cache").resolve()
+        ocr_cache = OcrCache(ocr_cache_dir, workers=options["ocr_workers"], hasher=manifest.file_hash)
 
-            location, _ = Location.objects.get_or_create(slug=slug, defaults={"name": display_name})
+        repo_root = Path(__file__).resolve().parents[5]
+        public_root = repo_root / "apps" / "web" / "public" / "sweets"
+        public_root.mkdir(parents=True, exist_ok=True)
 
-            text_files = list(location_dir.glob("*.txt"))
-            if not text_files:
-                self.stdout.write(self.style.WARNING(f"[匯入] {location_dir} 無文字檔，跳過"))
-                continue
+        workers: int = options["workers"]
+        ocr_workers = options["ocr_workers"]
+        image_workers = options["image_workers"]
+        if workers > 1:
+            share = max(1, (os.cpu_count() or 1) // workers)
+            ocr_workers = share if ocr_workers is None else ocr_workers
+            image_workers = share if image_workers is None else image_workers
+        config = {
+            "source_dir": source_dir,
+            "public_root": public_root,
+            "ocr_cache_dir": ocr_cache_dir,
+            "ocr_workers": ocr_workers,
+            "image_workers": image_workers,
+            "dry_run": dry_run,
+            "force": options["force"],
+            "changed_only": changed_only,
+            "chunk_size": options["chunk_size"],
+        }
 
-            text_content = "\n\n".join(file.read_text(encoding="utf-8") for file in text_files)
-            entries = list(parse_entries(text_content))
-            if not entries:
-                self.stdout.write(self.style.WARNING(f"[匯入] {location_dir} 文字格式無法解析，跳過"))
-                continue
+        processed = 0
+        unmatched: List[str] = []
+        changed: List[str] = []
+        stats = dict.fromkeys(STAT_KEYS, 0)
+        timings: dict[str, float] = dict.fromkeys(PHASE_LABELS, 0.0)
+        rows_written = 0
+        write_seconds = 0.0
+        started = time.perf_counter()
 
-            image_queue: List[Path] = sorted(
-                [p for p in location_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
-            )
+        def merge(summary: dict[str, Any]) -> None:
+            nonlocal processed, rows_written, write_seconds
+            processed += summary["processed"]
+            unmatched.extend(summary["unmatched"])
+            changed.extend(summary["changed"])
+            rows_written += summary["rows_written"]
+            write_seconds += summary["write_seconds"]
+            for key, value in summary["stats"].items():
+                stats[key] += value
+            for key, value in summary["timings"].items():
+                timings[key] += value
 
-            location_public_dir = public_root / slug
-            location_public_dir.mkdir(parents=True, exist_ok=True)
-
-            for idx, entry in enumerate(entries, start=1):
-                name = entry["name"]
-                ascii_slug = safe_slug(name)
-                before = len(image_queue)
-                image_path = select_image(name, image_queue)
-                after = len(image_queue)
-                if image_path is not None and before == after:
-                    self.stdout.write(self.style.WARNING(f"[匯入] {name} 圖片配對異常，仍保留於佇列"))
-
-                dest_relative = None
-                if image_path is not None:
-                    dest_filename = f"{ascii_slug}{image_path.suffix.lower() or '.jpg'}"
-                    dest_path = location_public_dir / dest_filename
-                    dest_relative = f"/sweets/{slug}/{dest_filename}"
-                    if not dry_run:
-                        shutil.copy2(image_path, dest_path)
-                    self.stdout.write(f"[匯入] {display_name}-{name} 圖片已儲存為 {dest_filename}")
-                else:
-                    self.stdout.write(self.style.WARNING(f"[匯入] {name} 在 {location_dir} 無對應圖片"))
-                    unmatched.append(name)
-
-                description = entry.get("raw_description", "")
-                nationality = entry.get("nationality", "")
-                age_text = entry.get("age_text", "")
-                height_cm = parse_int(entry.get("height_cm"))
-                weight_kg = parse_int(entry.get("weight_kg"))
-                cup = entry.get("cup", "")
-                environment = entry.get("environment", "")
-                long_duration = parse_int(entry.get("long_duration_minutes"))
-                short_duration = parse_int(entry.get("short_duration_minutes"))
-                service_type = entry.get("service_type", "")
-                long_price = parse_int(entry.get("long_price"))
-                short_price = parse_int(entry.get("short_price"))
-                tag_parts = [display_name, service_type, nationality]
-                tag = " ".join(part for part in tag_parts if part)
-
-                defaults = {
-                    "description": description,
-                    "image_url": dest_relative or "",
-                    "tag": tag,
-                    "nationality": nationality,
-                    "age_text": age_text,
-                    "height_cm": height_cm,
-                    "weight_kg": weight_kg,
-                    "cup": cup,
-                    "environment": environment,
-                    "long_duration_minutes": long_duration,
-                    "short_duration_minutes": short_duration,
-                    "service_type": service_type,
-                    "long_price": long_price,
-                    "short_price": short_price,
-                    "update_time": timezone.now(),
+        location_dirs = sorted(p for p in source_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+        total_locations = len(location_dirs)
+        if workers == 1:
+            for location_index, location_dir in enumerate(location_dirs, start=1):
+                self.stdout.write(f"[匯入] 地區 {location_dir.name} ({location_index}/{total_locations})")
+                importer = LocationImport(
+                    location_dir,
+                    public_root=public_root,
+                    manifest=manifest,
+                    ocr_cache=ocr_cache,
+                    log=self.log,
+                    dry_run=dry_run,
+                    force=options["force"],
+                    changed_only=changed_only,
+                    chunk_size=options["chunk_size"],
+                    image_workers=image_workers,
+                )
+                merge(importer.run().summary())
+                self.progress(location_index, total_locations, location_dir.name)
+        else:
+            # Workers open their own database connections; never share the parent's socket.
+            connections.close_all()
+            manifest_data = manifest.as_dict()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_import_worker) as pool:
+                futures = {
+                    pool.submit(import_location_in_worker, location_dir, manifest_data, config): location_dir
+                    for location_dir in location_dirs
                 }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    location_dir = futures[future]
+                    outcome = future.result()
+                    self.stdout.write(f"[匯入] 地區 {location_dir.name} 完成")
+                    for level, message in outcome["messages"]:
+                        self.log(level, message)
+                    merge(outcome["summary"])
+                    manifest.merge(outcome["manifest"])
+                    self.progress(done, total_locations, location_dir.name)
 
-                if dry_run:
-                    self.stdout.write(
-                        f"[DRY RUN] {display_name} / {name}: image={dest_relative or 'N/A'} "
-                        f"height={height_cm} weight={weight_kg} prices=({long_price}/{short_price})"
-                    )
-                else:
-                    Sweet.objects.update_or_create(
-                        name=name,
-                        location=location,
-                        defaults=defaults,
-                    )
-                imported.append(f"{display_name}-{name}")
+        if not dry_run:
+            manifest.save()
 
         if unmatched:
-            missing = ", ".join(unmatched)
+            missing = ", ".join(unmatched[:50])
+            if len(unmatched) > 50:
+                missing += f" …（共 {len(unmatched)} 筆）"
             self.stdout.write(self.style.WARNING(f"[匯入] 以下甜心無對應圖片：{missing}"))
-        self.stdout.write(self.style.SUCCESS(f"Processed {len(imported)} sweet profiles."))
+        if changed_only:
+            listing = ", ".join(changed) if changed else "無"
+            self.stdout.write(f"[匯入] 本次變更：{listing}")
+        self.stdout.write(
+            f"[匯入] 新增 {stats['created']} / 更新 {stats['updated']} / 未變更 {stats['unchanged']} / "
+            f"複製圖片 {stats['copied']} / 重複圖片 {stats['duplicates']} / 無效資料 {stats['invalid']} / "
+            f"略過地區 {stats['skipped_locations']}"
+        )
+        if rows_written:
+            rate = rows_written / write_seconds if write_seconds > 0 else float(rows_written)
+            self.stdout.write(f"[匯入] 寫入 {rows_written} 筆，耗時 {write_seconds:.2f}s（{rate:.0f} rows/s）")
+        breakdown = " / ".join(f"{label} {timings[key]:.2f}s" for key, label in PHASE_LABELS.items())
+        self.stdout.write(f"[匯入] 耗時：{breakdown}（總計 {time.perf_counter() - started:.2f}s）")
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} sweet profiles."))
+
+    def progress(self, done: int, total: int, label: str) -> None:
+        line = render_progress(done, total, label)
+        if self.stdout.isatty():
+            self.stdout.write(f"\r{line}", ending="\n" if done == total else "")
+            self.stdout.flush()
+        else:
+            self.stdout.write(line)
 
-        self.stdout.write(self.style.SUCCESS(f"Processed {len(imported)} sweet profiles."))
+    def log(self, level: str, message: str) -> None:
+        if level == "warning":
+            message = self.style.WARNING(message)
+        self.stdout.write(message)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from api.models import LineUser, RewardLog
+from api.services import create_reward_logs
+
+REPORT_HEADER = ("user_id", "stored_points", "ledger_points", "difference", "status")
+REPAIR_MODES = ("balance", "ledger")
+
+
+def in_range(queryset, field: str, lo: int, hi: int | None):
+    queryset = queryset.filter(**{f"{field}__gte": lo})
+    return queryset if hi is None else queryset.filter(**{f"{field}__lt": hi})
+
+
+def ledger_sums(lo: int, hi: int | None) -> Dict[int, int]:
+    return dict(
+        in_range(RewardLog.objects.all(), "user_id", lo, hi)
+        .values("user_id")
+        .annotate(total=Sum("delta"))
+        .order_by()
+        .values_list("user_id", "total")
+    )
+
+
+def repair_user(user_id: int, mode: str) -> Tuple[int, int] | None:
+    """Re-check one user under a row lock and fix the drift; returns the corrected pair."""
+    with transaction.atomic():
+        locked = LineUser.objects.select_for_update().filter(pk=user_id)
+        stored = locked.values_list("reward_points", flat=True).first()
+        if stored is None:
+            return None
+        ledger = RewardLog.objects.filter(user_id=user_id).aggregate(total=Sum("delta"))["total"] or 0
+        if stored == ledger:
+            return None
+        if mode == "balance":
+            LineUser.objects.filter(pk=user_id).update(reward_points=ledger, updated_at=timezone.now())
+        else:
+            create_reward_logs([RewardLog(user_id=user_id, delta=stored - ledger, reason="積分對帳調整")])
+        return stored, ledger
+
+
+def reconcile_range(lo: int, hi: int | None, repair: str | None) -> List[Tuple[Any, ...]]:
+    """Compare balances with GROUP BY ledger sums for user ids in [lo, hi)."""
+    sums = ledger_sums(lo, hi)
+    rows: List[Tuple[Any, ...]] = []
+    balances = in_range(LineUser.objects.all(), "id", lo, hi).order_by().values_list("id", "reward_points")
+    for user_id, stored in balances:
+        ledger = sums.pop(user_id, 0)
+        if stored == ledger:
+            continue
+        status = "mismatch"
+        if repair and repair_user(user_id, repair):
+            status = f"repaired_{repair}"
+        rows.append((user_id, stored, ledger, stored - ledger, status))
+    # Whatever is left belongs to logs whose user row no longer exists.
+    rows.extend((user_id, "", total, "", "orphan_logs") for user_id, total in sums.items())
+    return rows
+
+
+def reconcile_range_in_thread(bounds: Tuple[int, int | None], repair: str | None) -> List[Tuple[Any, ...]]:
+    try:
+        return reconcile_range(*bounds, repair)
+    finally:
+        connection.close()
+
+
+def id_ranges(chunk_size: int) -> Iterator[Tuple[int, int | None]]:
+    """Contiguous ``[lo, hi)`` user-id ranges holding about ``chunk_size`` users each.
+
+    Boundaries come from index seeks on ``user_tab.id``, so sparse id spaces cost nothing
+    extra. The first range starts at zero and the last is open ended, which keeps ledger
+    rows of deleted users inside some range.
+    """
+    lo = 0
+    while True:
+        after = LineUser.objects.filter(id__gte=lo).order_by("id").values_list("id", flat=True)
+        hi = next(iter(after[chunk_size : chunk_size + 1]), None)
+        yield lo, hi
+        if hi is None:
+            return
+        lo = hi
+
+
+class Command(BaseCommand):
+    help = "Check LineUser.reward_points against the RewardLog ledger and report (or repair) drift."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=5000, help="User ids compared per GROUP BY query.")
+        parser.add_argument("--workers", type=int, default=4, help="Ranges compared concurrently (own DB connections).")
+        parser.add_argument("--report", type=str, default="-", help="CSV report path ('-' writes to stdout).")
+        parser.add_argument(
+            "--repair",
+            choices=REPAIR_MODES,
+            default=None,
+            help="balance: set reward_points to the ledger sum; ledger: add a correcting RewardLog entry.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--chunk-size and --workers must be positive")
+
+        started = time.perf_counter()
+        ranges = list(id_ranges(options["chunk_size"]))
+        to_stdout = options["report"] == "-"
+        handle = self.stdout if to_stdout else open(options["report"], "w", encoding="utf-8", newline="")
+        counts: Dict[str, int] = {}
+        try:
+            writer = csv.writer(handle)
+            writer.writerow(REPORT_HEADER)
+            if options["workers"] == 1:
+                results = (reconcile_range(lo, hi, options["repair"]) for lo, hi in ranges)
+                self.write_results(writer, results, counts)
+            else:
+                connection.close()
+                with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                    results = executor.map(lambda bounds: reconcile_range_in_thread(bounds, options["repair"]), ranges)
+                    self.write_results(writer, results, counts)
+        finally:
+            if not to_stdout:
+                handle.close()
+
+        elapsed = time.perf_counter() - started
+        summary = "、".join(f"{status} {count}" for status, count in sorted(counts.items())) or "全部一致"
+        self.stderr.write(f"[reconcile] 檢查 {len(ranges)} 個區段：{summary}（{elapsed:.1f}s）")
+
+    def write_results(self, writer, results, counts: Dict[str, int]) -> None:
+        for rows in results:
+            for row in rows:
+                counts[row[-1]] = counts.get(row[-1], 0) + 1
+                writer.writerow(row)
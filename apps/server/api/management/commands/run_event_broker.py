@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import Set
+
+from django.core.management.base import BaseCommand
+
+from api.events import BROKER_SUBSCRIBE
+
+
+class Command(BaseCommand):
+    help = "Relay SSE events between processes (local stand-in for a pub/sub broker)."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.serve(options["host"], options["port"]))
+
+    async def serve(self, host: str, port: int) -> None:
+        # Connections that open with SUBSCRIBE receive every line; all others only publish.
+        listeners: Set[asyncio.StreamWriter] = set()
+
+        async def relay(line: bytes) -> None:
+            for writer in list(listeners):
+                try:
+                    writer.write(line)
+                    await writer.drain()
+                except ConnectionError:
+                    listeners.discard(writer)
+
+        async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                first = await reader.readline()
+                if first == BROKER_SUBSCRIBE:
+                    listeners.add(writer)
+                    await reader.read()
+                    return
+                line = first
+                while line:
+                    await relay(line)
+                    line = await reader.readline()
+            except ConnectionError:
+                pass
+            finally:
+                listeners.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(handle_connection, host, port)
+        self.stderr.write(f"[events] broker listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
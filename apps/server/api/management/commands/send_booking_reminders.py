@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api import reminders
+
+
+class Command(BaseCommand):
+    help = "Push LINE reminders for bookings starting within the next window."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--window-minutes",
+            type=int,
+            default=int(reminders.DEFAULT_REMINDER_WINDOW.total_seconds() // 60),
+            help="Remind bookings whose slot starts within this many minutes from now.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Bookings claimed per database round trip.")
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent LINE push requests.")
+        parser.add_argument("--loop", action="store_true", help="Keep running and dispatch every --interval seconds.")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds between dispatch rounds with --loop.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count due reminders without sending.")
+
+    def handle(self, *args, **options):
+        if options["window_minutes"] < 1 or options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--window-minutes, --batch-size and --workers must be positive")
+        window = timedelta(minutes=options["window_minutes"])
+
+        if options["dry_run"]:
+            due = reminders.due_reminders(timezone.now(), window).count()
+            self.stdout.write(f"[reminder] {due} 筆預約待提醒")
+            return
+
+        while True:
+            started = time.perf_counter()
+            stats = reminders.send_due_reminders(
+                window=window,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+            )
+            elapsed = time.perf_counter() - started
+            if stats["pushes"] or not options["loop"]:
+                self.stdout.write(
+                    f"[reminder] 已提醒 {stats['reminded']} 筆、失敗待重試 {stats['failed']} 筆、"
+                    f"放棄 {stats['dropped']} 筆，"
+                    f"共 {stats['pushes']} 次推播（{elapsed:.1f}s）"
+                )
+            if not options["loop"]:
+                break
+            close_old_connections()
+            time.sleep(max(0.0, options["interval"] - elapsed))
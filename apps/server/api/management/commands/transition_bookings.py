@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import services
+from api.models import Booking
+
+
+def read_ids(raw: str | None, path: str | None) -> list[int]:
+    values: list[str] = []
+    if raw:
+        values.extend(raw.split(","))
+    if path:
+        handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        with handle:
+            values.extend(line.strip() for line in handle)
+    try:
+        return [int(value) for value in values if value.strip()]
+    except ValueError as exc:
+        raise CommandError(f"Invalid booking id: {exc}") from exc
+
+
+class Command(BaseCommand):
+    help = "Move many bookings to CONFIRMED or CANCELLED and print an NDJSON report per booking."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--status",
+            required=True,
+            choices=list(services.BOOKING_TRANSITIONS),
+            help="Target booking status.",
+        )
+        parser.add_argument("--ids", type=str, default=None, help="Comma separated booking ids.")
+        parser.add_argument(
+            "--ids-file",
+            type=str,
+            default=None,
+            help="File with one booking id per line ('-' reads stdin).",
+        )
+        parser.add_argument(
+            "--from-status",
+            choices=[choice for choice, _ in Booking.Status.choices],
+            default=None,
+            help="Select every booking currently in this status instead of passing ids.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="Bookings locked and updated per transaction.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        ids = read_ids(options["ids"], options["ids_file"])
+        if options["from_status"]:
+            ids.extend(
+                Booking.objects.filter(status=options["from_status"])
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+        if not ids:
+            raise CommandError("No bookings selected; pass --ids, --ids-file or --from-status")
+
+        counts: dict[str, int] = {}
+        for row in services.transition_bookings(ids, options["status"], chunk_size=options["chunk_size"]):
+            counts[row["result"]] = counts.get(row["result"], 0) + 1
+            self.stdout.write(json.dumps(row))
+        self.stderr.write(f"[bookings] {json.dumps(counts)}")
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+def merge_duplicate_sweets(apps, schema_editor):
+    Sweet = apps.get_model("api", "Sweet")
+    Booking = apps.get_model("api", "Booking")
+    SweetReview = apps.get_model("api", "SweetReview")
+
+    duplicates = (
+        Sweet.objects.values("name", "location_id")
+        .annotate(total=models.Count("id"), keep_id=models.Min("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        extra_ids = list(
+            Sweet.objects.filter(name=row["name"], location_id=row["location_id"])
+            .exclude(id=row["keep_id"])
+            .values_list("id", flat=True)
+        )
+        Booking.objects.filter(sweet_id__in=extra_ids).update(sweet_id=row["keep_id"])
+        SweetReview.objects.filter(sweet_id__in=extra_ids).update(sweet_id=row["keep_id"])
+        Sweet.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_sweetreview"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_sweets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="sweet",
+            constraint=models.UniqueConstraint(fields=("name", "location"), name="sweet_name_location_uniq"),
+        ),
+    ]
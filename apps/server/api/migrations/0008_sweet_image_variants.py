@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_sweet_unique_name_location"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sweet",
+            name="image_variants",
+            field=models.JSONField(blank=True, db_column="image_variants", default=list),
+        ),
+    ]
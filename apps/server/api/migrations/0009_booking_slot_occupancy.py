@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_slots(apps, schema_editor):
+    Booking = apps.get_model("api", "Booking")
+
+    taken: set[tuple[int, object, str]] = set()
+    active = Booking.objects.filter(status__in=["PENDING", "CONFIRMED"]).order_by("created_at", "id")
+    for booking in active.iterator(chunk_size=1000):
+        slot_day = timezone.localdate(booking.date) if timezone.is_aware(booking.date) else booking.date.date()
+        key = (booking.sweet_id, slot_day, booking.time_slot)
+        booking.slot_day = slot_day
+        # Legacy double bookings keep their rows but only the earliest holds the slot.
+        booking.slot_active = True if key not in taken else None
+        taken.add(key)
+        booking.save(update_fields=["slot_day", "slot_active"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_sweet_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="slot_day",
+            field=models.DateField(blank=True, db_column="slot_day", null=True),
+        ),
+        migrations.AddField(
+            model_name="booking",
+            name="slot_active",
+            field=models.BooleanField(blank=True, db_column="slot_active", null=True),
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=models.UniqueConstraint(
+                fields=("sweet", "slot_day", "time_slot", "slot_active"),
+                name="booking_active_slot_uniq",
+            ),
+        ),
+    ]
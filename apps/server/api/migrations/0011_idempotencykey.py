@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_booking_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(db_column="idempotency_key", max_length=255)),
+                ("request_hash", models.CharField(db_column="request_hash", max_length=64)),
+                (
+                    "response_status",
+                    models.PositiveSmallIntegerField(blank=True, db_column="response_status", null=True),
+                ),
+                (
+                    "response_body",
+                    models.JSONField(
+                        blank=True,
+                        db_column="response_body",
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_column="created_at")),
+                ("expires_at", models.DateTimeField(db_column="expires_at", db_index=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_column="user_id",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="idempotency_keys",
+                        to="api.lineuser",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "idempotency_key_tab",
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "key"), name="idempotency_user_key_uniq"),
+                ],
+            },
+        ),
+    ]
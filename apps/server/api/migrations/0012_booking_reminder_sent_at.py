@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="reminder_sent_at",
+            field=models.DateTimeField(blank=True, db_column="reminder_sent_at", null=True),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["reminder_sent_at", "date"], name="booking_reminder_due_idx"),
+        ),
+    ]
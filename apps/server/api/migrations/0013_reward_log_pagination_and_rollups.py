@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    RewardLog = apps.get_model("api", "RewardLog")
+    RewardMonthlyRollup = apps.get_model("api", "RewardMonthlyRollup")
+
+    totals: dict[tuple[int, object], list[int]] = defaultdict(lambda: [0, 0, 0])
+    for user_id, created_at, delta in RewardLog.objects.values_list("user_id", "created_at", "delta").iterator(
+        chunk_size=2000
+    ):
+        month = timezone.localdate(created_at).replace(day=1)
+        entry = totals[(user_id, month)]
+        if delta >= 0:
+            entry[0] += delta
+        else:
+            entry[1] -= delta
+        entry[2] += 1
+
+    RewardMonthlyRollup.objects.bulk_create(
+        [
+            RewardMonthlyRollup(user_id=user_id, month=month, earned=earned, spent=spent, log_count=count)
+            for (user_id, month), (earned, spent, count) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_booking_reminder_sent_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rewardlog",
+            index=models.Index(fields=["user", "created_at", "id"], name="reward_log_user_created_idx"),
+        ),
+        migrations.CreateModel(
+            name="RewardMonthlyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("month", models.DateField(db_column="month")),
+                ("earned", models.IntegerField(db_column="earned", default=0)),
+                ("spent", models.IntegerField(db_column="spent", default=0)),
+                ("log_count", models.IntegerField(db_column="log_count", default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_column="updated_at")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_column="user_id",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reward_rollups",
+                        to="api.lineuser",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "reward_monthly_rollup_tab",
+                "ordering": ["-month"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "month"), name="reward_rollup_user_month_uniq"),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
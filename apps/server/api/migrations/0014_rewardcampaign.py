@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_reward_log_pagination_and_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RewardCampaign",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(db_column="name", max_length=255)),
+                ("delta", models.IntegerField(db_column="delta")),
+                ("reason", models.CharField(db_column="reason", max_length=255)),
+                ("filters", models.JSONField(blank=True, db_column="filters", default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("PENDING", "Pending"), ("RUNNING", "Running"), ("COMPLETED", "Completed")],
+                        db_column="status",
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("target_count", models.IntegerField(blank=True, db_column="target_count", null=True)),
+                ("processed_count", models.IntegerField(db_column="processed_count", default=0)),
+                ("last_user_id", models.BigIntegerField(db_column="last_user_id", default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_column="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, db_column="updated_at")),
+                ("completed_at", models.DateTimeField(blank=True, db_column="completed_at", null=True)),
+            ],
+            options={
+                "db_table": "reward_campaign_tab",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_rewardcampaign"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lineuser",
+            index=models.Index(fields=["reward_points", "id"], name="user_reward_points_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+TIME_SLOT_RE = re.compile(r"\s*(\d{1,2}):(\d{2})")
+
+
+def backfill_slot_start(apps, schema_editor):
+    Booking = apps.get_model("api", "Booking")
+    current = timezone.get_current_timezone()
+
+    # Only bookings that may still get a reminder need the exact slot time.
+    pending = Booking.objects.filter(status__in=["PENDING", "CONFIRMED"], reminder_sent_at__isnull=True)
+    for booking in pending.order_by("id").iterator(chunk_size=1000):
+        day = booking.slot_day or timezone.localdate(booking.date)
+        match = TIME_SLOT_RE.match(booking.time_slot or "")
+        try:
+            start = time(int(match.group(1)), int(match.group(2))) if match else None
+        except ValueError:
+            start = None
+        booking.slot_start = timezone.make_aware(datetime.combine(day, start), current) if start else booking.date
+        booking.save(update_fields=["slot_start"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_user_reward_points_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="slot_start",
+            field=models.DateTimeField(blank=True, db_column="slot_start", null=True),
+        ),
+        migrations.RunPython(backfill_slot_start, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="booking",
+            name="booking_reminder_due_idx",
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["reminder_sent_at", "slot_start"], name="booking_reminder_due_idx"),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
@@ -19,6 +20,9 @@ class LineUser(models.Model):
     class Meta:
         db_table = "user_tab"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["reward_points", "id"], name="user_reward_points_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.display_name or 'User'} ({self.line_user_id})"
@@ -61,6 +65,7 @@ class Sweet(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     image_url = models.URLField(max_length=1024, blank=True, db_column="image_url")
+    image_variants = models.JSONField(default=list, blank=True, db_column="image_variants")
     tag = models.CharField(max_length=255, blank=True, db_column="tag")
     nationality = models.CharField(max_length=255, blank=True, db_column="nationality")
     age_text = models.CharField(max_length=50, blank=True, db_column="age_text")
@@ -87,6 +92,9 @@ class Sweet(models.Model):
     class Meta:
         db_table = "sweet_tab"
         ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["name", "location"], name="sweet_name_location_uniq"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -97,6 +105,24 @@ class Sweet(models.Model):
         base = str(self.pk or 0).zfill(4)[-4:]
         return f"{prefix}{base}"
 
+    def image_url_for(self, min_width: int, image_format: str = "webp") -> str:
+        """Smallest resized variant at least ``min_width`` wide, falling back to the original image."""
+        variant = select_image_variant(self.image_variants, min_width, image_format)
+        return variant["url"] if variant else self.image_url
+
+
+def select_image_variant(variants: list[dict] | None, min_width: int, image_format: str) -> dict | None:
+    candidates = sorted(
+        (variant for variant in variants or [] if variant.get("format") == image_format and variant.get("url")),
+        key=lambda variant: variant.get("width") or 0,
+    )
+    if not candidates:
+        return None
+    for variant in candidates:
+        if (variant.get("width") or 0) >= min_width:
+            return variant
+    return candidates[-1]
+
 
 class SweetReview(models.Model):
     sweet = models.ForeignKey(
@@ -135,6 +161,8 @@ class Booking(models.Model):
         CONFIRMED = "CONFIRMED"
         CANCELLED = "CANCELLED"
 
+    ACTIVE_STATUSES = (Status.PENDING, Status.CONFIRMED)
+
     user = models.ForeignKey(
         LineUser,
         related_name="bookings",
@@ -153,12 +181,30 @@ class Booking(models.Model):
     time_slot = models.CharField(max_length=100, db_column="time_slot")
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     note = models.TextField(blank=True, null=True, db_column="note")
+    # Slot occupancy: slot_active is True while the booking holds its slot and NULL
+    # otherwise, so the unique constraint only collides between active bookings.
+    slot_day = models.DateField(null=True, blank=True, db_column="slot_day")
+    slot_active = models.BooleanField(null=True, blank=True, db_column="slot_active")
+    # When the slot begins: slot_day plus the leading HH:MM of time_slot, or date if it has none.
+    slot_start = models.DateTimeField(null=True, blank=True, db_column="slot_start")
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, db_column="reminder_sent_at")
     created_at = models.DateTimeField(auto_now_add=True, db_column="created_at")
     updated_at = models.DateTimeField(auto_now=True, db_column="updated_at")
 
     class Meta:
         db_table = "booking_tab"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="booking_user_created_idx"),
+            models.Index(fields=["user", "status", "created_at", "id"], name="booking_user_status_idx"),
+            models.Index(fields=["reminder_sent_at", "slot_start"], name="booking_reminder_due_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sweet", "slot_day", "time_slot", "slot_active"],
+                name="booking_active_slot_uniq",
+            ),
+        ]
 
 
 class RewardLog(models.Model):
@@ -176,3 +222,93 @@ class RewardLog(models.Model):
     class Meta:
         db_table = "reward_log_tab"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="reward_log_user_created_idx"),
+        ]
+
+
+class RewardMonthlyRollup(models.Model):
+    """
+    Per-user, per-month reward totals kept in step with every RewardLog insert.
+    """
+
+    user = models.ForeignKey(
+        LineUser,
+        related_name="reward_rollups",
+        on_delete=models.CASCADE,
+        db_column="user_id",
+        db_constraint=False,
+    )
+    month = models.DateField(db_column="month")
+    earned = models.IntegerField(default=0, db_column="earned")
+    spent = models.IntegerField(default=0, db_column="spent")
+    log_count = models.IntegerField(default=0, db_column="log_count")
+    updated_at = models.DateTimeField(auto_now=True, db_column="updated_at")
+
+    class Meta:
+        db_table = "reward_monthly_rollup_tab"
+        ordering = ["-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "month"], name="reward_rollup_user_month_uniq"),
+        ]
+
+    @property
+    def net(self) -> int:
+        return self.earned - self.spent
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(
+        LineUser,
+        related_name="idempotency_keys",
+        on_delete=models.CASCADE,
+        db_column="user_id",
+        db_constraint=False,
+    )
+    key = models.CharField(max_length=255, db_column="idempotency_key")
+    request_hash = models.CharField(max_length=64, db_column="request_hash")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True, db_column="response_status")
+    response_body = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder, db_column="response_body"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_column="created_at")
+    expires_at = models.DateTimeField(db_index=True, db_column="expires_at")
+
+    class Meta:
+        db_table = "idempotency_key_tab"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}:{self.key}"
+
+
+class RewardCampaign(models.Model):
+    """
+    Bulk point grant to a filtered set of users, applied in resumable user-id chunks.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING"
+        RUNNING = "RUNNING"
+        COMPLETED = "COMPLETED"
+
+    name = models.CharField(max_length=255, db_column="name")
+    delta = models.IntegerField(db_column="delta")
+    reason = models.CharField(max_length=255, db_column="reason")
+    filters = models.JSONField(default=dict, blank=True, db_column="filters")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_column="status")
+    target_count = models.IntegerField(null=True, blank=True, db_column="target_count")
+    processed_count = models.IntegerField(default=0, db_column="processed_count")
+    last_user_id = models.BigIntegerField(default=0, db_column="last_user_id")
+    created_at = models.DateTimeField(auto_now_add=True, db_column="created_at")
+    updated_at = models.DateTimeField(auto_now=True, db_column="updated_at")
+    completed_at = models.DateTimeField(null=True, blank=True, db_column="completed_at")
+
+    class Meta:
+        db_table = "reward_campaign_tab"
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.delta:+d})"
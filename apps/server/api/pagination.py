@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import List, Tuple, TypeVar
+
+from django.db.models import Model, Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+ModelT = TypeVar("ModelT", bound=Model)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+
+def parse_page_size(raw: str | None) -> int:
+    if not raw:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(raw)
+    except ValueError as exc:
+        raise ValueError("limit must be an integer") from exc
+    if size < 1:
+        raise ValueError("limit must be positive")
+    return min(size, MAX_PAGE_SIZE)
+
+
+def after_cursor(queryset: QuerySet[ModelT], cursor: str | None) -> QuerySet[ModelT]:
+    """Rows older than the cursor row, newest first."""
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset.order_by("-created_at", "-id")
+
+
+def paginate_newest_first(
+    queryset: QuerySet[ModelT],
+    *,
+    cursor: str | None,
+    limit: int,
+) -> Tuple[List[ModelT], str | None]:
+    """Keyset pagination over (created_at, id) descending.
+
+    Each page is one index range scan starting right after the cursor row, so deep pages
+    cost the same as the first one (unlike OFFSET pagination).
+    """
+    rows = list(after_cursor(queryset, cursor)[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.pk)
+
+
+def paginate_by_id(
+    queryset: QuerySet[ModelT],
+    *,
+    cursor: str | None,
+    limit: int,
+) -> Tuple[List[ModelT], str | None]:
+    """Keyset pagination over ascending ids, for lists shown in a stable catalog order."""
+    if cursor:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            last_id = int(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise InvalidCursorError("Invalid cursor") from exc
+        queryset = queryset.filter(id__gt=last_id)
+    rows = list(queryset.order_by("id")[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, base64.urlsafe_b64encode(str(rows[-1].pk).encode()).decode().rstrip("=")
@@ -1,6 +1,13 @@
+from __future__ import annotations
+
+import hmac
+
+from django.conf import settings
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import BasePermission
 
+OPERATOR_TOKEN_HEADER = "X-Operator-Token"
+
 
 class IsLineAuthenticated(BasePermission):
     """
@@ -14,3 +21,16 @@ class IsLineAuthenticated(BasePermission):
         if not user or not getattr(user, "is_authenticated", False):
             raise AuthenticationFailed(self.message)
         return True
+
+
+class IsOperator(BasePermission):
+    """
+    Grants access to back-office endpoints when the request carries OPERATOR_API_TOKEN.
+    """
+
+    message = "Operator token required"
+
+    def has_permission(self, request, view) -> bool:
+        expected = settings.OPERATOR_API_TOKEN
+        provided = request.headers.get(OPERATOR_TOKEN_HEADER, "")
+        return bool(expected) and hmac.compare_digest(provided.encode(), expected.encode())
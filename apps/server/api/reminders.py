@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Mapping
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from linebot.client import PUSH_MAX_MESSAGES, RETRY_STATUSES, client
+from linebot.messages import build_booking_reminder_message
+
+from .models import Booking
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REMINDER_WINDOW = timedelta(hours=2)
+REMINDER_RETRY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "night:booking-reminder")
+
+PushFunc = Callable[..., None]
+
+
+def due_reminders(now: datetime, window: timedelta) -> QuerySet[Booking]:
+    # Range scan on booking_reminder_due_idx: reminder_sent_at IS NULL, then slot_start in the window.
+    return Booking.objects.filter(
+        reminder_sent_at__isnull=True,
+        slot_start__gte=now,
+        slot_start__lt=now + window,
+        status__in=Booking.ACTIVE_STATUSES,
+    )
+
+
+def claim_due_reminders(*, now: datetime, window: timedelta, limit: int) -> List[Dict[str, Any]]:
+    """Mark up to ``limit`` due bookings as reminded and return the rows to notify.
+
+    The marker is committed before anything is pushed, so a crash or restart can never send
+    the same reminder twice. SKIP LOCKED lets parallel dispatchers claim disjoint batches.
+    """
+    with transaction.atomic():
+        ids = list(
+            due_reminders(now, window)
+            .select_for_update(skip_locked=True)
+            .order_by("slot_start")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Booking.objects.filter(id__in=ids).update(reminder_sent_at=now)
+    return list(
+        Booking.objects.filter(id__in=ids)
+        .order_by("user_id", "slot_start")
+        .values("id", "slot_start", "time_slot", "user__line_user_id", "sweet__name")
+    )
+
+
+def group_pushes(rows: List[Dict[str, Any]]) -> List[tuple[str, List[int], List[Mapping]]]:
+    """Pack each user's reminders into pushes of at most five messages."""
+    pushes: List[tuple[str, List[int], List[Mapping]]] = []
+    for row in rows:
+        to = row["user__line_user_id"]
+        if not pushes or pushes[-1][0] != to or len(pushes[-1][1]) == PUSH_MAX_MESSAGES:
+            pushes.append((to, [], []))
+        when = timezone.localtime(row["slot_start"]).strftime("%m/%d")
+        pushes[-1][1].append(row["id"])
+        pushes[-1][2].append(build_booking_reminder_message(row["sweet__name"], when, row["time_slot"]))
+    return pushes
+
+
+def retry_key_for(booking_ids: List[int]) -> str:
+    return str(uuid.uuid5(REMINDER_RETRY_NAMESPACE, ",".join(map(str, sorted(booking_ids)))))
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Throttling, LINE server errors and network failures are worth another round.
+
+    Other HTTP errors (e.g. 400 for a user who blocked the bot) will never succeed.
+    """
+    response = getattr(exc, "response", None)
+    return response is None or response.status_code in RETRY_STATUSES
+
+
+def send_due_reminders(
+    *,
+    window: timedelta = DEFAULT_REMINDER_WINDOW,
+    batch_size: int = 500,
+    workers: int = 8,
+    push: PushFunc | None = None,
+    now: datetime | None = None,
+) -> Dict[str, int]:
+    push = push or client.push_message
+    now = now or timezone.now()
+    stats = {"reminded": 0, "failed": 0, "dropped": 0, "pushes": 0}
+
+    def deliver(job: tuple[str, List[int], List[Mapping]]) -> tuple[List[int], List[int]]:
+        to, booking_ids, messages = job
+        try:
+            push(to, messages, retry_key=retry_key_for(booking_ids))
+            return [], []
+        except Exception as exc:  # noqa: BLE001 - one failed push must not stop the batch
+            if is_retryable(exc):
+                logger.exception("Reminder push failed for bookings %s, will retry", booking_ids)
+                return booking_ids, []
+            # The claim stays in place so a permanently failing recipient is not pushed again.
+            logger.error("Reminder push rejected for bookings %s, giving up: %s", booking_ids, exc)
+            return [], booking_ids
+
+    retry: List[int] = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                rows = claim_due_reminders(now=now, window=window, limit=batch_size)
+                if not rows:
+                    break
+                pushes = group_pushes(rows)
+                failed = dropped = 0
+                for retry_ids, dropped_ids in executor.map(deliver, pushes):
+                    retry.extend(retry_ids)
+                    failed += len(retry_ids)
+                    dropped += len(dropped_ids)
+                stats["pushes"] += len(pushes)
+                stats["reminded"] += len(rows) - failed - dropped
+                stats["failed"] += failed
+                stats["dropped"] += dropped
+                if len(rows) < batch_size:
+                    break
+    finally:
+        if retry:
+            # Released only once the run is over, so later batches are not starved by
+            # re-claiming them; the deterministic retry key stops LINE from delivering
+            # twice if a push did land before the error surfaced.
+            Booking.objects.filter(id__in=retry).update(reminder_sent_at=None)
+    return stats
@@ -3,7 +3,7 @@ from __future__ import annotations
 from django.db.models import Avg, Count
 from rest_framework import serializers
 
-from .models import Booking, LineUser, Location, RewardLog, Sweet, SweetReview
+from .models import Booking, LineUser, Location, RewardLog, RewardMonthlyRollup, Sweet, SweetReview
 
 
 class LineUserSerializer(serializers.ModelSerializer):
@@ -18,9 +18,13 @@ class LocationSerializer(serializers.ModelSerializer):
         fields = ["id", "slug", "name"]
 
 
+DEFAULT_CARD_IMAGE_WIDTH = 480
+
+
 class SweetSerializer(serializers.ModelSerializer):
     location = LocationSerializer(read_only=True)
     code = serializers.SerializerMethodField()
+    preview_image_url = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
 
@@ -32,6 +36,8 @@ class SweetSerializer(serializers.ModelSerializer):
             "name",
             "description",
             "image_url",
+            "preview_image_url",
+            "image_variants",
             "tag",
             "nationality",
             "age_text",
@@ -52,9 +58,19 @@ class SweetSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # The full variant list is opt-in (?imageVariants=1); cards only need preview_image_url.
+        if not self.context.get("include_image_variants"):
+            fields.pop("image_variants")
+        return fields
+
     def get_code(self, obj: Sweet) -> str:
         return obj.code
 
+    def get_preview_image_url(self, obj: Sweet) -> str:
+        return obj.image_url_for(self.context.get("image_width") or DEFAULT_CARD_IMAGE_WIDTH)
+
     def get_average_rating(self, obj: Sweet) -> float:
         avg = getattr(obj, "average_rating", None)
         count = getattr(obj, "review_count", None)
@@ -71,6 +87,22 @@ class SweetSerializer(serializers.ModelSerializer):
         return int(aggregate["count"] or 0)
 
 
+class SweetSummarySerializer(serializers.ModelSerializer):
+    location = LocationSerializer(read_only=True)
+    code = serializers.SerializerMethodField()
+    preview_image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Sweet
+        fields = ["id", "code", "name", "preview_image_url", "location"]
+
+    def get_code(self, obj: Sweet) -> str:
+        return obj.code
+
+    def get_preview_image_url(self, obj: Sweet) -> str:
+        return obj.image_url_for(self.context.get("image_width") or DEFAULT_CARD_IMAGE_WIDTH)
+
+
 class BookingSerializer(serializers.ModelSerializer):
     sweet = SweetSerializer()
 
@@ -89,12 +121,25 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
 
 
+class CompactBookingSerializer(BookingSerializer):
+    sweet = SweetSummarySerializer()
+
+
 class RewardLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = RewardLog
         fields = ["id", "delta", "reason", "created_at"]
 
 
+class RewardMonthlyRollupSerializer(serializers.ModelSerializer):
+    month = serializers.DateField(format="%Y-%m")
+    net = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = RewardMonthlyRollup
+        fields = ["month", "earned", "spent", "net", "log_count"]
+
+
 class SweetReviewSerializer(serializers.ModelSerializer):
     userDisplayName = serializers.SerializerMethodField()
 
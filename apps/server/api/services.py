@@ -1,14 +1,38 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Iterable, Tuple
-
-from django.db import transaction
-from django.db.models import Avg, Count, Value
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Case, Count, F, Max, OuterRef, QuerySet, Subquery, Value, When
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from .models import Booking, LineUser, RewardLog, Sweet, SweetReview
+from .models import Booking, LineUser, RewardLog, RewardMonthlyRollup, Sweet, SweetReview
+from .pagination import after_cursor
+from .signals import booking_statuses_changed, reward_logs_created
+
+BOOKING_REWARD_POINTS = 50
+MAX_AVAILABILITY_DAYS = 62
+ROLLUP_CHUNK_SIZE = 500
+LEADERBOARD_SIZE = 100
+LEADERBOARD_CACHE_KEY = "reward:leaderboard"
+
+
+class BookingConflictError(ValueError):
+    """Raised when the requested slot is already held by an active booking."""
+
+
+class BookingBatchError(ValueError):
+    """Raised when any item of a booking batch is invalid; ``errors`` maps item index to message."""
+
+    def __init__(self, errors: Dict[int, str], *, conflict: bool = False) -> None:
+        super().__init__("Booking batch rejected")
+        self.errors = errors
+        self.conflict = conflict
 
 
 def get_user_by_id(user_id: int) -> LineUser | None:
@@ -47,13 +71,98 @@ def upsert_line_user(*, line_user_id: str, display_name: str | None, avatar: str
         return user
 
 
-def adjust_reward_points(*, user: LineUser, delta: int, reason: str) -> LineUser:
+def supports_update_returning() -> bool:
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def increment_reward_points(user_id: int, delta: int) -> int:
+    """Add ``delta`` to the stored balance in the database and return the new balance.
+
+    Must run inside a transaction. Where ``UPDATE ... RETURNING`` is available the balance
+    comes back in the same statement; elsewhere (MySQL) it is re-read while the UPDATE still
+    holds the row lock, so the value cannot be stale.
+    """
+    now = timezone.now()
+    if supports_update_returning():
+        table = connection.ops.quote_name(LineUser._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET reward_points = reward_points + %s, updated_at = %s WHERE id = %s "
+                "RETURNING reward_points",
+                [delta, now, user_id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise LineUser.DoesNotExist(f"LineUser {user_id} does not exist")
+        return row[0]
+
+    updated = LineUser.objects.filter(pk=user_id).update(reward_points=F("reward_points") + delta, updated_at=now)
+    if not updated:
+        raise LineUser.DoesNotExist(f"LineUser {user_id} does not exist")
+    return LineUser.objects.values_list("reward_points", flat=True).get(pk=user_id)
+
+
+def record_reward(*, user: LineUser, delta: int, reason: str) -> int:
+    """Apply a reward change and its ledger entry atomically; every balance change goes through here.
+
+    Keeping the UPDATE and the ``RewardLog`` insert in one transaction is what keeps
+    ``reward_points`` equal to the sum of the user's ``RewardLog.delta``.
+    """
     with transaction.atomic():
-        user.reward_points = user.reward_points + delta
-        user.save(update_fields=["reward_points", "updated_at"])
-        RewardLog.objects.create(user=user, delta=delta, reason=reason)
-        user.refresh_from_db()
-        return user
+        balance = increment_reward_points(user.pk, delta)
+        create_reward_logs([RewardLog(user=user, delta=delta, reason=reason)])
+    user.reward_points = balance
+    return balance
+
+
+def create_reward_logs(logs: List[RewardLog]) -> List[RewardLog]:
+    """Insert ledger rows and fold them into the monthly rollups in the same transaction."""
+    with transaction.atomic():
+        RewardLog.objects.bulk_create(logs, batch_size=1000)
+        bump_reward_rollups(logs)
+        reward_logs_created.send(sender=RewardLog, logs=logs)
+    return logs
+
+
+def bump_reward_rollups(logs: Iterable[RewardLog]) -> None:
+    totals: Dict[Tuple[int, date], List[int]] = {}
+    for log in logs:
+        entry = totals.setdefault((log.user_id, timezone.localdate(log.created_at).replace(day=1)), [0, 0, 0])
+        if log.delta >= 0:
+            entry[0] += log.delta
+        else:
+            entry[1] -= log.delta
+        entry[2] += 1
+
+    # Users sharing a month and identical increments (the common case for bulk grants)
+    # are folded into one UPDATE ... WHERE user_id IN (...).
+    groups: Dict[Tuple[date, int, int, int], List[int]] = {}
+    for (user_id, month), (earned, spent, count) in totals.items():
+        groups.setdefault((month, earned, spent, count), []).append(user_id)
+
+    now = timezone.now()
+    for (month, earned, spent, count), user_ids in groups.items():
+        for offset in range(0, len(user_ids), ROLLUP_CHUNK_SIZE):
+            chunk = user_ids[offset : offset + ROLLUP_CHUNK_SIZE]
+            RewardMonthlyRollup.objects.bulk_create(
+                [RewardMonthlyRollup(user_id=user_id, month=month) for user_id in chunk],
+                ignore_conflicts=True,
+            )
+            RewardMonthlyRollup.objects.filter(month=month, user_id__in=chunk).update(
+                earned=F("earned") + earned,
+                spent=F("spent") + spent,
+                log_count=F("log_count") + count,
+                updated_at=now,
+            )
+
+
+def adjust_reward_points(*, user: LineUser, delta: int, reason: str) -> LineUser:
+    record_reward(user=user, delta=delta, reason=reason)
+    return user
 
 
 def list_sweets(*, location_slug: str | None = None) -> Iterable[Sweet]:
@@ -81,50 +190,392 @@ def create_booking(
     booking_date = parse_date(date_str)
     if booking_date is None:
         raise ValueError("Invalid booking date")
+    time_slot = time_slot.strip()
 
-    with transaction.atomic():
-        sweet = Sweet.objects.select_for_update().select_related("location").get(id=sweet_id)
-        booking = Booking.objects.create(
+    # No row lock on the sweet: double bookings are rejected by the slot unique
+    # constraint, so concurrent bookings for one sweet never queue behind each other.
+    sweet = Sweet.objects.select_related("location").get(id=sweet_id)
+    try:
+        with transaction.atomic():
+            booking = Booking.objects.create(
+                user=user,
+                sweet=sweet,
+                date=booking_date,
+                time_slot=time_slot,
+                slot_day=timezone.localdate(booking_date),
+                slot_start=slot_start_for(booking_date, time_slot),
+                slot_active=True,
+                status=Booking.Status.PENDING,
+                note=note or "",
+            )
+            record_reward(user=user, delta=BOOKING_REWARD_POINTS, reason=f"預約 {sweet.name}")
+    except IntegrityError as exc:
+        raise BookingConflictError("Time slot is already booked") from exc
+    return booking
+
+
+def create_bookings_batch(*, user: LineUser, items: List[Dict[str, object]]) -> List[Booking]:
+    """Validate every item up front, then insert the whole batch in one transaction.
+
+    Items use the ``BookingCreateSerializer`` keys (``sweetId``, ``date``, ``timeSlot``, ``note``).
+    Either every booking is created or none is.
+    """
+    errors: Dict[int, str] = {}
+    conflict = False
+    parsed: List[Tuple[int, datetime, date, str, str]] = []
+    for index, item in enumerate(items):
+        booking_date = parse_date(str(item["date"]))
+        if booking_date is None:
+            errors[index] = "Invalid booking date"
+            continue
+        time_slot = str(item["timeSlot"]).strip()
+        parsed.append((index, booking_date, timezone.localdate(booking_date), time_slot, item.get("note") or ""))
+
+    sweets = Sweet.objects.select_related("location").in_bulk({items[entry[0]]["sweetId"] for entry in parsed})
+    occupied = set(
+        Booking.objects.filter(
+            sweet_id__in=sweets,
+            slot_day__in={entry[2] for entry in parsed},
+            slot_active=True,
+        )
+        .order_by()
+        .values_list("sweet_id", "slot_day", "time_slot")
+    )
+    seen: set[Tuple[int, date, str]] = set()
+    for index, _, slot_day, time_slot, _ in parsed:
+        sweet_id = items[index]["sweetId"]
+        key = (sweet_id, slot_day, time_slot)
+        if sweet_id not in sweets:
+            errors[index] = "Sweet not found"
+        elif key in occupied:
+            errors[index], conflict = "Time slot is already booked", True
+        elif key in seen:
+            errors[index], conflict = "Duplicate time slot in batch", True
+        seen.add(key)
+    if errors:
+        raise BookingBatchError(errors, conflict=conflict)
+
+    bookings = [
+        Booking(
             user=user,
-            sweet=sweet,
+            sweet=sweets[items[index]["sweetId"]],
             date=booking_date,
             time_slot=time_slot,
+            slot_day=slot_day,
+            slot_start=slot_start_for(booking_date, time_slot),
+            slot_active=True,
             status=Booking.Status.PENDING,
-            note=note or "",
+            note=note,
         )
+        for index, booking_date, slot_day, time_slot, note in parsed
+    ]
+    total = BOOKING_REWARD_POINTS * len(bookings)
+    try:
+        with transaction.atomic():
+            Booking.objects.bulk_create(bookings)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                assign_batch_booking_ids(user, bookings)
+            booking_statuses_changed.send(
+                sender=Booking,
+                bookings=[
+                    {"id": booking.id, "user_id": user.pk, "sweet_id": booking.sweet_id, "status": booking.status}
+                    for booking in bookings
+                ],
+            )
+            create_reward_logs(
+                [
+                    RewardLog(user=user, delta=BOOKING_REWARD_POINTS, reason=f"預約 {booking.sweet.name}")
+                    for booking in bookings
+                ]
+            )
+            balance = increment_reward_points(user.pk, total)
+    except IntegrityError as exc:
+        raise BookingConflictError("Time slot is already booked") from exc
+
+    user.reward_points = balance
+    return bookings
+
+
+def assign_batch_booking_ids(user: LineUser, bookings: List[Booking]) -> None:
+    """Fill ids and timestamps after ``bulk_create`` on backends without RETURNING (MySQL).
+
+    The rows are found again through the active slot key, which the unique constraint
+    guarantees to be unambiguous.
+    """
+    by_key = {(booking.sweet_id, booking.slot_day, booking.time_slot): booking for booking in bookings}
+    stored = Booking.objects.filter(
+        user=user,
+        slot_active=True,
+        sweet_id__in={key[0] for key in by_key},
+        slot_day__in={key[1] for key in by_key},
+    ).values_list("id", "sweet_id", "slot_day", "time_slot", "created_at", "updated_at")
+    for booking_id, sweet_id, slot_day, time_slot, created_at, updated_at in stored:
+        booking = by_key.get((sweet_id, slot_day, time_slot))
+        if booking is not None:
+            booking.id, booking.created_at, booking.updated_at = booking_id, created_at, updated_at
+            booking._state.adding = False
+
+
+def get_slot_availability(*, sweet_id: int, start: date, end: date) -> Dict[date, List[str]]:
+    if end < start:
+        raise ValueError("'to' must not be before 'from'")
+    if (end - start).days + 1 > MAX_AVAILABILITY_DAYS:
+        raise ValueError(f"Range must not exceed {MAX_AVAILABILITY_DAYS} days")
+
+    booked: Dict[date, List[str]] = {start + timedelta(days=offset): [] for offset in range((end - start).days + 1)}
+    # Served by the booking_active_slot_uniq index: (sweet_id, slot_day, time_slot, slot_active).
+    rows = (
+        Booking.objects.filter(sweet_id=sweet_id, slot_day__range=(start, end), slot_active=True)
+        .order_by("slot_day", "time_slot")
+        .values_list("slot_day", "time_slot")
+    )
+    for slot_day, time_slot in rows:
+        booked[slot_day].append(time_slot)
+    return booked
 
-        user.reward_points += 50
-        user.save(update_fields=["reward_points", "updated_at"])
-        RewardLog.objects.create(user=user, delta=50, reason=f"預約 {sweet.name}")
 
-        booking.refresh_from_db()
-        booking.sweet = sweet
-        return booking
+BOOKING_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    Booking.Status.CONFIRMED: (Booking.Status.PENDING,),
+    Booking.Status.CANCELLED: (Booking.Status.PENDING, Booking.Status.CONFIRMED),
+}
 
 
-def list_bookings_for_user(user: LineUser) -> Iterable[Booking]:
-    return (
-        Booking.objects.select_related("sweet", "sweet__location")
-        .filter(user=user)
-        .order_by("-created_at")
+def transition_bookings(
+    booking_ids: Iterable[int],
+    to_status: str,
+    *,
+    chunk_size: int = 500,
+) -> Iterator[Dict[str, object]]:
+    """Move bookings to ``to_status`` chunk by chunk, yielding one result row per id.
+
+    Each chunk locks its rows, flips every eligible booking with a single UPDATE and, for
+    cancellations, releases the slots and reverses the booking reward with bulk writes.
+    """
+    if to_status not in BOOKING_TRANSITIONS:
+        raise ValueError(f"Unsupported target status: {to_status}")
+    sources = BOOKING_TRANSITIONS[to_status]
+    cancelling = to_status == Booking.Status.CANCELLED
+
+    ids = list(dict.fromkeys(booking_ids))
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset : offset + chunk_size]
+        results: List[Dict[str, object]] = []
+        with transaction.atomic():
+            rows = {
+                row["id"]: row
+                for row in Booking.objects.select_for_update()
+                .filter(id__in=chunk)
+                .order_by()
+                .values("id", "status", "user_id", "sweet_id")
+            }
+            eligible = [row for row in rows.values() if row["status"] in sources]
+            if eligible:
+                updates: Dict[str, object] = {"status": to_status, "updated_at": timezone.now()}
+                if cancelling:
+                    updates["slot_active"] = None
+                Booking.objects.filter(id__in=[row["id"] for row in eligible]).update(**updates)
+                booking_statuses_changed.send(
+                    sender=Booking,
+                    bookings=[{**row, "status": to_status} for row in eligible],
+                )
+                if cancelling:
+                    reverse_booking_rewards(eligible)
+
+            for booking_id in chunk:
+                row = rows.get(booking_id)
+                if row is None:
+                    results.append({"id": booking_id, "result": "not_found"})
+                else:
+                    result = "updated" if row["status"] in sources else "skipped"
+                    results.append({"id": booking_id, "result": result, "from": row["status"], "to": to_status})
+        yield from results
+
+
+def reverse_booking_rewards(bookings: List[Dict[str, object]]) -> None:
+    sweet_names = dict(
+        Sweet.objects.filter(id__in={row["sweet_id"] for row in bookings}).values_list("id", "name")
+    )
+    per_user: Dict[int, int] = {}
+    for row in bookings:
+        per_user[row["user_id"]] = per_user.get(row["user_id"], 0) + BOOKING_REWARD_POINTS
+    LineUser.objects.filter(id__in=per_user).update(
+        reward_points=F("reward_points")
+        - Case(*[When(id=user_id, then=Value(points)) for user_id, points in per_user.items()]),
+        updated_at=timezone.now(),
+    )
+    create_reward_logs(
+        [
+            RewardLog(
+                user_id=row["user_id"],
+                delta=-BOOKING_REWARD_POINTS,
+                reason=f"取消預約 {sweet_names.get(row['sweet_id'], '')}".strip(),
+            )
+            for row in bookings
+        ]
     )
 
 
-def get_reward_summary(user: LineUser) -> Tuple[LineUser, Iterable[RewardLog]]:
-    logs = RewardLog.objects.filter(user=user).order_by("-created_at")
-    user.refresh_from_db()
-    return user, logs
+def list_bookings_for_user(
+    user: LineUser,
+    *,
+    status: str | None = None,
+    created_from: date | None = None,
+    created_to: date | None = None,
+) -> QuerySet[Booking]:
+    # Filters stay on (user, status, created_at) so the booking_user_* indexes cover them.
+    queryset = Booking.objects.select_related("sweet", "sweet__location").filter(user=user)
+    if status:
+        if status not in Booking.Status.values:
+            raise ValueError(f"Unknown booking status: {status}")
+        queryset = queryset.filter(status=status)
+    if created_from:
+        queryset = queryset.filter(created_at__gte=start_of_day(created_from))
+    if created_to:
+        queryset = queryset.filter(created_at__lt=start_of_day(created_to + timedelta(days=1)))
+    return queryset.order_by("-created_at", "-id")
+
+
+def booking_page_validators(
+    queryset: QuerySet[Booking],
+    *,
+    cursor: str | None,
+    limit: int,
+    with_reviews: bool = True,
+) -> Tuple[List[tuple], bool]:
+    """The rows one booking list page returns, with the change markers of what it embeds.
+
+    A single query reads the page plus the row that decides ``next``: each booking's id and
+    ``updated_at`` and those of its sweet and location. The full payload also embeds review
+    summaries, so each row carries its sweet's review count and newest review change from
+    correlated subqueries, which only ever touch the sweets on the page.
+    """
+    fields = ["id", "updated_at", "sweet__updated_at", "sweet__location__updated_at"]
+    if with_reviews:
+        reviews = SweetReview.objects.filter(sweet_id=OuterRef("sweet_id")).order_by().values("sweet_id")
+        queryset = queryset.annotate(
+            review_count=Subquery(reviews.annotate(total=Count("id")).values("total")),
+            reviews_changed=Subquery(reviews.annotate(newest=Max("updated_at")).values("newest")),
+        )
+        fields += ["review_count", "reviews_changed"]
+    rows = list(after_cursor(queryset, cursor).values_list(*fields)[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def attach_review_summaries(sweets: Iterable[Sweet]) -> None:
+    """Set ``average_rating``/``review_count`` on sweets with one grouped query."""
+    by_id = {sweet.id: sweet for sweet in sweets}
+    summaries = (
+        SweetReview.objects.filter(sweet_id__in=by_id)
+        .values("sweet_id")
+        .annotate(average_rating=Avg("rating"), review_count=Count("id"))
+        .order_by()
+    )
+    for sweet in by_id.values():
+        sweet.average_rating, sweet.review_count = 0.0, 0
+    for row in summaries:
+        sweet = by_id[row["sweet_id"]]
+        sweet.average_rating, sweet.review_count = row["average_rating"] or 0.0, row["review_count"]
+
+
+def start_of_day(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()), timezone.get_current_timezone())
+
+
+# "19:00", "19:00-20:00" or "19:00~20:00"; anything after the leading times is ignored.
+TIME_SLOT_RE = re.compile(r"\s*(\d{1,2}):(\d{2})(?:\s*[-~–]\s*(\d{1,2}):(\d{2}))?")
+
+
+def slot_bounds(day: date, time_slot: str) -> Tuple[datetime | None, datetime | None]:
+    """Local start and end of a ``time_slot`` on ``day``; ``None`` where the slot has no time.
+
+    An end at or before the start (e.g. ``"23:00-01:00"``) falls on the following day.
+    """
+    match = TIME_SLOT_RE.match(time_slot or "")
+    if match is None:
+        return None, None
+    hour, minute, end_hour, end_minute = match.groups()
+    try:
+        start = datetime.combine(day, time(int(hour), int(minute)))
+    except ValueError:
+        return None, None
+    end = None
+    if end_hour is not None:
+        end_hour, end_minute = int(end_hour), int(end_minute)
+        try:
+            end = datetime.combine(day, time(end_hour % 24, end_minute))
+        except ValueError:
+            end = None
+        if end is not None and end <= start:
+            end += timedelta(days=1)
+    current = timezone.get_current_timezone()
+    return timezone.make_aware(start, current), timezone.make_aware(end, current) if end else None
+
+
+def slot_start_for(booking_date: datetime, time_slot: str) -> datetime:
+    """When a booking's slot begins; the stored date stands in for slots without a time."""
+    start, _ = slot_bounds(timezone.localdate(booking_date), time_slot)
+    return start or booking_date
+
+
+def get_reward_leaderboard(limit: int = LEADERBOARD_SIZE) -> List[Dict[str, object]]:
+    """Top users by reward points, cached for ``REWARD_LEADERBOARD_TTL_SECONDS``.
+
+    The cached list always holds ``LEADERBOARD_SIZE`` entries and callers slice it, so every
+    ``limit`` shares one cache entry. Ties share a rank (1, 2, 2, 4).
+    """
+    entries = cache.get(LEADERBOARD_CACHE_KEY)
+    if entries is None:
+        rows = (
+            LineUser.objects.order_by("-reward_points", "id")
+            .values("id", "display_name", "avatar", "reward_points")[:LEADERBOARD_SIZE]
+        )
+        entries = []
+        for position, row in enumerate(rows, start=1):
+            tied = entries and entries[-1]["rewardPoints"] == row["reward_points"]
+            entries.append(
+                {
+                    "rank": entries[-1]["rank"] if tied else position,
+                    "userId": row["id"],
+                    "displayName": row["display_name"] or "小夜用戶",
+                    "avatar": row["avatar"],
+                    "rewardPoints": row["reward_points"],
+                }
+            )
+        cache.set(LEADERBOARD_CACHE_KEY, entries, settings.REWARD_LEADERBOARD_TTL_SECONDS)
+    return entries[:limit]
+
+
+def get_reward_rank(user: LineUser) -> int:
+    # Index range count on user_reward_points_idx; users tied with you share your rank.
+    return LineUser.objects.filter(reward_points__gt=user.reward_points).count() + 1
+
+
+def list_reward_logs_for_user(user: LineUser) -> QuerySet[RewardLog]:
+    return RewardLog.objects.filter(user=user).order_by("-created_at", "-id")
+
+
+def list_monthly_rewards(user: LineUser, *, months: int = 12) -> List[RewardMonthlyRollup]:
+    return list(RewardMonthlyRollup.objects.filter(user=user).order_by("-month")[:months])
+
+
+def reward_log_validators(user: LineUser) -> Dict[str, object]:
+    # Rollups only change together with a ledger insert, so the ledger alone covers them.
+    return RewardLog.objects.filter(user=user).aggregate(
+        count=Count("id"),
+        last_id=Max("id"),
+        changed=Max("created_at"),
+    )
 
 
 def set_reward_points(*, user: LineUser, reward_points: int, reason: str) -> Tuple[LineUser, int]:
     with transaction.atomic():
-        user.refresh_from_db()
-        delta = reward_points - user.reward_points
-        user.reward_points = reward_points
-        user.save(update_fields=["reward_points", "updated_at"])
+        # Lock the row so a concurrent increment cannot land between reading and writing.
+        current = LineUser.objects.select_for_update().values_list("reward_points", flat=True).get(pk=user.pk)
+        delta = reward_points - current
         if delta != 0:
-            RewardLog.objects.create(user=user, delta=delta, reason=reason)
-        user.refresh_from_db()
+            record_reward(user=user, delta=delta, reason=reason)
+        else:
+            user.reward_points = current
         return user, delta
 
 
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from django.dispatch import Signal
+
+# Sent by the bulk write paths, which bypass ``post_save``.
+# ``logs``: the inserted ``RewardLog`` instances.
+reward_logs_created = Signal()
+# ``bookings``: dicts with ``id``, ``user_id``, ``sweet_id`` and the new ``status``.
+booking_statuses_changed = Signal()
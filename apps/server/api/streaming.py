@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterator, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def iterate_in_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Pull a sync (database-backed) iterator one chunk at a time from an async server.
+
+    ``StreamingHttpResponse`` under ASGI would otherwise run ``list()`` over a sync iterator
+    and send nothing until it is exhausted. Each ``next`` runs on the request's
+    thread-sensitive thread, the same one the view and its database connection used.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    while True:
+        # StopIteration cannot cross the future boundary, so exhaustion is a sentinel.
+        chunk = await step(iterator, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+def streaming_response(request, chunks: Iterator[str], *, content_type: str) -> StreamingHttpResponse:
+    """Stream ``chunks`` as they are produced under both the ASGI server and WSGI."""
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return StreamingHttpResponse(iterate_in_thread(chunks), content_type=content_type)
+    return StreamingHttpResponse(chunks, content_type=content_type)
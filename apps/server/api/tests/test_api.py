@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
 from unittest import mock
+import warnings
 from uuid import uuid4
 
+from asgiref.sync import sync_to_async
+
 from django.conf import settings
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.utils import timezone
 
-from api import auth as api_auth
-from api.models import LineUser, Location, Sweet
+from api import auth as api_auth, exports, services, views
+from api.models import Booking, IdempotencyKey, LineUser, Location, RewardLog, Sweet
 
 
 @override_settings(
@@ -89,3 +99,474 @@ class APITestCase(TestCase):
         reviews = list_response.json().get("reviews", [])
         self.assertEqual(len(reviews), 1)
         self.assertEqual(reviews[0].get("comment"), "Excellent")
+
+    def test_sweets_preview_image_uses_smallest_suitable_variant(self) -> None:
+        user = LineUser.objects.create(line_user_id="U345", display_name="Tester", avatar="")
+        location = Location.objects.create(slug=f"tc-{uuid4().hex[:5]}", name="台中")
+        Sweet.objects.create(
+            name="Variant Sweet",
+            description="desc",
+            location=location,
+            image_url="/sweets/tc/v.jpg",
+            image_variants=[
+                {"url": "/sweets/tc/v-480.webp", "width": 480, "height": 640, "format": "webp"},
+                {"url": "/sweets/tc/v-240.webp", "width": 240, "height": 320, "format": "webp"},
+            ],
+        )
+        token = api_auth.issue_jwt(user)
+
+        response = self.client.get(
+            f"/api/sweets?location={location.slug}&imageWidth=200",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+        sweet = response.json()["sweets"][0]
+        self.assertEqual(sweet["preview_image_url"], "/sweets/tc/v-240.webp")
+        self.assertEqual(sweet["image_url"], "/sweets/tc/v.jpg")
+        self.assertNotIn("image_variants", sweet)
+
+        response = self.client.get(
+            f"/api/sweets?location={location.slug}&imageVariants=1",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(len(response.json()["sweets"][0]["image_variants"]), 2)
+
+    def test_booking_slot_conflict_and_availability(self) -> None:
+        user = LineUser.objects.create(
+            line_user_id="U456",
+            display_name="Booker",
+            avatar="",
+        )
+        location = Location.objects.create(slug=f"tc-{uuid4().hex[:5]}", name="台中")
+        sweet = Sweet.objects.create(name="Slot Sweet", description="desc", location=location)
+        token = api_auth.issue_jwt(user)
+        payload = {"sweetId": sweet.id, "date": "2026-11-02", "timeSlot": "20:00"}
+
+        first = self.client.post(
+            "/api/booking",
+            data=payload,
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(first.status_code, 201)
+
+        second = self.client.post(
+            "/api/booking",
+            data={**payload, "timeSlot": " 20:00 "},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(second.status_code, 409)
+
+        availability = self.client.get(
+            f"/api/sweets/{sweet.id}/availability?from=2026-11-01&to=2026-11-03",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(availability.status_code, 200)
+        days = availability.json()["days"]
+        self.assertEqual([day["date"] for day in days], ["2026-11-01", "2026-11-02", "2026-11-03"])
+        self.assertEqual(days[1]["bookedSlots"], ["20:00"])
+        self.assertEqual(days[0]["bookedSlots"], [])
+
+        # A released slot no longer counts as occupied and can be booked again.
+        Booking.objects.filter(sweet=sweet).update(status=Booking.Status.CANCELLED, slot_active=None)
+        rebook = self.client.post(
+            "/api/booking",
+            data=payload,
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(rebook.status_code, 201)
+
+    def test_create_booking_rewards_without_locking_or_reloading(self) -> None:
+        location = Location.objects.create(slug=f"tn-{uuid4().hex[:5]}", name="台南")
+        sweet = Sweet.objects.create(name="Hot Sweet", description="desc", location=location)
+        user = LineUser.objects.create(line_user_id="U567", display_name="Booker", reward_points=10)
+        stale = LineUser.objects.get(id=user.id)
+
+        booking = services.create_booking(
+            user=user, sweet_id=sweet.id, date_str="2026-11-05", time_slot="19:00", note=None
+        )
+        services.create_booking(user=stale, sweet_id=sweet.id, date_str="2026-11-05", time_slot="20:00", note=None)
+
+        self.assertEqual(booking.sweet.location, location)
+        self.assertIsNotNone(booking.created_at)
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, 10 + 2 * services.BOOKING_REWARD_POINTS)
+
+    def test_booking_history_is_paginated_and_filterable(self) -> None:
+        user = LineUser.objects.create(line_user_id="U678", display_name="Regular")
+        location = Location.objects.create(slug=f"ty-{uuid4().hex[:5]}", name="桃園")
+        sweet = Sweet.objects.create(name="History Sweet", description="desc", location=location)
+        for hour in range(5):
+            services.create_booking(
+                user=user, sweet_id=sweet.id, date_str="2026-11-10", time_slot=f"{hour:02d}:00", note=None
+            )
+        Booking.objects.filter(time_slot="00:00").update(status=Booking.Status.CANCELLED, slot_active=None)
+        token = api_auth.issue_jwt(user)
+
+        seen: list[int] = []
+        url = f"/api/booking/{user.id}?limit=2&sweet=summary"
+        while url:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body["bookings"]), 2)
+            self.assertNotIn("description", body["bookings"][0]["sweet"])
+            seen.extend(item["id"] for item in body["bookings"])
+            url = f"/api/booking/{user.id}?limit=2&sweet=summary&cursor={body['next']}" if body["next"] else ""
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 5)
+
+        cancelled = self.client.get(
+            f"/api/booking/{user.id}?status=CANCELLED",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        ).json()
+        self.assertEqual([item["time_slot"] for item in cancelled["bookings"]], ["00:00"])
+        self.assertEqual(cancelled["bookings"][0]["sweet"]["review_count"], 0)
+
+        invalid = self.client.get(f"/api/booking/{user.id}?cursor=bogus", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_idempotency_key_replays_booking_and_reward_updates(self) -> None:
+        user = LineUser.objects.create(line_user_id="U890", display_name="Retrier")
+        location = Location.objects.create(slug=f"nt-{uuid4().hex[:5]}", name="新北")
+        sweet = Sweet.objects.create(name="Retry Sweet", description="desc", location=location)
+        token = api_auth.issue_jwt(user)
+        payload = {"sweetId": sweet.id, "date": "2026-11-12", "timeSlot": "21:00"}
+
+        responses = [
+            self.client.post(
+                "/api/booking",
+                data=payload,
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+                HTTP_IDEMPOTENCY_KEY="booking-1",
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(responses[1].headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(Booking.objects.filter(user=user).count(), 1)
+        self.assertEqual(RewardLog.objects.filter(user=user).count(), 1)
+
+        mismatch = self.client.post(
+            "/api/booking",
+            data={**payload, "timeSlot": "22:00"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+            HTTP_IDEMPOTENCY_KEY="booking-1",
+        )
+        self.assertEqual(mismatch.status_code, 422)
+
+        for _ in range(2):
+            update = self.client.put(
+                f"/api/reward/{user.id}",
+                data={"rewardPoints": 500},
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+                HTTP_IDEMPOTENCY_KEY="reward-1",
+            )
+            self.assertEqual(update.status_code, 200)
+            self.assertEqual(update.json()["delta"], 450)
+        self.assertEqual(RewardLog.objects.filter(user=user).count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    @override_settings(OPERATOR_API_TOKEN="operator-secret")
+    def test_operator_bulk_cancel_reverses_rewards_and_streams_report(self) -> None:
+        user = LineUser.objects.create(line_user_id="U901", display_name="Bulk")
+        location = Location.objects.create(slug=f"op-{uuid4().hex[:5]}", name="台北")
+        sweet = Sweet.objects.create(name="Bulk Sweet", description="desc", location=location)
+        bookings = [
+            services.create_booking(
+                user=user, sweet_id=sweet.id, date_str="2026-11-20", time_slot=f"{hour:02d}:00", note=None
+            )
+            for hour in range(3)
+        ]
+        Booking.objects.filter(id=bookings[2].id).update(status=Booking.Status.CANCELLED, slot_active=None)
+        payload = {"bookingIds": [bookings[0].id, bookings[1].id, bookings[2].id, 999999], "status": "CANCELLED"}
+
+        forbidden = self.client.post("/api/operator/bookings/status", data=payload, content_type="application/json")
+        self.assertEqual(forbidden.status_code, 403)
+
+        response = self.client.post(
+            "/api/operator/bookings/status",
+            data=payload,
+            content_type="application/json",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line.get("result") for line in lines[:4]], ["updated", "updated", "skipped", "not_found"])
+        self.assertEqual(lines[-1], {"summary": {"updated": 2, "skipped": 1, "not_found": 1}})
+
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, services.BOOKING_REWARD_POINTS)
+        self.assertEqual(RewardLog.objects.filter(user=user, delta=-services.BOOKING_REWARD_POINTS).count(), 2)
+        self.assertFalse(Booking.objects.filter(sweet=sweet, slot_active=True).exists())
+
+    @override_settings(OPERATOR_API_TOKEN="operator-secret")
+    def test_operator_export_streams_csv_and_ical(self) -> None:
+        user = LineUser.objects.create(line_user_id="U912", display_name="匯出, 測試")
+        location = Location.objects.create(slug=f"ex-{uuid4().hex[:5]}", name="高雄")
+        other = Location.objects.create(slug=f"ex-{uuid4().hex[:5]}", name="台中")
+        sweet = Sweet.objects.create(name="Export Sweet", description="desc", location=location)
+        elsewhere = Sweet.objects.create(name="Elsewhere", description="desc", location=other)
+        for hour in range(3):
+            services.create_booking(
+                user=user, sweet_id=sweet.id, date_str="2026-12-01", time_slot=f"{hour:02d}:00", note=None
+            )
+        services.create_booking(user=user, sweet_id=sweet.id, date_str="2026-12-05", time_slot="20:00", note=None)
+        # The LIFF form sends a bare day plus an hour range.
+        services.create_booking(
+            user=user, sweet_id=sweet.id, date_str="2026-12-06", time_slot="19:00-20:00", note=None
+        )
+        services.create_booking(user=user, sweet_id=elsewhere.id, date_str="2026-12-01", time_slot="20:00", note=None)
+
+        rows = list(exports.iter_export_rows(exports.export_queryset(location_slug=location.slug), chunk_size=2))
+        self.assertEqual(len(rows), 5)
+
+        response = self.client.get(
+            f"/api/operator/bookings/export.csv?from=2026-12-01&to=2026-12-01&location={location.slug}",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = list(csv.reader(b"".join(response.streaming_content).decode("utf-8-sig").splitlines()))
+        self.assertEqual(lines[0][0], "booking_id")
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1][11], "匯出, 測試")
+
+        calendar = self.client.get(
+            f"/api/operator/bookings/export.ics?location={location.slug}&status=PENDING",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        body = b"".join(calendar.streaming_content).decode()
+        self.assertEqual(body.count("BEGIN:VEVENT"), 5)
+        self.assertIn("DTSTART:20261205T120000Z\r\nSUMMARY", body)
+        self.assertIn("DTSTART:20261206T110000Z\r\nDTEND:20261206T120000Z\r\n", body)
+        self.assertIn("匯出\\, 測試", body)
+        self.assertTrue(body.endswith("END:VCALENDAR\r\n"))
+
+    def test_booking_batch_is_validated_up_front_and_created_together(self) -> None:
+        user = LineUser.objects.create(line_user_id="U923", display_name="Group")
+        location = Location.objects.create(slug=f"bt-{uuid4().hex[:5]}", name="台南")
+        sweets = [Sweet.objects.create(name=f"Batch {index}", location=location) for index in range(2)]
+        services.create_booking(user=user, sweet_id=sweets[1].id, date_str="2026-12-10", time_slot="21:00", note=None)
+        token = api_auth.issue_jwt(user)
+        items = [
+            {"sweetId": sweets[0].id, "date": "2026-12-10", "timeSlot": "21:00"},
+            {"sweetId": sweets[1].id, "date": "2026-12-10", "timeSlot": "22:00", "note": "group"},
+        ]
+
+        rejected = self.client.post(
+            "/api/booking/batch",
+            data={"bookings": items + [{"sweetId": sweets[1].id, "date": "2026-12-10", "timeSlot": "21:00"}]},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(rejected.status_code, 409)
+        self.assertEqual(rejected.json()["results"], [{"index": 2, "error": "Time slot is already booked"}])
+        self.assertEqual(Booking.objects.filter(user=user).count(), 1)
+
+        created = self.client.post(
+            "/api/booking/batch",
+            data={"bookings": items},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(created.status_code, 201)
+        results = created.json()["results"]
+        self.assertEqual([result["index"] for result in results], [0, 1])
+        self.assertTrue(all(result["booking"]["id"] for result in results))
+        self.assertEqual(results[1]["booking"]["note"], "group")
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, 3 * services.BOOKING_REWARD_POINTS)
+        self.assertEqual(RewardLog.objects.filter(user=user).count(), 3)
+
+    def test_batch_ids_are_recovered_without_bulk_returning(self) -> None:
+        user = LineUser.objects.create(line_user_id="U934", display_name="MySQL")
+        location = Location.objects.create(slug=f"my-{uuid4().hex[:5]}", name="桃園")
+        sweet = Sweet.objects.create(name="No Returning", location=location)
+        items = [{"sweetId": sweet.id, "date": "2026-12-11", "timeSlot": f"{hour:02d}:00"} for hour in range(3)]
+
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock
+        ) as can_return:
+            can_return.return_value = False
+            bookings = services.create_bookings_batch(user=user, items=items)
+
+        self.assertTrue(can_return.called)
+        self.assertEqual(
+            [booking.id for booking in bookings],
+            list(Booking.objects.filter(user=user).order_by("time_slot").values_list("id", flat=True)),
+        )
+
+    def test_polling_endpoints_answer_304_until_data_changes(self) -> None:
+        user = LineUser.objects.create(line_user_id="Upoll", display_name="Poller")
+        location = Location.objects.create(slug=f"pl-{uuid4().hex[:5]}", name="高雄")
+        sweet = Sweet.objects.create(name="Poll Sweet", location=location)
+        services.create_booking(user=user, sweet_id=sweet.id, date_str="2026-12-20", time_slot="21:00", note=None)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {api_auth.issue_jwt(user)}"}
+
+        for path in ("/api/login/me", f"/api/booking/{user.id}", f"/api/reward/{user.id}"):
+            first = self.client.get(path, **auth)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first["Cache-Control"], "private, no-cache")
+            # Authentication plus at most one aggregate.
+            with self.assertNumQueries(2 if path != "/api/login/me" else 1):
+                again = self.client.get(path, HTTP_IF_NONE_MATCH=first["ETag"], **auth)
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again.content, b"")
+            self.assertEqual(again["ETag"], first["ETag"])
+
+            other_page = self.client.get(f"{path}?limit=1", HTTP_IF_NONE_MATCH=first["ETag"], **auth)
+            self.assertEqual(other_page.status_code, 200)
+
+        bookings_path, reward_path = f"/api/booking/{user.id}", f"/api/reward/{user.id}"
+        etags = {path: self.client.get(path, **auth)["ETag"] for path in (bookings_path, reward_path)}
+        # Only the sweets a page embeds count: an older booking's sweet is not on the first page.
+        older = Sweet.objects.create(name="Older Sweet", location=location)
+        booking = services.create_booking(
+            user=user, sweet_id=older.id, date_str="2026-12-21", time_slot="21:00", note=None
+        )
+        Booking.objects.filter(id=booking.id).update(created_at=booking.created_at - timedelta(days=1))
+        first_page = self.client.get(f"{bookings_path}?limit=1", **auth)
+        services.create_review(user=user, sweet_id=older.id, rating=4, comment="")
+        unchanged = self.client.get(f"{bookings_path}?limit=1", HTTP_IF_NONE_MATCH=first_page["ETag"], **auth)
+        self.assertEqual(unchanged.status_code, 304)
+        etags[bookings_path] = self.client.get(bookings_path, **auth)["ETag"]
+
+        services.create_review(user=user, sweet_id=sweet.id, rating=5, comment="")
+        changed = self.client.get(bookings_path, HTTP_IF_NONE_MATCH=etags[bookings_path], **auth)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["bookings"][0]["sweet"]["review_count"], 1)
+
+        services.adjust_reward_points(user=user, delta=5, reason="poll")
+        changed = self.client.get(reward_path, HTTP_IF_NONE_MATCH=etags[reward_path], **auth)
+        self.assertEqual(changed.status_code, 200)
+
+        forbidden = self.client.get(f"/api/reward/{user.id + 1}", HTTP_IF_NONE_MATCH="*", **auth)
+        self.assertEqual(forbidden.status_code, 403)
+
+    def test_bootstrap_returns_first_paint_data_in_four_queries(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uboot", display_name="Boot")
+        location = Location.objects.create(slug=f"bt-{uuid4().hex[:5]}", name="新竹")
+        sweets = [Sweet.objects.create(name=f"Boot {index}", location=location) for index in range(3)]
+        for index in range(7):
+            services.create_booking(
+                user=user,
+                sweet_id=sweets[index % 3].id,
+                date_str=f"2026-12-{index + 1:02d}",
+                time_slot="20:00",
+                note=None,
+            )
+        services.create_review(user=user, sweet_id=sweets[0].id, rating=4, comment="")
+        token = api_auth.issue_jwt(user)
+
+        # Authentication, catalog, reward logs, bookings.
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f"/api/bootstrap?location={location.slug}&imageWidth=240", HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["user"]["id"], user.id)
+        self.assertEqual([sweet["name"] for sweet in data["sweets"]["sweets"]], ["Boot 0", "Boot 1", "Boot 2"])
+        self.assertEqual(data["sweets"]["sweets"][0]["review_count"], 1)
+        self.assertIsNone(data["sweets"]["next"])
+        self.assertEqual(data["reward"]["rewardPoints"], 7 * services.BOOKING_REWARD_POINTS)
+        self.assertEqual(len(data["reward"]["logs"]), 5)
+        self.assertIsNotNone(data["reward"]["next"])
+        self.assertEqual(len(data["bookings"]["bookings"]), 5)
+        self.assertEqual(data["bookings"]["bookings"][0]["sweet"]["name"], "Boot 0")
+
+        older = self.client.get(
+            f"/api/booking/{user.id}?cursor={data['bookings']['next']}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(len(older.json()["bookings"]), 2)
+
+        # Larger catalogs arrive one page at a time and continue on /api/sweets.
+        for index in range(3, views.BOOTSTRAP_CATALOG_SIZE + 2):
+            Sweet.objects.create(name=f"Boot {index}", location=location)
+        catalog = self.client.get(
+            f"/api/bootstrap?location={location.slug}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        ).json()["sweets"]
+        self.assertEqual(len(catalog["sweets"]), views.BOOTSTRAP_CATALOG_SIZE)
+        rest = self.client.get(
+            f"/api/sweets?location={location.slug}&cursor={catalog['next']}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        ).json()
+        self.assertEqual(
+            [sweet["name"] for sweet in rest["sweets"]],
+            [f"Boot {index}" for index in range(views.BOOTSTRAP_CATALOG_SIZE, views.BOOTSTRAP_CATALOG_SIZE + 2)],
+        )
+        self.assertIsNone(rest["next"])
+
+
+@override_settings(OPERATOR_API_TOKEN="operator-secret")
+class ASGIStreamingTestCase(TestCase):
+    """Operator streams run under uvicorn; they must not be buffered into a list there."""
+
+    async def consume(self, response) -> str:
+        # Iterate the way the ASGI handler does and fail on Django's buffering fallback.
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response]
+        self.assertFalse([warning for warning in caught if "synchronous iterators" in str(warning.message)])
+        return b"".join(chunks).decode("utf-8-sig")
+
+    async def test_bulk_status_report_streams_asynchronously(self) -> None:
+        user = await LineUser.objects.acreate(line_user_id="Uasync", display_name="Async")
+        location = await Location.objects.acreate(slug=f"as-{uuid4().hex[:5]}", name="台北")
+        sweet = await Sweet.objects.acreate(name="Async Sweet", location=location)
+        booking = await sync_to_async(services.create_booking)(
+            user=user, sweet_id=sweet.id, date_str="2026-11-21", time_slot="20:00", note=None
+        )
+
+        response = await AsyncClient().post(
+            "/api/operator/bookings/status",
+            data={"bookingIds": [booking.id], "status": "CANCELLED"},
+            content_type="application/json",
+            headers={"X-Operator-Token": "operator-secret"},
+        )
+        lines = [json.loads(line) for line in (await self.consume(response)).splitlines()]
+        self.assertEqual(lines[-1], {"summary": {"updated": 1}})
+
+    async def test_export_pages_are_fetched_as_the_client_reads(self) -> None:
+        user = await LineUser.objects.acreate(line_user_id="Uasyncexport", display_name="Export")
+        location = await Location.objects.acreate(slug=f"ax-{uuid4().hex[:5]}", name="高雄")
+        sweet = await Sweet.objects.acreate(name="Async Export", location=location)
+        for hour in range(5):
+            await sync_to_async(services.create_booking)(
+                user=user, sweet_id=sweet.id, date_str="2026-12-01", time_slot=f"{hour:02d}:00", note=None
+            )
+
+        produced = []
+        real_rows = exports.iter_export_rows
+
+        def rows(queryset):
+            for row in real_rows(queryset, chunk_size=2):
+                produced.append(row["id"])
+                yield row
+
+        with mock.patch.object(exports, "iter_export_rows", rows), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            response = await AsyncClient().get(
+                f"/api/operator/bookings/export.csv?location={location.slug}",
+                headers={"X-Operator-Token": "operator-secret"},
+            )
+            self.assertTrue(response.is_async)
+            chunks = aiter(response)
+            header, first = await anext(chunks), await anext(chunks)
+            # Only the first row has been read from the database so far.
+            self.assertEqual(len(produced), 1)
+            rest = [chunk async for chunk in chunks]
+        self.assertFalse([warning for warning in caught if "synchronous iterators" in str(warning.message)])
+        lines = list(csv.reader(b"".join([header, first, *rest]).decode("utf-8-sig").splitlines()))
+        self.assertEqual(lines[0][0], "booking_id")
+        self.assertEqual(len(lines), 6)
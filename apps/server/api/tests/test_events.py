@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import threading
+from unittest import mock
+
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+
+from api import auth as api_auth, events, services
+from api.management.commands.run_event_broker import Command as BrokerCommand
+from api.models import Booking, LineUser, Location, Sweet
+
+
+class EventHubTestCase(SimpleTestCase):
+    async def test_events_cross_threads_and_slow_clients_get_resync(self) -> None:
+        hub = events.EventHub()
+        subscription = hub.subscribe(7)
+        other = hub.subscribe(8)
+
+        thread = threading.Thread(target=hub.deliver, args=([(7, {"type": "reward", "delta": 5})],))
+        thread.start()
+        thread.join()
+        self.assertEqual(await asyncio.wait_for(subscription.queue.get(), 1), {"type": "reward", "delta": 5})
+        self.assertTrue(other.queue.empty())
+
+        hub.deliver([(7, {"type": "booking"})] * (events.SUBSCRIBER_QUEUE_SIZE + 1))
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertEqual(subscription.queue.get_nowait(), {"type": "resync"})
+
+        hub.unsubscribe(subscription)
+        hub.unsubscribe(other)
+        self.assertFalse(hub.has_subscribers([7, 8]))
+
+    async def test_broker_relays_between_processes(self) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = asyncio.create_task(BrokerCommand(stderr=mock.Mock()).serve("127.0.0.1", port))
+        await asyncio.sleep(0.1)
+        client = events.BrokerClient(f"127.0.0.1:{port}")
+        subscription = events.hub.subscribe(41)
+        try:
+            client.ensure_listener()
+            await asyncio.sleep(0.1)
+            self.assertTrue(await asyncio.to_thread(client.send, [(41, {"type": "booking", "booking": {"id": 1}})]))
+            event = await asyncio.wait_for(subscription.queue.get(), 2)
+            self.assertEqual(event["booking"], {"id": 1})
+        finally:
+            events.hub.unsubscribe(subscription)
+            for task in client.listeners.values():
+                task.cancel()
+            client.sock.close()
+            await asyncio.sleep(0.05)
+            server.cancel()
+
+
+class EventSignalTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = LineUser.objects.create(line_user_id="Uevents", display_name="Events")
+        location = Location.objects.create(slug="events", name="台北")
+        self.sweet = Sweet.objects.create(name="Event Sweet", location=location)
+
+    def published(self, write) -> list:
+        with mock.patch.object(events.hub, "deliver") as deliver:
+            with mock.patch.object(events.hub, "has_subscribers", return_value=True):
+                with self.captureOnCommitCallbacks(execute=True):
+                    write()
+        return [event for call in deliver.call_args_list for event in call.args[0]]
+
+    def test_single_and_bulk_writes_publish_after_commit(self) -> None:
+        sent = self.published(
+            lambda: services.create_booking(
+                user=self.user, sweet_id=self.sweet.id, date_str="2026-12-24", time_slot="20:00", note=None
+            )
+        )
+        booking = Booking.objects.get(user=self.user)
+        self.assertEqual(
+            sent,
+            [
+                (
+                    self.user.id,
+                    {"type": "booking", "booking": {"id": booking.id, "sweetId": self.sweet.id, "status": "PENDING"}},
+                ),
+                (self.user.id, mock.ANY),
+            ],
+        )
+        self.assertEqual(sent[1][1]["rewardPoints"], services.BOOKING_REWARD_POINTS)
+
+        sent = self.published(lambda: list(services.transition_bookings([booking.id], Booking.Status.CANCELLED)))
+        self.assertEqual([event["type"] for _, event in sent], ["booking", "reward"])
+        self.assertEqual(sent[0][1]["booking"]["status"], "CANCELLED")
+        self.assertEqual((sent[1][1]["delta"], sent[1][1]["rewardPoints"]), (-services.BOOKING_REWARD_POINTS, 0))
+
+    def test_nothing_is_built_without_listeners(self) -> None:
+        with mock.patch.object(events, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                services.adjust_reward_points(user=self.user, delta=3, reason="quiet")
+        publish.assert_not_called()
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(SSE_KEEPALIVE_SECONDS=0.05)
+class EventStreamViewTestCase(TestCase):
+    async def test_stream_requires_token_and_pushes_events(self) -> None:
+        client = AsyncClient()
+        self.assertEqual((await client.get("/api/events?token=bad")).status_code, 401)
+
+        user = await LineUser.objects.acreate(line_user_id="Ustream", display_name="Stream")
+        response = await client.get(f"/api/events?token={api_auth.issue_jwt(user)}")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        frames = aiter(response.streaming_content)
+        self.assertIn(b"event: ready", await anext(frames))
+        self.assertEqual(await anext(frames), b": keepalive\n\n")
+        events.hub.deliver([(user.id, {"type": "reward", "delta": 9})])
+        frame = (await anext(frames)).decode()
+        self.assertTrue(frame.startswith("event: reward\ndata: "))
+        self.assertEqual(json.loads(frame.split("data: ", 1)[1])["delta"], 9)
+
+        # A client disconnect cancels the task awaiting the stream, as the ASGI handler does.
+        waiting = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(events.hub.has_subscribers([user.id]))
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Callable
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from api.management.commands import import_sweets
+from api.models import Location, Sweet
+
+
+class OcrCacheTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.images = []
+        for name in ("a.jpg", "b.jpg"):
+            path = self.root / name
+            path.write_bytes(name.encode("utf-8"))
+            self.images.append(path)
+
+    def test_images_are_ocrd_once_and_cached_on_disk(self) -> None:
+        cache_dir = self.root / ".ocr_cache"
+        with mock.patch.object(import_sweets, "ocr_image", side_effect=lambda path: f"text {Path(path).name}") as ocr:
+            cache = import_sweets.OcrCache(cache_dir, workers=1)
+            first = cache.texts_for(self.images)
+            cache.texts_for(self.images)
+            self.assertEqual(ocr.call_count, 2)
+            self.assertEqual(first[self.images[0]], "text a.jpg")
+
+            reloaded = import_sweets.OcrCache(cache_dir, workers=1).texts_for(self.images)
+            self.assertEqual(ocr.call_count, 2)
+            self.assertEqual(reloaded, first)
+
+    def test_failed_ocr_is_not_persisted(self) -> None:
+        cache_dir = self.root / ".ocr_cache"
+        with mock.patch.object(import_sweets, "ocr_image", return_value=None):
+            texts = import_sweets.OcrCache(cache_dir, workers=1).texts_for(self.images)
+        self.assertEqual(set(texts.values()), {""})
+        self.assertFalse(cache_dir.exists())
+
+
+class MatchImagesTestCase(SimpleTestCase):
+    def test_assignment_is_global_not_greedy(self) -> None:
+        images = [Path("abc.jpg"), Path("abd.jpg")]
+        matches = import_sweets.match_images(["ab", "abc"], images)
+        self.assertEqual([match.image for match in matches], [Path("abd.jpg"), Path("abc.jpg")])
+        self.assertEqual(matches[1].score, 1.0)
+        self.assertTrue(all(match.method == "name" for match in matches))
+
+    def test_unmatched_entries_fall_back_to_remaining_images(self) -> None:
+        images = [Path("天使.jpg"), Path("other.jpg")]
+        matches = import_sweets.match_images(["天使", "真姬", "多餘"], images)
+        self.assertEqual([match.method for match in matches], ["name", "fallback", "none"])
+        self.assertEqual(matches[1].image, Path("other.jpg"))
+        self.assertIsNone(matches[2].image)
+
+    def test_large_assignments_fall_back_to_greedy_on_sparse_candidates(self) -> None:
+        images = [Path(f"{name}.jpg") for name in ("天使", "真姬", "優優", "波波")]
+        names = ["真姬", "天使", "波波", "無關"]
+        exact = import_sweets.match_images(names, images, fallback=[False] * 4)
+        with mock.patch.object(import_sweets, "ASSIGNMENT_LIMIT", 1):
+            greedy = import_sweets.match_images(names, images, fallback=[False] * 4)
+        self.assertEqual([match.image for match in greedy], [match.image for match in exact])
+        self.assertEqual(
+            [match.image for match in greedy], [Path("真姬.jpg"), Path("天使.jpg"), Path("波波.jpg"), None]
+        )
+
+        # Names sharing no n-gram with an image never pair with it.
+        candidates = list(import_sweets.similar_candidates(["ab", "zz"], ["abc", "xy"]))
+        self.assertEqual([[col for col, _ in row] for row in candidates], [[0], []])
+        self.assertAlmostEqual(candidates[0][0][1], 3 / 15**0.5)
+
+
+class ImportManifestTestCase(SimpleTestCase):
+    def test_fingerprint_tracks_content_and_survives_reload(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "台北.txt"
+            source.write_text("安琪\n身高:160\n", encoding="utf-8")
+            manifest_path = root / ".import_manifest.json"
+
+            manifest = import_sweets.ImportManifest.load(manifest_path, root)
+            fingerprint = manifest.fingerprint([source])
+            manifest.save()
+
+            reloaded = import_sweets.ImportManifest.load(manifest_path, root)
+            with mock.patch.object(import_sweets, "file_digest") as digest:
+                self.assertEqual(reloaded.fingerprint([source]), fingerprint)
+                digest.assert_not_called()
+
+            source.write_text("安琪\n身高:161\n", encoding="utf-8")
+            self.assertNotEqual(reloaded.fingerprint([source]), fingerprint)
+
+    def test_worker_changes_do_not_roll_back_other_workers(self) -> None:
+        snapshot = {"version": 1, "locations": {"taipei": "old-a", "taichung": "old-b"}, "entries": {}}
+        worker_a = import_sweets.ImportManifest(None, Path("/"), json.loads(json.dumps(snapshot)))
+        worker_a.record("locations", "taipei", "new-a")
+        worker_b = import_sweets.ImportManifest(None, Path("/"), json.loads(json.dumps(snapshot)))
+        worker_b.record("locations", "taichung", "new-b")
+        worker_b.record("entries", "taichung/安琪", "hash")
+
+        parent = import_sweets.ImportManifest(None, Path("/"), json.loads(json.dumps(snapshot)))
+        parent.merge(worker_a.changes())
+        parent.merge(worker_b.changes())
+
+        self.assertEqual(worker_b.changes()["locations"], {"taichung": "new-b"})
+        self.assertEqual(parent.locations, {"taipei": "new-a", "taichung": "new-b"})
+        self.assertEqual(parent.entries, {"taichung/安琪": "hash"})
+
+    def test_entry_hash_ignores_key_order(self) -> None:
+        self.assertEqual(
+            import_sweets.entry_hash({"cup": "C", "height_cm": 160}),
+            import_sweets.entry_hash({"height_cm": 160, "cup": "C"}),
+        )
+
+
+class UpsertSweetsTestCase(TestCase):
+    def test_upsert_updates_existing_rows_and_inserts_new_ones(self) -> None:
+        location = Location.objects.create(slug="upsert-test", name="測試")
+        existing = Sweet.objects.create(name="安琪", description="old", location=location)
+
+        written = import_sweets.upsert_sweets(
+            [
+                Sweet(name="安琪", description="stale", location=location),
+                Sweet(name="安琪", description="new", location=location, cup="C"),
+                Sweet(name="波波", description="fresh", location=location),
+            ]
+        )
+
+        self.assertEqual(written, 2)
+        self.assertEqual(Sweet.objects.filter(location=location).count(), 2)
+        existing.refresh_from_db()
+        self.assertEqual((existing.description, existing.cup), ("new", "C"))
+
+
+class StructuredSourceTestCase(TestCase):
+    def run_location(
+        self, root: Path, location_dir: Path, log: Callable[[str, str], None] = lambda level, message: None
+    ) -> import_sweets.LocationImport:
+        return import_sweets.LocationImport(
+            location_dir,
+            public_root=root / "public",
+            manifest=import_sweets.ImportManifest(None, root),
+            ocr_cache=import_sweets.OcrCache(),
+            log=log,
+            chunk_size=1,
+        ).run()
+
+    def test_csv_and_jsonl_rows_are_validated_and_imported_in_chunks(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            location_dir = root / "台北"
+            location_dir.mkdir()
+            (location_dir / "feed.csv").write_text(
+                "名字,身高,罩杯,長鐘費用\n安琪,160,C,3000\n,158,B,2800\n波波,保密,D,3200\n",
+                encoding="utf-8",
+            )
+            (location_dir / "feed.jsonl").write_text(
+                '{"name": "優優", "height_cm": 165, "國籍": "台灣"}\nnot json\n',
+                encoding="utf-8",
+            )
+            messages: list[str] = []
+
+            result = self.run_location(root, location_dir, log=lambda level, message: messages.append(message))
+
+        self.assertEqual(result.stats["created"], 2)
+        self.assertEqual(result.stats["invalid"], 3)
+        angel = Sweet.objects.get(name="安琪", location__slug="taipei")
+        self.assertEqual((angel.height_cm, angel.cup, angel.long_price), (160, "C", 3000))
+        self.assertEqual(Sweet.objects.get(name="優優").nationality, "台灣")
+        self.assertTrue(any("第 2 筆" in message for message in messages))
+
+    def test_images_are_matched_across_chunks_and_feeds_get_no_fallback(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            text_dir = root / "台中"
+            text_dir.mkdir()
+            (text_dir / "台中.txt").write_text("無圖\n身高:150\n\n天使\n身高:160\n", encoding="utf-8")
+            (text_dir / "天使.jpg").write_bytes(b"jpg")
+            feed_dir = root / "高雄"
+            feed_dir.mkdir()
+            (feed_dir / "feed.csv").write_text("名字,圖片\n優優,yoyo.jpg\n波波,\n", encoding="utf-8")
+            (feed_dir / "yoyo.jpg").write_bytes(b"jpg")
+            (feed_dir / "unrelated.jpg").write_bytes(b"jpg")
+
+            text_import = self.run_location(root, text_dir)
+            feed_import = self.run_location(root, feed_dir)
+
+        # The first chunk's unmatched entry no longer takes the second entry's image.
+        self.assertEqual(text_import.unmatched, ["無圖"])
+        self.assertTrue(Sweet.objects.get(name="天使", location__slug="taichung").image_url.endswith(".jpg"))
+        self.assertEqual(feed_import.unmatched, ["波波"])
+        self.assertEqual(Sweet.objects.get(name="波波").image_url, "")
+
+    def test_feeds_without_an_image_column_are_matched_by_name(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            location_dir = root / "台南"
+            location_dir.mkdir()
+            (location_dir / "feed.jsonl").write_text(
+                '{"name": "安琪"}\n{"name": "無圖"}\n{"name": "波波", "image": ""}\n', encoding="utf-8"
+            )
+            (location_dir / "安琪.jpg").write_bytes(b"jpg")
+            (location_dir / "波波.jpg").write_bytes(b"jpg")
+
+            result = self.run_location(root, location_dir)
+
+        # 波波's row has an image column, so it is not matched by name; nothing gets a queue guess.
+        self.assertEqual(result.unmatched, ["無圖", "波波"])
+        self.assertTrue(Sweet.objects.get(name="安琪", location__slug="tainan").image_url.endswith(".jpg"))
+
+
+class WorkerImportTestCase(TestCase):
+    def test_worker_returns_messages_summary_and_manifest_records(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            location_dir = root / "高雄"
+            location_dir.mkdir()
+            (location_dir / "高雄.txt").write_text("天使\n身高:160\n", encoding="utf-8")
+            (location_dir / "天使.jpg").write_bytes(b"jpg")
+            config = {
+                "source_dir": root,
+                "public_root": root / "public",
+                "ocr_cache_dir": None,
+                "ocr_workers": 1,
+                "image_workers": 1,
+                "dry_run": False,
+                "force": False,
+                "changed_only": False,
+                "chunk_size": 10,
+            }
+
+            outcome = import_sweets.import_location_in_worker(location_dir, {}, config)
+
+            self.assertTrue((root / "public" / "kaohsiung" / "tianshi.jpg").exists())
+
+        self.assertEqual(outcome["summary"]["processed"], 1)
+        self.assertEqual(set(outcome["summary"]["timings"]), set(import_sweets.PHASE_LABELS))
+        self.assertIn("kaohsiung/天使", outcome["manifest"]["entries"])
+        self.assertIn("kaohsiung", outcome["manifest"]["locations"])
+        self.assertTrue(any("tianshi.jpg" in message for _, message in outcome["messages"]))
+
+    def test_render_progress(self) -> None:
+        self.assertEqual(import_sweets.render_progress(1, 4, "台北", width=8), "[##......] 1/4 台北")
+
+
+class RenderVariantsTestCase(SimpleTestCase):
+    def test_variants_are_resized_without_upscaling(self) -> None:
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "photo.jpg"
+            Image.new("RGB", (600, 800), "pink").save(source)
+
+            variants = import_sweets.render_variants(str(source), tmp, "anqi", "/sweets/taipei")
+
+            self.assertTrue((root / "anqi-240.webp").exists())
+            self.assertTrue((root / "anqi-600.jpg").exists())
+
+        self.assertEqual(sorted({variant["width"] for variant in variants}), [240, 480, 600])
+        self.assertEqual({variant["format"] for variant in variants}, {"webp", "jpeg"})
+        small = next(variant for variant in variants if variant["width"] == 240)
+        self.assertEqual((small["height"], small["url"][:20]), (320, "/sweets/taipei/anqi-"))
+
+
+class DuplicateImageTestCase(SimpleTestCase):
+    def test_bk_tree_matches_brute_force_radius_search(self) -> None:
+        keys = [0, 0b1, 0b11, 0b1111_0000, 0xFFFF, 0xFFFE, 0x0F0F_0F0F]
+        tree = import_sweets.BKTree()
+        for key in keys:
+            tree.add(key, key)
+        for probe in (0, 0xFFFF, 0x0F0F_0F00):
+            found = sorted(item for _, item in tree.search(probe, 3))
+            expected = sorted(key for key in keys if import_sweets.hamming(probe, key) <= 3)
+            self.assertEqual(found, expected)
+
+    def test_resized_copy_is_clustered_and_its_name_still_matches(self) -> None:
+        from PIL import Image, ImageDraw
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            photo = Image.new("RGB", (320, 480), "white")
+            ImageDraw.Draw(photo).rectangle((40, 60, 200, 300), fill="black")
+            photo.save(root / "IMG_0001.jpg", quality=95)
+            photo.resize((160, 240)).save(root / "安琪.jpg", quality=60)
+            Image.new("RGB", (320, 480), "pink").save(root / "other.jpg")
+            images = sorted(root.iterdir())
+
+            hashes = {path: import_sweets.perceptual_hashes(str(path)) for path in images}
+            sizes = {path: path.stat().st_size for path in images}
+            duplicates = import_sweets.find_duplicate_images(hashes, sizes)
+
+            self.assertEqual(duplicates, {root / "IMG_0001.jpg": [root / "安琪.jpg"]})
+            matches = import_sweets.match_images(
+                ["安琪"], [root / "IMG_0001.jpg", root / "other.jpg"], aliases=duplicates
+            )
+            self.assertEqual(matches[0].image, root / "IMG_0001.jpg")
+            self.assertEqual(matches[0].method, "name")
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from unittest import mock
+
+import requests
+from django.test import TestCase
+from django.utils import timezone
+
+from api import reminders, services
+from api.models import Booking, LineUser, Location, Sweet
+
+
+class BookingReminderTestCase(TestCase):
+    def setUp(self) -> None:
+        location = Location.objects.create(slug="reminder", name="台北")
+        self.sweet = Sweet.objects.create(name="Reminder Sweet", location=location)
+        self.now = timezone.now()
+
+    def book(self, user: LineUser, hours: float, **extra) -> Booking:
+        # Like the LIFF form: the date is the bare day and the slot carries the time.
+        start = timezone.localtime(self.now + timedelta(hours=hours))
+        slot = f"{start:%H:%M}-{start + timedelta(hours=1):%H:%M}"
+        date = services.start_of_day(start.date())
+        fields = {"slot_day": start.date(), "slot_active": True, **extra}
+        return Booking.objects.create(
+            user=user,
+            sweet=self.sweet,
+            date=date,
+            time_slot=slot,
+            slot_start=services.slot_start_for(date, slot),
+            **fields,
+        )
+
+    def test_due_bookings_are_pushed_once_grouped_per_user(self) -> None:
+        alice = LineUser.objects.create(line_user_id="Ualice", display_name="Alice")
+        bob = LineUser.objects.create(line_user_id="Ubob", display_name="Bob")
+        due = [self.book(alice, 0.5), self.book(alice, 1), self.book(bob, 1.5)]
+        self.book(bob, 5)
+        self.book(bob, 1, status=Booking.Status.CANCELLED, slot_active=None)
+        push = mock.Mock()
+
+        stats = reminders.send_due_reminders(batch_size=2, workers=2, push=push, now=self.now)
+
+        self.assertEqual(stats, {"reminded": 3, "failed": 0, "dropped": 0, "pushes": 2})
+        recipients = sorted((call.args[0], len(call.args[1])) for call in push.call_args_list)
+        self.assertEqual(recipients, [("Ualice", 2), ("Ubob", 1)])
+        self.assertEqual(
+            set(Booking.objects.filter(reminder_sent_at__isnull=False).values_list("id", flat=True)),
+            {booking.id for booking in due},
+        )
+
+        push.reset_mock()
+        self.assertEqual(reminders.send_due_reminders(push=push, now=self.now)["reminded"], 0)
+        push.assert_not_called()
+
+    def test_failed_push_releases_claim_and_reuses_retry_key(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uretry", display_name="Retry")
+        booking = self.book(user, 1)
+        failing = mock.Mock(side_effect=RuntimeError("LINE down"))
+
+        stats = reminders.send_due_reminders(push=failing, now=self.now)
+
+        self.assertEqual(stats["failed"], 1)
+        booking.refresh_from_db()
+        self.assertIsNone(booking.reminder_sent_at)
+
+        push = mock.Mock()
+        reminders.send_due_reminders(push=push, now=self.now)
+        self.assertEqual(push.call_args.kwargs["retry_key"], failing.call_args.kwargs["retry_key"])
+
+    def test_rejected_pushes_are_not_retried_and_do_not_block_later_batches(self) -> None:
+        users = [
+            LineUser.objects.create(line_user_id=f"U{name}", display_name=name) for name in ("blocked", "busy", "ok")
+        ]
+        bookings = [self.book(user, 0.5 + index * 0.25) for index, user in enumerate(users)]
+
+        def push(to, messages, **kwargs):
+            status_code = {"Ublocked": 400, "Ubusy": 503}.get(to)
+            if status_code:
+                response = requests.Response()
+                response.status_code = status_code
+                raise requests.HTTPError(response=response)
+
+        stats = reminders.send_due_reminders(batch_size=1, push=push, now=self.now)
+
+        self.assertEqual(stats, {"reminded": 1, "failed": 1, "dropped": 1, "pushes": 3})
+        sent = dict(Booking.objects.filter(id__in=[b.id for b in bookings]).values_list("id", "reminder_sent_at"))
+        self.assertIsNotNone(sent[bookings[0].id])
+        self.assertIsNone(sent[bookings[1].id])
+        self.assertIsNotNone(sent[bookings[2].id])
+
+        retry = mock.Mock()
+        reminders.send_due_reminders(push=retry, now=self.now)
+        self.assertEqual([call.args[0] for call in retry.call_args_list], ["Ubusy"])
+
+    def test_window_follows_the_slot_time_not_the_booking_day(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uslot", display_name="Slot")
+        services.create_booking(
+            user=user, sweet_id=self.sweet.id, date_str="2026-12-02", time_slot="19:00-20:00", note=None
+        )
+        night_before = timezone.make_aware(datetime(2026, 12, 1, 22, 30))
+        push = mock.Mock()
+
+        self.assertEqual(reminders.send_due_reminders(push=push, now=night_before)["reminded"], 0)
+        stats = reminders.send_due_reminders(push=push, now=timezone.make_aware(datetime(2026, 12, 2, 17, 30)))
+        self.assertEqual(stats["reminded"], 1)
+        self.assertEqual(push.call_count, 1)
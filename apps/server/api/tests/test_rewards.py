@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import csv
+import json
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from io import StringIO
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api import auth as api_auth, campaigns, expiry, services
+from api.models import LineUser, Location, RewardCampaign, RewardLog, Sweet
+
+
+def ledger_total(user: LineUser) -> int:
+    return RewardLog.objects.filter(user=user).aggregate(total=Sum("delta"))["total"] or 0
+
+
+class RewardLedgerTestCase(TestCase):
+    def test_stale_instances_do_not_lose_updates(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uledger", display_name="Ledger")
+        first = LineUser.objects.get(pk=user.pk)
+        second = LineUser.objects.get(pk=user.pk)
+
+        services.adjust_reward_points(user=first, delta=30, reason="a")
+        services.adjust_reward_points(user=second, delta=20, reason="b")
+        updated, delta = services.set_reward_points(user=first, reward_points=100, reason="set")
+
+        self.assertEqual(second.reward_points, 50)
+        self.assertEqual(delta, 50)
+        self.assertEqual(updated.reward_points, 100)
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, 100)
+        self.assertEqual(ledger_total(user), 100)
+
+    def test_fallback_without_returning_reads_back_balance(self) -> None:
+        user = LineUser.objects.create(line_user_id="Ufallback", display_name="Fallback", reward_points=5)
+        with mock.patch.object(services, "supports_update_returning", return_value=False):
+            services.adjust_reward_points(user=user, delta=7, reason="fallback")
+        self.assertEqual(user.reward_points, 12)
+
+    def test_missing_user_raises(self) -> None:
+        ghost = LineUser(id=999999, line_user_id="Ughost")
+        with self.assertRaises(LineUser.DoesNotExist):
+            services.adjust_reward_points(user=ghost, delta=5, reason="ghost")
+        self.assertFalse(RewardLog.objects.filter(user_id=999999).exists())
+
+
+class RewardInterleavingTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database so each thread gets its own write lock")
+
+    def test_increment_waits_for_the_open_write_instead_of_reading_it(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uinterleave", display_name="Interleave")
+        holding, release = threading.Event(), threading.Event()
+        results: dict[str, int] = {}
+        errors: list[BaseException] = []
+
+        def first() -> None:
+            try:
+                with transaction.atomic():
+                    results["first"] = services.increment_reward_points(user.pk, 5)
+                    holding.set()
+                    release.wait(5)
+            except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+                errors.append(exc)
+                holding.set()
+            finally:
+                connections.close_all()
+
+        def second() -> None:
+            try:
+                with transaction.atomic():
+                    results["second"] = services.increment_reward_points(user.pk, 7)
+            except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        writer = threading.Thread(target=first)
+        writer.start()
+        self.assertTrue(holding.wait(5))
+        # The second increment starts while the first is uncommitted. A read-modify-write would read
+        # the balance before the 5 lands and then either overwrite it or fail to upgrade its lock.
+        contender = threading.Thread(target=second)
+        contender.start()
+        contender.join(0.2)
+        release.set()
+        writer.join()
+        contender.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, {"first": 5, "second": 12})
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, 12)
+
+
+@unittest.skipIf(connection.vendor == "sqlite", "SQLite serializes writers; run against MySQL/PostgreSQL")
+class RewardConcurrencyTestCase(TransactionTestCase):
+    def test_concurrent_adjustments_keep_balance_equal_to_ledger(self) -> None:
+        user = LineUser.objects.create(line_user_id="Ustress", display_name="Stress")
+        threads, rounds = 8, 25
+        errors: list[BaseException] = []
+
+        def worker() -> None:
+            stale = LineUser.objects.get(pk=user.pk)
+            try:
+                for _ in range(rounds):
+                    services.adjust_reward_points(user=stale, delta=1, reason="stress")
+            except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        user.refresh_from_db()
+        self.assertEqual(user.reward_points, threads * rounds)
+        self.assertEqual(ledger_total(user), threads * rounds)
+
+
+class RewardHistoryTestCase(TestCase):
+    def test_logs_are_paginated_and_months_rolled_up(self) -> None:
+        user = LineUser.objects.create(line_user_id="Uhistory", display_name="History")
+        for delta in (10, 20, -5, 40, -15):
+            services.adjust_reward_points(user=user, delta=delta, reason="history")
+        last_month = timezone.localdate().replace(day=1) - timedelta(days=1)
+        old_log = RewardLog(user=user, delta=7, reason="old")
+        old_log.created_at = timezone.make_aware(datetime.combine(last_month, datetime.min.time()))
+        services.bump_reward_rollups([old_log])
+        token = api_auth.issue_jwt(user)
+
+        first = self.client.get(f"/api/reward/{user.id}?limit=3", HTTP_AUTHORIZATION=f"Bearer {token}").json()["reward"]
+        self.assertEqual([log["delta"] for log in first["logs"]], [-15, 40, -5])
+        second = self.client.get(
+            f"/api/reward/{user.id}?limit=3&cursor={first['next']}", HTTP_AUTHORIZATION=f"Bearer {token}"
+        ).json()["reward"]
+        self.assertEqual([log["delta"] for log in second["logs"]], [20, 10])
+        self.assertIsNone(second["next"])
+
+        self.assertEqual(first["user"]["reward_points"], 50)
+        current, previous = first["monthly"]
+        self.assertEqual(
+            (current["earned"], current["spent"], current["net"], current["log_count"]),
+            (70, 20, 50, 5),
+        )
+        self.assertEqual(previous["month"], last_month.strftime("%Y-%m"))
+        self.assertEqual(previous["earned"], 7)
+
+
+@override_settings(OPERATOR_API_TOKEN="operator-secret")
+class RewardCampaignTestCase(TestCase):
+    def setUp(self) -> None:
+        self.taipei = Location.objects.create(slug="campaign-tp", name="台北")
+        kaohsiung = Location.objects.create(slug="campaign-ks", name="高雄")
+        tp_sweet = Sweet.objects.create(name="TP", location=self.taipei)
+        ks_sweet = Sweet.objects.create(name="KS", location=kaohsiung)
+        self.users = [LineUser.objects.create(line_user_id=f"Ucamp{index}") for index in range(5)]
+        for index, user in enumerate(self.users):
+            sweet = tp_sweet if index < 4 else ks_sweet
+            services.create_booking(user=user, sweet_id=sweet.id, date_str="2026-09-15", time_slot=f"{index}", note=None)
+
+    def test_campaign_targets_filter_and_resumes_after_interruption(self) -> None:
+        campaign = campaigns.create_campaign(
+            name="九月台北回饋",
+            delta=30,
+            reason="九月台北回饋",
+            filters={"location": "campaign-tp", "bookedFrom": "2026-09-01", "bookedTo": "2026-09-30"},
+        )
+        runner = campaigns.run_campaign(campaign, chunk_size=3)
+        first = next(runner)
+        self.assertEqual((first["processed"], first["total"]), (3, 4))
+        runner.close()  # simulate a crash after the first committed chunk
+
+        resumed = RewardCampaign.objects.get(pk=campaign.pk)
+        rows = list(campaigns.run_campaign(resumed, chunk_size=3))
+        self.assertEqual(rows[-1]["status"], RewardCampaign.Status.COMPLETED)
+        self.assertEqual(rows[-1]["processed"], 4)
+
+        points = dict(LineUser.objects.values_list("line_user_id", "reward_points"))
+        booked = services.BOOKING_REWARD_POINTS
+        self.assertEqual([points[f"Ucamp{index}"] for index in range(5)], [booked + 30] * 4 + [booked])
+        self.assertEqual(RewardLog.objects.filter(reason="九月台北回饋").count(), 4)
+        self.assertEqual(list(campaigns.run_campaign(resumed)), [])
+
+    def test_operator_api_streams_progress(self) -> None:
+        response = self.client.post(
+            "/api/operator/reward-campaigns",
+            data={"name": "全站加碼", "delta": 5},
+            content_type="application/json",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[-1]["processed"], 5)
+
+        detail = self.client.get(
+            f"/api/operator/reward-campaigns/{rows[-1]['campaignId']}",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        self.assertEqual(detail.json()["campaign"]["status"], "COMPLETED")
+        for user in self.users:
+            user.refresh_from_db()
+            self.assertEqual(user.reward_points, ledger_total(user))
+
+        invalid = self.client.post(
+            "/api/operator/reward-campaigns",
+            data={"name": "bad", "delta": 5, "filters": {"city": "x"}},
+            content_type="application/json",
+            HTTP_X_OPERATOR_TOKEN="operator-secret",
+        )
+        self.assertEqual(invalid.status_code, 400)
+
+    async def test_operator_api_reports_each_chunk_under_asgi(self) -> None:
+        run_in_chunks_of_two = partial(campaigns.run_campaign, chunk_size=2)
+        with mock.patch.object(campaigns, "run_campaign", run_in_chunks_of_two):
+            response = await AsyncClient().post(
+                "/api/operator/reward-campaigns",
+                data={"name": "逐批回報", "delta": 5},
+                content_type="application/json",
+                headers={"X-Operator-Token": "operator-secret"},
+            )
+            self.assertTrue(response.is_async)
+            rows = aiter(response)
+            first = json.loads(await anext(rows))
+            campaign = await RewardCampaign.objects.aget(pk=first["campaignId"])
+            # The first line arrives while the rest of the campaign is still to run.
+            self.assertEqual((first["processed"], campaign.status), (2, RewardCampaign.Status.RUNNING))
+            rest = [json.loads(line) async for line in rows]
+        self.assertEqual([row["processed"] for row in rest], [4, 5, 5])
+        self.assertEqual(rest[-1]["status"], RewardCampaign.Status.COMPLETED)
+
+
+class RewardLeaderboardTestCase(TestCase):
+    def setUp(self) -> None:
+        cache.delete(services.LEADERBOARD_CACHE_KEY)
+
+    def test_leaderboard_ranks_ties_and_is_cached(self) -> None:
+        users = [
+            LineUser.objects.create(line_user_id=f"Ulead{index}", display_name=f"P{index}", reward_points=points)
+            for index, points in enumerate([300, 500, 300, 100])
+        ]
+        token = api_auth.issue_jwt(users[2])
+
+        response = self.client.get("/api/reward/leaderboard?limit=3", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [(entry["rank"], entry["displayName"]) for entry in body["leaderboard"]],
+            [(1, "P1"), (2, "P0"), (2, "P2")],
+        )
+        self.assertEqual(body["me"], {"rank": 2, "rewardPoints": 300})
+
+        LineUser.objects.filter(pk=users[3].pk).update(reward_points=1000)
+        with self.assertNumQueries(2):  # auth user + my rank; the board itself comes from cache
+            cached = self.client.get("/api/reward/leaderboard", HTTP_AUTHORIZATION=f"Bearer {token}").json()
+        self.assertEqual(cached["leaderboard"][0]["displayName"], "P1")
+        self.assertEqual(cached["me"]["rank"], 3)
+
+
+class RewardReconciliationTestCase(TestCase):
+    def test_reports_and_repairs_drift(self) -> None:
+        clean = LineUser.objects.create(line_user_id="Uclean")
+        drifted = LineUser.objects.create(line_user_id="Udrift")
+        unlogged = LineUser.objects.create(line_user_id="Uunlogged")
+        services.adjust_reward_points(user=clean, delta=40, reason="ok")
+        services.adjust_reward_points(user=drifted, delta=40, reason="ok")
+        stale_at = timezone.now() - timedelta(days=30)
+        LineUser.objects.filter(pk=drifted.pk).update(reward_points=55, updated_at=stale_at)
+        LineUser.objects.filter(pk=unlogged.pk).update(reward_points=12)
+        RewardLog.objects.create(user_id=987654, delta=5, reason="orphan")
+
+        report = StringIO()
+        call_command("reconcile_rewards", chunk_size=2, workers=1, stdout=report, stderr=StringIO())
+        rows = {row[0]: row for row in csv.reader(report.getvalue().splitlines()[1:])}
+        self.assertEqual(rows[str(drifted.pk)][1:], ["55", "40", "15", "mismatch"])
+        self.assertEqual(rows[str(unlogged.pk)][1:], ["12", "0", "12", "mismatch"])
+        self.assertEqual(rows["987654"][-1], "orphan_logs")
+        self.assertNotIn(str(clean.pk), rows)
+
+        call_command("reconcile_rewards", workers=1, repair="balance", stdout=StringIO(), stderr=StringIO())
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.reward_points, 40)
+        self.assertGreater(drifted.updated_at, stale_at)
+        LineUser.objects.filter(pk=unlogged.pk).update(reward_points=12)
+        call_command("reconcile_rewards", workers=1, repair="ledger", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(ledger_total(unlogged), 12)
+
+        report = StringIO()
+        call_command("reconcile_rewards", workers=1, stdout=report, stderr=StringIO())
+        self.assertEqual([row[-1] for row in csv.reader(report.getvalue().splitlines()[1:])], ["orphan_logs"])
+
+
+class RewardExpiryTestCase(TestCase):
+    def grant(self, user: LineUser, delta: int, days_ago: int) -> None:
+        services.adjust_reward_points(user=user, delta=delta, reason="test")
+        log = RewardLog.objects.filter(user=user).latest("id")
+        RewardLog.objects.filter(pk=log.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def test_expires_unspent_old_points_once(self) -> None:
+        partly_spent = LineUser.objects.create(line_user_id="Uexp1")
+        self.grant(partly_spent, 100, days_ago=430)
+        self.grant(partly_spent, -30, days_ago=20)
+        self.grant(partly_spent, 50, days_ago=20)
+        fully_spent = LineUser.objects.create(line_user_id="Uexp2")
+        self.grant(fully_spent, 40, days_ago=430)
+        self.grant(fully_spent, -60, days_ago=20)
+        self.grant(fully_spent, 100, days_ago=20)
+        drifted = LineUser.objects.create(line_user_id="Uexp3")
+        self.grant(drifted, 20, days_ago=430)
+        LineUser.objects.filter(pk=drifted.pk).update(reward_points=5)
+
+        with mock.patch.object(LineUser.objects, "select_for_update") as locking:
+            call_command("expire_reward_points", months=12, dry_run=True, stdout=StringIO(), stderr=StringIO())
+        locking.assert_not_called()
+        self.assertFalse(RewardLog.objects.filter(reason=expiry.EXPIRY_REASON).exists())
+
+        output = StringIO()
+        call_command("expire_reward_points", months=12, chunk_size=2, stdout=output, stderr=StringIO())
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sum(row["points"] for row in rows), 75)
+
+        for user, balance in ((partly_spent, 50), (fully_spent, 80), (drifted, 0)):
+            user.refresh_from_db()
+            self.assertEqual(user.reward_points, balance)
+        self.assertEqual(
+            dict(RewardLog.objects.filter(reason=expiry.EXPIRY_REASON).values_list("user_id", "delta")),
+            {partly_spent.pk: -70, drifted.pk: -5},
+        )
+
+        output = StringIO()
+        call_command("expire_reward_points", months=12, stdout=output, stderr=StringIO())
+        self.assertEqual(sum(json.loads(line)["points"] for line in output.getvalue().splitlines()), 0)
+
+    def test_cutoff_clamps_to_month_end(self) -> None:
+        now = timezone.make_aware(datetime(2026, 3, 31, 15, 30))
+        self.assertEqual(expiry.expiry_cutoff(1, now).date().isoformat(), "2026-02-28")
+        self.assertEqual(expiry.expiry_cutoff(15, now).date().isoformat(), "2024-12-31")
@@ -5,9 +5,38 @@ from . import views
 urlpatterns = [
     path("login", views.LoginView.as_view(), name="api-login"),
     path("login/me", views.MeView.as_view(), name="api-me"),
+    path("bootstrap", views.BootstrapView.as_view(), name="api-bootstrap"),
     path("sweets", views.SweetsView.as_view(), name="api-sweets"),
     path("sweets/<int:sweet_id>/reviews", views.SweetReviewView.as_view(), name="api-sweet-reviews"),
+    path(
+        "sweets/<int:sweet_id>/availability",
+        views.SweetAvailabilityView.as_view(),
+        name="api-sweet-availability",
+    ),
+    path("events", views.event_stream, name="api-events"),
     path("booking", views.BookingCreateView.as_view(), name="api-booking-create"),
+    path("booking/batch", views.BookingBatchCreateView.as_view(), name="api-booking-batch"),
     path("booking/<int:user_id>", views.BookingListView.as_view(), name="api-booking-list"),
+    path("reward/leaderboard", views.RewardLeaderboardView.as_view(), name="api-reward-leaderboard"),
     path("reward/<int:user_id>", views.RewardView.as_view(), name="api-reward"),
+    path(
+        "operator/bookings/status",
+        views.OperatorBookingStatusView.as_view(),
+        name="api-operator-booking-status",
+    ),
+    path(
+        "operator/bookings/export.<str:export_format>",
+        views.OperatorBookingExportView.as_view(),
+        name="api-operator-booking-export",
+    ),
+    path(
+        "operator/reward-campaigns",
+        views.OperatorRewardCampaignView.as_view(),
+        name="api-operator-reward-campaigns",
+    ),
+    path(
+        "operator/reward-campaigns/<int:campaign_id>",
+        views.OperatorRewardCampaignDetailView.as_view(),
+        name="api-operator-reward-campaign",
+    ),
 ]
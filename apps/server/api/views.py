@@ -1,24 +1,45 @@
 from __future__ import annotations
 
+import json
+from datetime import date, datetime, timedelta
 from typing import Any
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .auth import JWTError, authenticate_token
 from .authentication import LineJWTAuthentication
+from .conditional import conditional, latest
+from .idempotency import idempotent
+from .permissions import IsOperator
+from .pagination import paginate_by_id, paginate_newest_first, parse_page_size
 from .serializers import (
     BookingSerializer,
+    CompactBookingSerializer,
     LineUserSerializer,
     RewardLogSerializer,
+    RewardMonthlyRollupSerializer,
     SweetReviewSerializer,
     SweetSerializer,
 )
-from . import services
-from .models import LineUser, Sweet
+from .streaming import streaming_response
+from . import campaigns, events, exports, services
+from .models import LineUser, RewardCampaign, Sweet
 from linebot import line_auth
 
 
+MAX_BULK_BOOKING_IDS = 20000
+MAX_BATCH_BOOKINGS = 50
+BOOTSTRAP_PAGE_SIZE = 5
+BOOTSTRAP_CATALOG_SIZE = 20
+
+
 class LoginSerializer(serializers.Serializer):
     idToken = serializers.CharField(required=True, allow_blank=False, write_only=True)
 
@@ -30,16 +51,98 @@ class BookingCreateSerializer(serializers.Serializer):
     note = serializers.CharField(required=False, allow_blank=True)
 
 
+class BookingBatchCreateSerializer(serializers.Serializer):
+    bookings = serializers.ListField(
+        child=BookingCreateSerializer(),
+        allow_empty=False,
+        max_length=MAX_BATCH_BOOKINGS,
+    )
+
+
 class RewardUpdateSerializer(serializers.Serializer):
     rewardPoints = serializers.IntegerField(min_value=0)
     reason = serializers.CharField(required=False, allow_blank=True, default="調整積分")
 
 
+class BookingStatusUpdateSerializer(serializers.Serializer):
+    bookingIds = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_BOOKING_IDS,
+    )
+    status = serializers.ChoiceField(choices=list(services.BOOKING_TRANSITIONS))
+
+
+class RewardCampaignCreateSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    delta = serializers.IntegerField()
+    reason = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    filters = serializers.DictField(required=False, default=dict)
+
+
 class SweetReviewCreateSerializer(serializers.Serializer):
     rating = serializers.IntegerField(min_value=1, max_value=5)
     comment = serializers.CharField(required=False, allow_blank=True, max_length=1000)
 
 
+def image_width_context(request) -> dict[str, Any]:
+    context: dict[str, Any] = {}
+    raw = request.GET.get("imageWidth")
+    if raw and raw.isdigit():
+        context["image_width"] = min(int(raw), 4096)
+    if request.GET.get("imageVariants") in ("1", "true"):
+        context["include_image_variants"] = True
+    return context
+
+
+def parse_day_param(request, name: str) -> date | None:
+    raw = request.GET.get(name)
+    if not raw:
+        return None
+    return date.fromisoformat(raw)
+
+
+def me_validators(request):
+    user = request.user
+    return (user.reward_points, user.updated_at.isoformat()), user.updated_at
+
+
+def booking_list_queryset(request):
+    return services.list_bookings_for_user(
+        request.user,
+        status=request.GET.get("status") or None,
+        created_from=parse_day_param(request, "from"),
+        created_to=parse_day_param(request, "to"),
+    )
+
+
+def booking_list_validators(request, user_id: int):
+    if request.user.id != user_id:
+        return None
+    try:
+        rows, more = services.booking_page_validators(
+            booking_list_queryset(request),
+            cursor=request.GET.get("cursor"),
+            limit=parse_page_size(request.GET.get("limit")),
+            with_reviews=request.GET.get("sweet") != "summary",
+        )
+    except ValueError:
+        # Let the handler answer the 400.
+        return None
+    changed = (value for row in rows for value in row if isinstance(value, datetime))
+    return (*rows, more), latest(*changed)
+
+
+def reward_validators(request, user_id: int):
+    if request.user.id != user_id:
+        return None
+    user = request.user
+    values = services.reward_log_validators(user)
+    return (user.reward_points, user.updated_at.isoformat(), *values.values()), latest(
+        user.updated_at, values["changed"]
+    )
+
+
 class LoginView(APIView):
     authentication_classes: list[Any] = []
     permission_classes: list[Any] = []
@@ -59,6 +162,7 @@ class LoginView(APIView):
 class MeView(APIView):
     authentication_classes = [LineJWTAuthentication]
 
+    @conditional(me_validators)
     def get(self, request):
         return Response({"user": LineUserSerializer(request.user).data})
 
@@ -69,13 +173,69 @@ class SweetsView(APIView):
     def get(self, request):
         location_slug = request.GET.get("location")
         sweets = services.list_sweets(location_slug=location_slug)
-        data = SweetSerializer(sweets, many=True).data
-        return Response({"sweets": data})
+        next_cursor = None
+        # Paged only on request, so clients that expect the whole catalog keep getting it.
+        if "cursor" in request.GET or "limit" in request.GET:
+            try:
+                sweets, next_cursor = paginate_by_id(
+                    sweets,
+                    cursor=request.GET.get("cursor"),
+                    limit=parse_page_size(request.GET.get("limit")),
+                )
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        data = SweetSerializer(sweets, many=True, context=image_width_context(request)).data
+        return Response({"sweets": data, "next": next_cursor})
+
+
+class BootstrapView(APIView):
+    """Everything the LIFF app needs for its first paint, in one request.
+
+    Besides the authentication lookup this costs three queries: the first catalog page,
+    the newest reward logs and the newest bookings (with their sweets joined in). Each
+    section carries a ``next`` cursor for the matching list endpoint.
+    """
+
+    authentication_classes = [LineJWTAuthentication]
+
+    def get(self, request):
+        user = request.user
+        context = image_width_context(request)
+        sweets, sweets_next = paginate_by_id(
+            services.list_sweets(location_slug=request.GET.get("location")),
+            cursor=None,
+            limit=BOOTSTRAP_CATALOG_SIZE,
+        )
+        logs, logs_next = paginate_newest_first(
+            services.list_reward_logs_for_user(user), cursor=None, limit=BOOTSTRAP_PAGE_SIZE
+        )
+        bookings, bookings_next = paginate_newest_first(
+            services.list_bookings_for_user(user), cursor=None, limit=BOOTSTRAP_PAGE_SIZE
+        )
+        return Response(
+            {
+                "user": LineUserSerializer(user).data,
+                "sweets": {
+                    "sweets": SweetSerializer(sweets, many=True, context=context).data,
+                    "next": sweets_next,
+                },
+                "reward": {
+                    "rewardPoints": user.reward_points,
+                    "logs": RewardLogSerializer(logs, many=True).data,
+                    "next": logs_next,
+                },
+                "bookings": {
+                    "bookings": CompactBookingSerializer(bookings, many=True, context=context).data,
+                    "next": bookings_next,
+                },
+            }
+        )
 
 
 class BookingCreateView(APIView):
     authentication_classes = [LineJWTAuthentication]
 
+    @idempotent("booking:create")
     def post(self, request):
         serializer = BookingCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -92,44 +252,121 @@ class BookingCreateView(APIView):
             return Response({"error": "Sweet not found"}, status=status.HTTP_404_NOT_FOUND)
         except LineUser.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        except services.BookingConflictError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
         except ValueError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"booking": BookingSerializer(booking).data}, status=status.HTTP_201_CREATED)
 
 
+class BookingBatchCreateView(APIView):
+    authentication_classes = [LineJWTAuthentication]
+
+    @idempotent("booking:batch")
+    def post(self, request):
+        serializer = BookingBatchCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            bookings = services.create_bookings_batch(user=request.user, items=serializer.validated_data["bookings"])
+        except services.BookingBatchError as exc:
+            return Response(
+                {
+                    "error": str(exc),
+                    "results": [{"index": index, "error": message} for index, message in sorted(exc.errors.items())],
+                },
+                status=status.HTTP_409_CONFLICT if exc.conflict else status.HTTP_400_BAD_REQUEST,
+            )
+        except services.BookingConflictError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        services.attach_review_summaries({booking.sweet_id: booking.sweet for booking in bookings}.values())
+        data = BookingSerializer(bookings, many=True).data
+        return Response(
+            {"results": [{"index": index, "booking": item} for index, item in enumerate(data)]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class BookingListView(APIView):
     authentication_classes = [LineJWTAuthentication]
 
+    @conditional(booking_list_validators)
     def get(self, request, user_id: int):
         if request.user.id != user_id:
             return Response(
                 {"error": "Cannot view other users' bookings"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        bookings = services.list_bookings_for_user(request.user)
-        return Response({"bookings": BookingSerializer(bookings, many=True).data})
+        try:
+            bookings, next_cursor = paginate_newest_first(
+                booking_list_queryset(request),
+                cursor=request.GET.get("cursor"),
+                limit=parse_page_size(request.GET.get("limit")),
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        context = image_width_context(request)
+        if request.GET.get("sweet") == "summary":
+            data = CompactBookingSerializer(bookings, many=True, context=context).data
+        else:
+            services.attach_review_summaries({booking.sweet_id: booking.sweet for booking in bookings}.values())
+            data = BookingSerializer(bookings, many=True, context=context).data
+        return Response({"bookings": data, "next": next_cursor})
+
+
+class RewardLeaderboardView(APIView):
+    authentication_classes = [LineJWTAuthentication]
+
+    def get(self, request):
+        raw = request.GET.get("limit") or ""
+        limit = min(int(raw), services.LEADERBOARD_SIZE) if raw.isdigit() and int(raw) > 0 else 20
+        return Response(
+            {
+                "leaderboard": services.get_reward_leaderboard(limit),
+                "me": {
+                    "rank": services.get_reward_rank(request.user),
+                    "rewardPoints": request.user.reward_points,
+                },
+            }
+        )
 
 
 class RewardView(APIView):
     authentication_classes = [LineJWTAuthentication]
 
+    @conditional(reward_validators)
     def get(self, request, user_id: int):
         if request.user.id != user_id:
             return Response(
                 {"error": "Cannot view other users' rewards"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        user, logs = services.get_reward_summary(request.user)
+        try:
+            logs, next_cursor = paginate_newest_first(
+                services.list_reward_logs_for_user(request.user),
+                cursor=request.GET.get("cursor"),
+                limit=parse_page_size(request.GET.get("limit")),
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # request.user was loaded by the authentication class for this request, so it is current.
         return Response(
             {
                 "reward": {
-                    "user": LineUserSerializer(user).data,
+                    "user": LineUserSerializer(request.user).data,
                     "logs": RewardLogSerializer(logs, many=True).data,
+                    "monthly": RewardMonthlyRollupSerializer(
+                        services.list_monthly_rewards(request.user), many=True
+                    ).data,
+                    "next": next_cursor,
                 }
             }
         )
 
+    @idempotent("reward:update")
     def put(self, request, user_id: int):
         if request.user.id != user_id:
             return Response(
@@ -197,3 +434,143 @@ class SweetReviewView(APIView):
             },
             status=status.HTTP_201_CREATED,
         )
+
+
+class SweetAvailabilityView(APIView):
+    authentication_classes = [LineJWTAuthentication]
+
+    def get(self, request, sweet_id: int):
+        try:
+            start = parse_day_param(request, "from") or timezone.localdate()
+            end = parse_day_param(request, "to") or start + timedelta(days=13)
+        except ValueError:
+            return Response({"error": "Invalid date, expected YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            booked = services.get_slot_availability(sweet_id=sweet_id, start=start, end=end)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {
+                "sweetId": sweet_id,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "days": [
+                    {"date": day.isoformat(), "bookedSlots": slots}
+                    for day, slots in booked.items()
+                ],
+            }
+        )
+
+
+class OperatorBookingStatusView(APIView):
+    authentication_classes: list[Any] = []
+    permission_classes = [IsOperator]
+
+    def post(self, request):
+        serializer = BookingStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data
+        results = services.transition_bookings(payload["bookingIds"], payload["status"])
+
+        def report():
+            counts: dict[str, int] = {}
+            for row in results:
+                counts[row["result"]] = counts.get(row["result"], 0) + 1
+                yield json.dumps(row) + "\n"
+            yield json.dumps({"summary": counts}) + "\n"
+
+        return streaming_response(request, report(), content_type="application/x-ndjson")
+
+
+class OperatorBookingExportView(APIView):
+    authentication_classes: list[Any] = []
+    permission_classes = [IsOperator]
+
+    def get(self, request, export_format: str):
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response({"error": "Unsupported export format"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            queryset = exports.export_queryset(
+                start=parse_day_param(request, "from"),
+                end=parse_day_param(request, "to"),
+                location_slug=request.GET.get("location") or None,
+                status=request.GET.get("status") or None,
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        render, content_type, extension = exports.EXPORT_FORMATS[export_format]
+        # Each keyset page is fetched only when the client has taken the previous chunks.
+        response = streaming_response(request, render(exports.iter_export_rows(queryset)), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="bookings.{extension}"'
+        return response
+
+
+def stream_campaign(request, campaign: RewardCampaign) -> StreamingHttpResponse:
+    # One progress line is sent as soon as each chunk commits.
+    rows = campaigns.run_campaign(campaign)
+    return streaming_response(request, (json.dumps(row) + "\n" for row in rows), content_type="application/x-ndjson")
+
+
+class OperatorRewardCampaignView(APIView):
+    authentication_classes: list[Any] = []
+    permission_classes = [IsOperator]
+
+    def post(self, request):
+        serializer = RewardCampaignCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data
+        try:
+            campaign = campaigns.create_campaign(
+                name=payload["name"],
+                delta=payload["delta"],
+                reason=payload.get("reason") or payload["name"],
+                filters=payload["filters"],
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return stream_campaign(request, campaign)
+
+
+class OperatorRewardCampaignDetailView(APIView):
+    authentication_classes: list[Any] = []
+    permission_classes = [IsOperator]
+
+    def get(self, request, campaign_id: int):
+        try:
+            campaign = RewardCampaign.objects.get(pk=campaign_id)
+        except RewardCampaign.DoesNotExist:
+            return Response({"error": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"campaign": campaigns.progress(campaign)})
+
+    def post(self, request, campaign_id: int):
+        try:
+            campaign = RewardCampaign.objects.get(pk=campaign_id)
+        except RewardCampaign.DoesNotExist:
+            return Response({"error": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+        return stream_campaign(request, campaign)
+
+
+@require_GET
+async def event_stream(request):
+    """Server-Sent Events with the signed-in user's booking and reward changes.
+
+    Needs an ASGI server. ``EventSource`` cannot send headers, so the JWT may also be
+    passed as ``?token=``.
+    """
+    header = request.headers.get("Authorization", "")
+    token = header.removeprefix("Bearer ") if header.startswith("Bearer ") else request.GET.get("token", "")
+    try:
+        user, _ = await sync_to_async(authenticate_token)(token)
+    except JWTError as exc:
+        return JsonResponse({"error": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    response = StreamingHttpResponse(
+        events.stream(user.id, keepalive=settings.SSE_KEEPALIVE_SECONDS),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import List, Mapping
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+API_BASE = "https://api.line.me/v2/bot/message"
+PUSH_MAX_MESSAGES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 class LineMessagingClient:
-    def __init__(self, access_token: str) -> None:
+    def __init__(self, access_token: str, pool_size: int = 16) -> None:
         self.access_token = access_token
+        # One pooled session keeps TLS connections to the LINE API alive across pushes.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.access_token}",
+        }
 
     def reply_message(self, reply_token: str, messages: List[Mapping]) -> None:
         payload = {
@@ -19,17 +35,48 @@ class LineMessagingClient:
             "messages": messages,
         }
         response = requests.post(
-            "https://api.line.me/v2/bot/message/reply",
+            f"{API_BASE}/reply",
             json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.access_token}",
-            },
+            headers=self.headers(),
             timeout=10,
         )
         if not response.ok:
             logger.error("LINE reply failed: %s %s", response.status_code, response.text[:200])
             response.raise_for_status()
 
+    def push_message(
+        self,
+        to: str,
+        messages: List[Mapping],
+        *,
+        retry_key: str | None = None,
+        attempts: int = 3,
+    ) -> None:
+        """Push up to five messages to one user.
+
+        ``retry_key`` is sent as ``X-Line-Retry-Key`` so LINE drops duplicates of a request
+        it already accepted; a 409 answer for that key therefore counts as delivered.
+        """
+        if len(messages) > PUSH_MAX_MESSAGES:
+            raise ValueError(f"LINE push accepts at most {PUSH_MAX_MESSAGES} messages")
+        headers = self.headers()
+        if retry_key:
+            headers["X-Line-Retry-Key"] = retry_key
+
+        for attempt in range(1, attempts + 1):
+            response = self.session.post(
+                f"{API_BASE}/push",
+                json={"to": to, "messages": messages},
+                headers=headers,
+                timeout=10,
+            )
+            if response.ok or (retry_key and response.status_code == 409):
+                return
+            if response.status_code not in RETRY_STATUSES or attempt == attempts or not retry_key:
+                logger.error("LINE push failed: %s %s", response.status_code, response.text[:200])
+                response.raise_for_status()
+            retry_after = response.headers.get("Retry-After", "")
+            time.sleep(int(retry_after) if retry_after.isdigit() else 2 ** (attempt - 1))
+
 
 client = LineMessagingClient(settings.LINE_CHANNEL_ACCESS_TOKEN)
@@ -4,7 +4,9 @@ from typing import Any, Dict, Iterable, List, Optional
 
 from django.conf import settings
 
-from api.models import Location, Sweet
+from api.models import Location, Sweet, select_image_variant
+
+HERO_IMAGE_WIDTH = 480
 
 
 def build_default_message() -> Dict[str, Any]:
@@ -35,6 +37,13 @@ def build_customer_service_message() -> Dict[str, Any]:
     }
 
 
+def build_booking_reminder_message(sweet_name: str, when: str, time_slot: str) -> Dict[str, Any]:
+    return {
+        "type": "text",
+        "text": f"⏰ 預約提醒\n{when} {time_slot} 與 {sweet_name} 的預約快到囉，有任何調整請直接告訴小夜。",
+    }
+
+
 def build_sweet_carousel(sweets: List[Sweet], title: str | None = None) -> Dict[str, Any]:
     if not sweets:
         return {
@@ -58,7 +67,7 @@ def build_sweet_bubble(sweet: Sweet) -> Dict[str, Any]:
         "type": "bubble",
         "hero": {
             "type": "image",
-            "url": resolve_image(sweet.image_url),
+            "url": resolve_image(sweet.image_url, sweet.image_variants, min_width=HERO_IMAGE_WIDTH),
             "size": "full",
             "aspectRatio": "4:5",
             "aspectMode": "fit",
@@ -266,7 +275,16 @@ def build_duration_price(duration: Optional[int], price: Optional[int]) -> Optio
     return str(price)
 
 
-def resolve_image(image_url: str | None) -> str:
+def resolve_image(
+    image_url: str | None,
+    variants: List[Dict[str, Any]] | None = None,
+    min_width: int | None = None,
+) -> str:
+    if min_width is not None:
+        # LINE Flex images accept JPEG/PNG only, so prefer the JPEG variants.
+        variant = select_image_variant(variants, min_width, "jpeg")
+        if variant:
+            image_url = variant["url"]
     if not image_url:
         return "https://images.unsplash.com/photo-1492684223066-81342ee5ff30"
     if image_url.startswith("http://") or image_url.startswith("https://"):
@@ -1,3 +1,23 @@
-from django.test import TestCase
+from __future__ import annotations
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from . import messages
+
+VARIANTS = [
+    {"url": "/sweets/taipei/anqi-240.webp", "width": 240, "height": 320, "format": "webp"},
+    {"url": "/sweets/taipei/anqi-240.jpg", "width": 240, "height": 320, "format": "jpeg"},
+    {"url": "/sweets/taipei/anqi-480.jpg", "width": 480, "height": 640, "format": "jpeg"},
+    {"url": "/sweets/taipei/anqi-960.jpg", "width": 960, "height": 1280, "format": "jpeg"},
+]
+
+
+@override_settings(LIFF_BASE_URL="https://liff.example.com", BASE_URL="")
+class ResolveImageTestCase(SimpleTestCase):
+    def test_picks_smallest_jpeg_variant_wide_enough(self) -> None:
+        url = messages.resolve_image("/sweets/taipei/anqi.jpg", VARIANTS, min_width=300)
+        self.assertEqual(url, "https://liff.example.com/sweets/taipei/anqi-480.jpg")
+
+    def test_falls_back_to_original_without_variants(self) -> None:
+        url = messages.resolve_image("/sweets/taipei/anqi.jpg", [], min_width=300)
+        self.assertEqual(url, "https://liff.example.com/sweets/taipei/anqi.jpg")
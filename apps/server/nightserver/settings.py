@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 
@@ -72,10 +73,12 @@ TEMPLATES = [
 WSGI_APPLICATION = 'nightserver.wsgi.application'
 
 
+# Served over ASGI, where persistent connections are not reused between requests and only
+# pile up until MySQL drops them, so each request closes its connection when it finishes.
 DATABASES = {
     'default': dj_database_url.config(
         default=env('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=600,
+        conn_max_age=0,
     )
 }
 
@@ -106,6 +109,10 @@ if default_db and default_db.get('ENGINE') == 'django.db.backends.mysql':
     if not ssl_params:
         options.pop('ssl', None)
 
+# 測試資料庫使用檔案而非記憶體，讓跨執行緒的交易測試能取得 SQLite 真正的寫入鎖
+if default_db and default_db.get('ENGINE') == 'django.db.backends.sqlite3':
+    default_db.setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -149,6 +156,7 @@ else:
     CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "x-operator-token")
 
 JWT_SECRET = env("JWT_SECRET", SECRET_KEY)
 LINE_CHANNEL_ACCESS_TOKEN = env("LINE_CHANNEL_ACCESS_TOKEN", "")
@@ -157,3 +165,10 @@ LINE_LOGIN_CHANNEL_ID = env("LINE_LOGIN_CHANNEL_ID", "")
 LINE_LOGIN_CHANNEL_SECRET = env("LINE_LOGIN_CHANNEL_SECRET", "")
 BASE_URL = env("BASE_URL", "")
 LIFF_BASE_URL = env("LIFF_BASE_URL", "")
+IDEMPOTENCY_KEY_TTL_HOURS = int(env("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+OPERATOR_API_TOKEN = env("OPERATOR_API_TOKEN", "")
+REWARD_LEADERBOARD_TTL_SECONDS = int(env("REWARD_LEADERBOARD_TTL_SECONDS", "60"))
+REWARD_POINTS_EXPIRY_MONTHS = int(env("REWARD_POINTS_EXPIRY_MONTHS", "12"))
+# host:port of `python manage.py run_event_broker`; empty keeps SSE delivery in-process.
+EVENT_BROKER_ADDRESS = env("EVENT_BROKER_ADDRESS", "")
+SSE_KEEPALIVE_SECONDS = int(env("SSE_KEEPALIVE_SECONDS", "15"))
@@ -9,6 +9,8 @@ import { useAuth } from '../../providers/AuthProvider';
 export default function RecordsPage() {
   const { token, status, user } = useAuth();
   const [bookings, setBookings] = useState<ApiBooking[]>([]);
+  const [next, setNext] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
@@ -19,11 +21,26 @@ export default function RecordsPage() {
     fetchBookings(token, user.id)
       .then((res) => {
         setBookings(res.bookings);
+        setNext(res.next);
         setError(null);
       })
       .catch((err) => setError(err.message));
   }, [status, token, user]);
 
+  const loadMore = () => {
+    if (!token || !user || !next) {
+      return;
+    }
+    setLoadingMore(true);
+    fetchBookings(token, user.id, next)
+      .then((res) => {
+        setBookings((current) => [...current, ...res.bookings]);
+        setNext(res.next);
+      })
+      .catch((err) => setError(err.message))
+      .finally(() => setLoadingMore(false));
+  };
+
   if (status !== 'authenticated' || !user) {
     return <p className="text-sm text-slate-600">請登入後查看預約紀錄。</p>;
   }
@@ -52,6 +69,16 @@ export default function RecordsPage() {
           </article>
         ))}
       </div>
+      {next && (
+        <button
+          type="button"
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="w-full rounded-full border border-brand-pink px-4 py-2 text-sm font-medium text-brand-pink hover:bg-brand-light disabled:opacity-50"
+        >
+          {loadingMore ? '載入中...' : '載入更多'}
+        </button>
+      )}
     </div>
   );
 }
@@ -9,6 +9,7 @@ import { useAuth } from '../../providers/AuthProvider';
 export default function RewardPage() {
   const { token, status, user } = useAuth();
   const [reward, setReward] = useState<RewardSummary | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
@@ -24,6 +25,22 @@ export default function RewardPage() {
       .catch((err) => setError(err.message));
   }, [status, token, user]);
 
+  const loadMore = () => {
+    if (!token || !user || !reward?.next) {
+      return;
+    }
+    setLoadingMore(true);
+    fetchReward(token, user.id, reward.next)
+      .then((res) => {
+        // Keep the monthly totals from the first page; only the log list grows.
+        setReward((current) =>
+          current ? { ...current, logs: [...current.logs, ...res.reward.logs], next: res.reward.next } : res.reward,
+        );
+      })
+      .catch((err) => setError(err.message))
+      .finally(() => setLoadingMore(false));
+  };
+
   const progress = useMemo(() => {
     if (!reward) return 0;
     const goal = 500;
@@ -58,6 +75,27 @@ export default function RewardPage() {
           <p className="mt-1 text-xs text-slate-500">進度 {progress}% / 500 分</p>
         </div>
       </header>
+      {reward.monthly.length > 0 && (
+        <section>
+          <h2 className="text-lg font-semibold text-slate-800">每月統計</h2>
+          <div className="mt-3 space-y-2">
+            {reward.monthly.map((month) => (
+              <div
+                key={month.month}
+                className="flex items-center justify-between rounded-2xl border border-brand-light bg-white px-4 py-2 text-sm shadow-sm"
+              >
+                <span className="font-medium text-slate-700">{month.month}</span>
+                <span className="text-xs text-slate-500">
+                  +{month.earned} / -{month.spent} · {month.logCount} 筆
+                </span>
+                <span className={month.net >= 0 ? 'text-brand-pink font-semibold' : 'text-red-500 font-semibold'}>
+                  {month.net >= 0 ? `+${month.net}` : month.net}
+                </span>
+              </div>
+            ))}
+          </div>
+        </section>
+      )}
       <section>
         <h2 className="text-lg font-semibold text-slate-800">積分紀錄</h2>
         <div className="mt-3 space-y-3">
@@ -74,6 +112,16 @@ export default function RewardPage() {
             </div>
           ))}
         </div>
+        {reward.next && (
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="mt-3 w-full rounded-full border border-brand-pink px-4 py-2 text-sm font-medium text-brand-pink hover:bg-brand-light disabled:opacity-50"
+          >
+            {loadingMore ? '載入中...' : '載入更多'}
+          </button>
+        )}
       </section>
     </div>
   );
@@ -38,9 +38,18 @@ export interface ApiSweet {
   reviewCount?: number;
 }
 
+// The booking list asks for `sweet=summary`, which embeds only these sweet fields.
+export interface ApiSweetSummary {
+  id: number;
+  code?: string | null;
+  name: string;
+  imageUrl?: string | null;
+  location?: ApiLocation | null;
+}
+
 export interface ApiBooking {
   id: number;
-  sweet: ApiSweet;
+  sweet: ApiSweetSummary;
   date: string;
   timeSlot: string;
   status: string;
@@ -55,10 +64,20 @@ export interface ApiRewardLog {
   createdAt: string;
 }
 
+export interface ApiRewardMonthly {
+  month: string;
+  earned: number;
+  spent: number;
+  net: number;
+  logCount: number;
+}
+
 export interface RewardSummary {
   id: number;
   rewardPoints: number;
   logs: ApiRewardLog[];
+  monthly: ApiRewardMonthly[];
+  next: string | null;
 }
 
 export interface ApiSweetReview {
@@ -164,9 +183,28 @@ function normalizeSweet(raw: RawSweet): ApiSweet {
   };
 }
 
+type RawSweetSummary = {
+  id: number;
+  code?: string | null;
+  name: string;
+  preview_image_url?: string | null;
+  image_url?: string | null;
+  location?: RawLocation | null;
+};
+
+function normalizeSweetSummary(raw: RawSweetSummary): ApiSweetSummary {
+  return {
+    id: raw.id,
+    code: raw.code ?? null,
+    name: raw.name,
+    imageUrl: raw.preview_image_url ?? raw.image_url ?? null,
+    location: normalizeLocation(raw.location),
+  };
+}
+
 type RawBooking = {
   id: number;
-  sweet: RawSweet;
+  sweet: RawSweetSummary;
   date: string;
   time_slot: string;
   status: string;
@@ -177,7 +215,7 @@ type RawBooking = {
 function normalizeBooking(raw: RawBooking): ApiBooking {
   return {
     id: raw.id,
-    sweet: normalizeSweet(raw.sweet),
+    sweet: normalizeSweetSummary(raw.sweet),
     date: raw.date,
     timeSlot: raw.time_slot,
     status: raw.status,
@@ -202,6 +240,24 @@ function normalizeRewardLog(raw: RawRewardLog): ApiRewardLog {
   };
 }
 
+type RawRewardMonthly = {
+  month: string;
+  earned: number;
+  spent: number;
+  net: number;
+  log_count: number;
+};
+
+function normalizeRewardMonthly(raw: RawRewardMonthly): ApiRewardMonthly {
+  return {
+    month: raw.month,
+    earned: raw.earned,
+    spent: raw.spent,
+    net: raw.net,
+    logCount: raw.log_count,
+  };
+}
+
 type RawSweetReview = {
   id: number;
   rating: number;
@@ -319,23 +375,41 @@ export async function createBooking(
   return { booking: normalizeBooking(result.booking) };
 }
 
-export async function fetchBookings(token: string, userId: number) {
-  const result = await apiFetch<{ bookings: RawBooking[] }>(`/api/booking/${userId}`, {
-    token,
-  });
-  return { bookings: result.bookings.map(normalizeBooking) };
+// List endpoints return one page plus a `next` cursor; screens load further pages on demand.
+function pagePath(path: string, cursor?: string | null, params: Record<string, string> = {}) {
+  const search = new URLSearchParams(params);
+  if (cursor) {
+    search.set('cursor', cursor);
+  }
+  const query = search.toString();
+  return query ? `${path}?${query}` : path;
 }
 
-export async function fetchReward(token: string, userId: number): Promise<{ reward: RewardSummary }> {
-  const result = await apiFetch<{ reward: { user: RawUser; logs: RawRewardLog[] } }>(`/api/reward/${userId}`, {
-    token,
-  });
+export async function fetchBookings(token: string, userId: number, cursor?: string | null) {
+  const result = await apiFetch<{ bookings: RawBooking[]; next?: string | null }>(
+    pagePath(`/api/booking/${userId}`, cursor, { sweet: 'summary' }),
+    { token },
+  );
+  return { bookings: result.bookings.map(normalizeBooking), next: result.next ?? null };
+}
+
+// The first page carries the balance and monthly totals; older logs come from `cursor` pages.
+export async function fetchReward(
+  token: string,
+  userId: number,
+  cursor?: string | null,
+): Promise<{ reward: RewardSummary }> {
+  const result = await apiFetch<{
+    reward: { user: RawUser; logs: RawRewardLog[]; monthly?: RawRewardMonthly[]; next?: string | null };
+  }>(pagePath(`/api/reward/${userId}`, cursor), { token });
   const user = normalizeUser(result.reward.user);
   return {
     reward: {
       id: user.id,
       rewardPoints: user.rewardPoints,
       logs: (result.reward.logs ?? []).map(normalizeRewardLog),
+      monthly: (result.reward.monthly ?? []).map(normalizeRewardMonthly),
+      next: result.reward.next ?? null,
     },
   };
 }